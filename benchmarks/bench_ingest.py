@@ -0,0 +1,58 @@
+"""服务器日志导入吞吐量基准测试
+
+用法:
+    python -m benchmarks.bench_ingest --matches 200
+    python -m benchmarks.bench_ingest --log /path/to/server.log   # 使用真实日志
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_server_log
+from controllers.log_controller import LogIngestController
+from models import server_log
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CS2 服务器日志导入基准测试")
+    parser.add_argument("--log", help="日志文件（默认生成合成日志）")
+    parser.add_argument("--matches", type=int, default=200, help="合成日志的比赛场数")
+    parser.add_argument("--seed", type=int, default=20240501)
+    args = parser.parse_args(argv)
+
+    path = args.log
+    temporary = None
+    if path is None:
+        temporary = tempfile.NamedTemporaryFile(suffix='.log', delete=False)
+        with temporary:
+            generate_server_log(temporary, args.matches, args.seed)
+        path = temporary.name
+    try:
+        size = os.path.getsize(path)
+        controller = LogIngestController()
+        lines = 0
+        players = 0
+
+        def counted(source):
+            nonlocal lines
+            for line in source:
+                lines += 1
+                yield line
+
+        start = time.perf_counter()
+        for _, _, _, rows in controller.ingest(counted(server_log.iter_lines(path))):
+            players += len(rows)
+        elapsed = time.perf_counter() - start
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+
+    print(f"{size / 1e6:.1f} MB, {lines:,} 行, {players:,} 条选手记录, {elapsed:.2f} s")
+    print(f"{size / 1e6 / elapsed:.1f} MB/s, {lines / elapsed:,.0f} 行/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
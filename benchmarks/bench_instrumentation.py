@@ -0,0 +1,182 @@
+"""插桩开销基准测试：关闭插桩时的热点路径必须与未插桩时一致（开销 < 1%）
+
+用法:
+    python -m benchmarks.bench_instrumentation
+    python -m benchmarks.bench_instrumentation --max-overhead 0.01 --repeat 41
+
+检查三点（任一不满足时返回非零退出码）:
+1. 关闭插桩时，每个登记的属性都是原函数对象本身（调用路径上没有任何包装）；
+2. 关闭插桩时 formula.evaluate（界面与服务实际调用的入口，默认组合公式）产生的
+   Python函数调用次数与原函数完全相同；
+3. 成对交替测量关闭插桩的调用与直接调用原函数，耗时比值中位数的开销不超过
+   --max-overhead（加上同一函数与自身成对测量得到的噪声下限）。
+开启插桩时的开销仅作参考输出。
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.synthetic import PROFILES, generate_inputs
+from models import instrumentation
+from models.formula_registry import default_registry
+
+SEED = 20240501
+SIZE = 2048
+
+
+def _loop(func, args_list):
+    def body():
+        for args in args_list:
+            func(*args)
+    return body
+
+
+def _calibrate(body, min_time: float) -> int:
+    """每轮的循环次数（使单轮耗时不低于 min_time）"""
+    body()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            body()
+        if time.perf_counter() - start >= min_time:
+            return loops
+        loops *= 2
+
+
+def _timed(body, loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        body()
+    return (time.perf_counter() - start) / loops
+
+
+def _best_times(bodies: list, repeat: int, min_time: float) -> list:
+    """交替测量各循环，返回每个循环多轮中的最短单轮时间（仅作参考输出）"""
+    loops = _calibrate(bodies[0], min_time)
+    best = [float('inf')] * len(bodies)
+    for _ in range(repeat):
+        for index, body in enumerate(bodies):
+            best[index] = min(best[index], _timed(body, loops))
+    return best
+
+
+def _paired_overhead(baseline, candidate, repeat: int, min_time: float) -> float:
+    """成对测量的相对开销：每轮相邻测量两者（轮流先后），取耗时比值的中位数
+
+    共享主机上频率与调度抖动可达数个百分点，相邻成对比较可以抵消大部分漂移。
+    """
+    loops = _calibrate(baseline, min_time)
+    candidate()
+    ratios = []
+    for round_index in range(repeat):
+        if round_index % 2:
+            after = _timed(candidate, loops)
+            before = _timed(baseline, loops)
+        else:
+            before = _timed(baseline, loops)
+            after = _timed(candidate, loops)
+        ratios.append(after / before)
+    ratios.sort()
+    return ratios[len(ratios) // 2] - 1
+
+
+def _count_calls(func, args_list) -> int:
+    """执行期间的Python函数调用次数（确定性，不受计时噪声影响）"""
+    calls = 0
+
+    def profiler(frame, event, arg):
+        nonlocal calls
+        if event == 'call':
+            calls += 1
+
+    sys.setprofile(profiler)
+    try:
+        for args in args_list:
+            func(*args)
+    finally:
+        sys.setprofile(None)
+    return calls
+
+
+def check_identity() -> list:
+    """关闭插桩时仍被替换的属性（应为空）"""
+    return [name for name, owner, attr, original in instrumentation.hooks()
+            if vars(owner)[attr] is not original]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CS2 Rating 插桩开销基准测试")
+    parser.add_argument("--repeat", type=int, default=41, help="成对测量的轮数")
+    parser.add_argument("--min-time", type=float, default=0.03, help="每轮最短测量时间（秒）")
+    parser.add_argument("--max-overhead", type=float, default=0.01,
+                        help="关闭插桩时允许的最大相对开销")
+    parser.add_argument("-m", "--method", default="composite", choices=default_registry().ids(),
+                        help="测量的公式")
+    args = parser.parse_args(argv)
+
+    per_profile = SIZE // len(PROFILES)
+    inputs = []
+    for offset, profile in enumerate(PROFILES):
+        inputs.extend(generate_inputs(per_profile, profile, SEED + offset))
+    full_args = [(r['kills'], r['deaths'], r['assists'], r['rounds'], r['mvps'], r['adr'],
+                  r['hs_percent'], r['kills_3k'], r['kills_4k'], r['kills_5k'], r['rws'])
+                 for r in inputs]
+
+    formula = default_registry().get(args.method)
+    instrumentation.disable()
+    # evaluate（及组合公式各组成部分的 evaluate）首次使用时编译并登记插桩点
+    formula.evaluate(*full_args[0])
+    leaked = check_identity()
+    if leaked:
+        print(f"[bench] 关闭插桩后仍有包装函数: {', '.join(leaked)}", file=sys.stderr)
+        return 1
+
+    original = next(hook_original for name, owner, attr, hook_original in instrumentation.hooks()
+                    if owner is formula and attr == 'evaluate')
+    disabled = formula.evaluate
+    instrumentation.enable()
+    enabled = formula.evaluate
+    instrumentation.disable()
+
+    calls_original = _count_calls(original, full_args)
+    calls_disabled = _count_calls(disabled, full_args)
+    instrumentation.enable()
+    calls_enabled = _count_calls(formula.evaluate, full_args)
+    instrumentation.disable()
+    instrumentation.reset()
+    print(f"Python函数调用次数: 原函数 {calls_original}，插桩关闭 {calls_disabled}，"
+          f"插桩开启 {calls_enabled}")
+    if calls_disabled != calls_original:
+        print("[bench] 插桩关闭时调用路径与原函数不同", file=sys.stderr)
+        return 1
+
+    noise = abs(_paired_overhead(_loop(original, full_args), _loop(original, full_args),
+                                 args.repeat, args.min_time))
+    overhead = _paired_overhead(_loop(original, full_args), _loop(disabled, full_args),
+                                args.repeat, args.min_time)
+    baseline, on = _best_times([_loop(original, full_args), _loop(enabled, full_args)],
+                               max(3, args.repeat // 4), args.min_time)
+    # 开启状态的测量期间组成部分仍是原函数，另测一次包含各组成部分计时的完整开销
+    instrumentation.enable()
+    (on_stages,) = _best_times([_loop(formula.evaluate, full_args)],
+                               max(3, args.repeat // 4), args.min_time)
+    instrumentation.disable()
+    instrumentation.reset()
+
+    print(f"插桩关闭（成对中位数）: 相对开销 {overhead:+.2%}（噪声下限 ±{noise:.2%}）")
+    print(f"{'用例':<34}{'单次耗时(µs)':>14}{'相对开销':>12}")
+    for name, elapsed in (('原函数', baseline), ('插桩开启（仅外层）', on),
+                          ('插桩开启（含各组成部分）', on_stages)):
+        print(f"{name:<34}{elapsed / len(full_args) * 1e6:>14.3f}"
+              f"{elapsed / baseline - 1:>+12.2%}")
+
+    if overhead > args.max_overhead + noise:
+        print(f"[bench] 插桩关闭时开销 {overhead:+.2%} 超过 {args.max_overhead:.0%}"
+              f"（噪声下限 ±{noise:.2%}）", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
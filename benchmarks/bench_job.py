@@ -0,0 +1,143 @@
+"""可断点续算作业的多进程检查：租约过期与回收、kill -9 后续算，输出必须与 rate 逐字节一致
+
+用法: python -m benchmarks.bench_job [--rows 50000] [--unit-size 2000] [--workers 3]
+输入中混有无法解析的单元格（应记为未通过校验的行，不能让单元永远无法完成）。
+任一检查失败时返回非零退出码。
+"""
+import argparse
+import csv
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_inputs
+from controllers.job_controller import init_job
+from models.job_spool import JobSpool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 写入的无法解析的单元格：(行号, 字段, 值)
+BAD_CELLS = ((100, 'kills', 'abc'), (2500, 'rounds', 'inf'), (4001, 'deaths', '1e400'))
+
+
+def write_input(path: str, rows: int, seed: int):
+    """生成合成输入（CSV），并写入 BAD_CELLS"""
+    records = generate_inputs(rows, seed=seed)
+    for row, field, value in BAD_CELLS:
+        if row < rows:
+            records[row][field] = value
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(records[0]))
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def run_main(*args) -> subprocess.CompletedProcess:
+    """运行 main.py 子命令（新进程，与实际使用相同）"""
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), *args],
+                          cwd=ROOT, capture_output=True, text=True)
+
+
+def check_leases(spool_path: str, input_path: str) -> list:
+    """租约：未过期时不被领取，过期后被其他 worker 回收，原持有者续约失败"""
+    problems = []
+    spool = init_job(spool_path, [input_path], unit_size=1000)
+    first = spool.claim('a', ttl=0.5)
+    other = spool.claim('b', ttl=0.5)
+    if first.unit == other.unit:
+        problems.append("未过期的租约被其他 worker 领取")
+    spool.release(other)
+    time.sleep(0.6)
+    reclaimed = spool.claim('b', ttl=30)
+    if reclaimed is None or reclaimed.unit != first.unit:
+        problems.append("过期的租约没有被回收")
+    if spool.renew(first, 30):
+        problems.append("租约被回收后原持有者仍能续约")
+    spool.release(reclaimed)
+    return problems
+
+
+def check_resume(spool_path: str, input_path: str, unit_size: int, workers: int,
+                 lease_ttl: float) -> tuple:
+    """一个 worker 计算到一半时 kill -9，再用多个进程续算，返回 (问题列表, 续算耗时)"""
+    problems = []
+    result = run_main('job', spool_path, 'init', input_path, '--unit-size', str(unit_size))
+    if result.returncode:
+        return [f"init 失败: {result.stderr.strip()}"], 0.0
+    spool = JobSpool(spool_path)
+    worker = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'main.py'), 'job', spool_path, 'work',
+         '--lease-ttl', str(lease_ttl), '--poll', '0.1'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while worker.poll() is None and spool.status()['done'] < 2:
+            time.sleep(0.01)
+    finally:
+        worker.send_signal(signal.SIGKILL)
+        worker.wait()
+    status = spool.status()
+    print(f"kill -9 后: 单元 {status['done']}/{status['units']} 完成，{status['leased']} 个租约未释放")
+    if status['done'] == status['units']:
+        problems.append("worker 在 kill 前已完成所有单元（增大 --rows 或减小 --unit-size）")
+
+    started = time.perf_counter()
+    result = run_main('job', spool_path, 'work', '-j', str(workers),
+                      '--lease-ttl', str(lease_ttl), '--poll', '0.1')
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        problems.append(f"续算失败 (rc={result.returncode}): {result.stderr.strip()}")
+    return problems, elapsed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="可断点续算作业的多进程检查")
+    parser.add_argument("--rows", type=int, default=50000, help="合成输入的行数")
+    parser.add_argument("--unit-size", type=int, default=2000, help="每个工作单元的行数")
+    parser.add_argument("--workers", type=int, default=3, help="续算时的 worker 进程数")
+    parser.add_argument("--lease-ttl", type=float, default=2.0, help="租约有效期（秒）")
+    parser.add_argument("--seed", type=int, default=20240501)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, 'input.csv')
+        write_input(input_path, args.rows, args.seed)
+        expected = os.path.join(directory, 'expected.csv')
+        expected_rejects = os.path.join(directory, 'expected_rejects.jsonl')
+        started = time.perf_counter()
+        result = run_main('rate', input_path, '-o', expected, '--rejects', expected_rejects)
+        print(f"rate: {time.perf_counter() - started:.2f} s")
+        if result.returncode:
+            print(f"FAIL: rate 失败: {result.stderr.strip()}")
+            return 1
+
+        problems = check_leases(os.path.join(directory, 'leases'), input_path)
+        resume_problems, elapsed = check_resume(
+            os.path.join(directory, 'spool'), input_path, args.unit_size, args.workers,
+            args.lease_ttl)
+        problems += resume_problems
+        print(f"work -j {args.workers}: {elapsed:.2f} s（含等待过期租约 {args.lease_ttl:g} s）")
+
+        output = os.path.join(directory, 'output.csv')
+        rejects = os.path.join(directory, 'rejects.jsonl')
+        result = run_main('job', os.path.join(directory, 'spool'), 'collect',
+                          '-o', output, '--rejects', rejects)
+        if result.returncode:
+            problems.append(f"collect 失败: {result.stderr.strip()}")
+        else:
+            for path, reference, name in ((output, expected, '输出'),
+                                          (rejects, expected_rejects, '未通过校验的行')):
+                with open(path, 'rb') as f, open(reference, 'rb') as g:
+                    if f.read() != g.read():
+                        problems.append(f"{name}与 rate 不一致")
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print("OK: 租约过期/回收正确，续算输出与 rate 逐字节一致")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""公式注册表 / 批量计算 / 控制器热点路径基准测试
+
+用法:
+    python -m benchmarks.bench_rating                        # 运行并打印结果
+    python -m benchmarks.bench_rating --json results.json    # 同时写出JSON结果
+    python -m benchmarks.bench_rating --baseline benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.bench_rating --runs 5 --save-baseline benchmarks/baseline.json
+
+每个用例的结果是 --runs 次完整运行中 ops/sec 的中位数（基线与比较都一样），
+与基线相比任一用例的中位数下降超过阈值时返回非零退出码。
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import PROFILES, generate_columns, generate_inputs
+from models.batch_calculator import BatchRatingCalculator
+from models.formula_registry import default_registry
+from models import report
+from models.validation import validate
+
+SEED = 20240501
+SCALAR_SIZE = 2048
+BATCH_SIZE = 100000
+
+
+class Case:
+    """一个基准用例：body() 执行 ops 次操作"""
+
+    def __init__(self, name: str, group: str, body, ops: int):
+        self.name = name
+        self.group = group
+        self.body = body
+        self.ops = ops
+
+
+def _scalar_cases(inputs: list) -> list:
+    """标量计算用例（混合各种分布的输入）"""
+    full_args = [(r['kills'], r['deaths'], r['assists'], r['rounds'], r['mvps'], r['adr'],
+                  r['hs_percent'], r['kills_3k'], r['kills_4k'], r['kills_5k'], r['rws'])
+                 for r in inputs]
+
+    def loop(func, args_list):
+        def body():
+            for args in args_list:
+                func(*args)
+        return body
+
+    return [
+        Case(f'scalar.registry.{formula.id}', 'scalar', loop(formula.scalar, full_args), len(inputs))
+        for formula in default_registry()
+    ] + [
+        Case(f'scalar.evaluate.{formula.id}', 'scalar', loop(formula.evaluate, full_args), len(inputs))
+        for formula in default_registry()
+    ]
+
+
+def _batch_cases() -> list:
+    """向量化批量计算用例（每种数据分布 × 每种方法）"""
+    cases = []
+    for profile in PROFILES:
+        columns = generate_columns(BATCH_SIZE, profile, SEED)
+        for method in default_registry().ids():
+            def body(columns=columns, method=method):
+                BatchRatingCalculator.calculate(method, columns)
+            cases.append(Case(f'batch.{method}.{profile}', 'batch', body, BATCH_SIZE))
+
+        def check(columns=columns):
+            validate(columns)
+        cases.append(Case(f'batch.validate.{profile}', 'batch', check, BATCH_SIZE))
+    return cases
+
+
+def _whatif_cases() -> list:
+    """敏感度分析用例：200x200 what-if 曲面（全部方法）与批量偏导数"""
+    from models.sensitivity import gradient, what_if_grid
+
+    stats = generate_inputs(1, 'realistic', SEED)[0]
+    kills = np.linspace(0, 60, 200)
+    deaths = np.linspace(0, 40, 200)
+    columns = generate_columns(SCALAR_SIZE, 'realistic', SEED)
+
+    def grid():
+        what_if_grid(stats, 'kills', kills, 'deaths', deaths)
+
+    cases = [Case('whatif.grid_200x200', 'whatif', grid, 1)]
+    for method in default_registry().ids():
+        def body(method=method):
+            gradient(method, columns)
+        cases.append(Case(f'whatif.gradient.{method}', 'whatif', body, SCALAR_SIZE))
+    return cases
+
+
+def _percentile_cases() -> list:
+    """百分位索引用例：百万人群上的排名/百分位查询与按选手更新"""
+    from models.percentile_index import PercentileIndex
+
+    rng = np.random.default_rng(SEED)
+    index = PercentileIndex()
+    index.extend(np.clip(rng.normal(1.0, 0.25, 1000000), 0, 3))
+    queries = rng.uniform(0, 3, SCALAR_SIZE).tolist()
+    players = [f"player{i}" for i in range(SCALAR_SIZE)]
+
+    def percentile():
+        for rating in queries:
+            index.percentile(rating)
+
+    def update():
+        for player, rating in zip(players, queries):
+            index.update(player, rating)
+        queries.reverse()
+
+    return [Case('percentile.query', 'percentile', percentile, len(queries)),
+            Case('percentile.update', 'percentile', update, len(queries))]
+
+
+def _store_cases() -> list:
+    """结果库用例：全部命中时的批量查找（含输入哈希），每块 BATCH_SIZE 行"""
+    import tempfile
+    from models.result_store import ResultStore, input_keys
+
+    columns = generate_columns(BATCH_SIZE, 'realistic', SEED)
+    formula = default_registry().get('composite')
+    store = ResultStore(tempfile.mkdtemp(prefix='bench_store_'))
+    store.rate(formula, columns)
+    store.close()
+
+    def keys():
+        input_keys(columns)
+
+    def lookup():
+        store.rate(formula, columns)
+
+    return [Case('store.keys', 'store', keys, BATCH_SIZE),
+            Case('store.lookup_hit', 'store', lookup, BATCH_SIZE)]
+
+
+def _calibration_cases() -> list:
+    """系数校准用例：设计矩阵与Gram统计量累加（每块 BATCH_SIZE 行）"""
+    from models.calibration import CustomCalibrator
+
+    columns = generate_columns(BATCH_SIZE, 'realistic', SEED)
+    target = default_registry().get('2.0').vector(columns)
+    calibrator = CustomCalibrator(folds=5)
+
+    def update():
+        calibrator.update(columns, target)
+
+    return [Case('calibration.update', 'calibration', update, BATCH_SIZE)]
+
+
+def _leaderboard_cases() -> list:
+    """分组排行榜用例：每块 BATCH_SIZE 行按 地图×队伍 分组取前100"""
+    from models.leaderboard import Leaderboard
+
+    columns = generate_columns(BATCH_SIZE, 'realistic', SEED)
+    ratings = default_registry().get('2.0').vector(columns)
+    rng = np.random.default_rng(SEED)
+    maps = rng.integers(0, 7, BATCH_SIZE).tolist()
+    teams = rng.integers(0, 32, BATCH_SIZE).tolist()
+    records = [{'map': f"map{m}", 'team': f"team{t}"} for m, t in zip(maps, teams)]
+    board = Leaderboard(100, ('map', 'team'), min_rounds=10)
+
+    def update():
+        board.update(records, ratings, columns)
+
+    return [Case('leaderboard.update', 'leaderboard', update, BATCH_SIZE)]
+
+
+def _report_cases() -> list:
+    """批量报告用例：每块 BATCH_SIZE 行渲染为各输出格式（模板只编译一次）"""
+    from models.report import FORMATS, ReportTemplate
+
+    columns = generate_columns(BATCH_SIZE, 'realistic', SEED)
+    records = [{'player': f"player{i}"} for i in range(BATCH_SIZE)]
+    cases = []
+    for fmt in FORMATS:
+        template = ReportTemplate(default_registry().get('composite'), fmt, ('player',))
+
+        def render(template=template):
+            template.render(columns, records)
+        cases.append(Case(f'report.render.{fmt}', 'report', render, BATCH_SIZE))
+    return cases
+
+
+def _uncertainty_cases() -> list:
+    """置信区间用例：每名玩家 DEFAULT_SAMPLES 次重采样（ops 为重采样次数）"""
+    from models.uncertainty import DEFAULT_SAMPLES, rating_intervals
+
+    columns = generate_columns(16, 'realistic', SEED)
+    players = len(columns['rounds'])
+    cases = []
+    for method in ('custom', 'composite'):
+        def intervals(method=method):
+            rating_intervals(columns, [method], DEFAULT_SAMPLES)
+        cases.append(Case(f'uncertainty.interval.{method}', 'uncertainty', intervals,
+                          players * DEFAULT_SAMPLES))
+    return cases
+
+
+class _HeadlessView:
+    """无界面视图：为控制器提供输入并接收结果"""
+
+    class _Signal:
+        def connect(self, slot):
+            pass
+
+    class _Button:
+        def __init__(self):
+            self.clicked = _HeadlessView._Signal()
+            self.toggled = _HeadlessView._Signal()
+
+    def __init__(self, inputs: list):
+        self.calculate_btn = self._Button()
+        self.about_btn = self._Button()
+        self.bulk_btn = self._Button()
+        self.live_checkbox = self._Button()
+        self.interval_checkbox = self._Button()
+        self.inputs_changed = self._Signal()
+        self.inputs = inputs
+        self.method = default_registry().get('composite')
+        self.index = 0
+
+    def get_input_values(self):
+        self.index = (self.index + 1) % len(self.inputs)
+        return self.inputs[self.index]
+
+    def get_selected_method(self):
+        return self.method.name
+
+    def get_selected_method_id(self):
+        return self.method.id
+
+    def invalid_fields(self):
+        return []
+
+    def is_live_mode(self):
+        return False
+
+    def is_interval_mode(self):
+        return False
+
+    def update_results(self, *args):
+        pass
+
+    def show_validation_error(self, message):
+        raise ValueError(message)
+
+
+def _controller_cases(inputs: list) -> list:
+    """控制器端到端与详细数据格式化用例（需要PyQt5，缺失时跳过）"""
+    try:
+        from controllers.calculator_controller import CalculatorController
+    except ImportError:
+        print("[bench] 未安装PyQt5，跳过控制器用例", file=sys.stderr)
+        return []
+
+    view = _HeadlessView(inputs)
+    controller = CalculatorController(view)
+
+    cases = []
+    for formula in default_registry():
+        def end_to_end(formula=formula):
+            view.method = formula
+            for _ in range(len(inputs)):
+                controller.calculate_rating()
+        cases.append(Case(f'controller.calculate_rating.{formula.id}', 'controller',
+                          end_to_end, len(inputs)))
+
+    for formula in default_registry():
+        results = [formula.evaluate(**row) for row in inputs]
+
+        def format_all(formula=formula, results=results):
+            for result in results:
+                report.details(formula, result)
+        cases.append(Case(f'report.details.{formula.id}', 'report', format_all, len(inputs)))
+    return cases
+
+
+def build_cases() -> list:
+    """构建所有用例（输入数据由固定种子生成）"""
+    per_profile = SCALAR_SIZE // len(PROFILES)
+    inputs = []
+    for offset, profile in enumerate(PROFILES):
+        inputs.extend(generate_inputs(per_profile, profile, SEED + offset))
+    return (_scalar_cases(inputs) + _batch_cases() + _whatif_cases() + _percentile_cases() +
+            _store_cases() + _calibration_cases() + _leaderboard_cases() + _report_cases() +
+            _uncertainty_cases() + _controller_cases(inputs))
+
+
+def measure(case: Case, repeat: int, min_time: float) -> dict:
+    """测量 ops/sec（取多轮最优）与单次操作的峰值内存分配"""
+    case.body()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            case.body()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+
+    best = elapsed
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                case.body()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        case.body()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'group': case.group,
+        'ops_per_sec': case.ops * loops / best,
+        'peak_alloc_bytes_per_op': (peak - before) / case.ops,
+    }
+
+
+def median_result(samples: list) -> dict:
+    """多次运行中 ops/sec 居中的一次（偶数次时取较慢的一次），峰值内存取自同一次"""
+    ordered = sorted(samples, key=lambda result: result['ops_per_sec'])
+    return ordered[(len(ordered) - 1) // 2]
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """与基线比较，返回退化的用例 [(名称, 当前/基线比值)]"""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = current['ops_per_sec'] / reference['ops_per_sec']
+        current['baseline_ratio'] = ratio
+        if ratio < 1 - threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CS2 Rating 基准测试")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的测量轮数")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最短测量时间（秒）")
+    parser.add_argument("--json", help="写出JSON结果的路径")
+    parser.add_argument("--baseline", help="用于比较的基线JSON")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="允许的 ops/sec 下降比例（默认0.15）")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="完整运行的次数，每个用例取 ops/sec 的中位数（默认3）")
+    parser.add_argument("--save-baseline", help="把本次结果保存为基线")
+    args = parser.parse_args(argv)
+
+    # 各次运行依次测量全部用例（而不是一个用例连测 N 次），机器负载的起伏分散到各用例上
+    cases = [case for case in build_cases() if args.filter in case.name]
+    samples = {case.name: [] for case in cases}
+    results = {}
+    for run in range(args.runs):
+        for case in cases:
+            samples[case.name].append(measure(case, args.repeat, args.min_time))
+            if run == args.runs - 1:
+                result = results[case.name] = median_result(samples[case.name])
+                print(f"{case.name:<45} {result['ops_per_sec']:>14,.0f} ops/s "
+                      f"{result['peak_alloc_bytes_per_op']:>10.1f} B/op")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x 基线")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': SEED,
+            'runs': args.runs,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
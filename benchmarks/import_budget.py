@@ -0,0 +1,80 @@
+"""导入开销检查：models.rating_calculator 必须是不依赖GUI的纯Python模块
+
+用法: python -m benchmarks.import_budget [--budget-ms 5] [--repeat 5]
+超出预算或导入了PyQt5/NumPy时返回非零退出码。
+界面启动时导入的模型模块（STARTUP_MODULES）也不能导入NumPy（只在批量计算、置信区间等功能中延迟导入）。
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "models.rating_calculator"
+FORBIDDEN_PREFIXES = ("PyQt5", "numpy")
+# 界面启动时导入的模型模块（见 controllers/calculator_controller.py、views/main_window.py）
+STARTUP_MODULES = ("models.formula_registry", "models.report", "models.validation",
+                   "models.instrumentation")
+
+_PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    f"import {MODULE}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "loaded = sorted(m for m in sys.modules if m.split('.')[0] in {forbidden!r})\n"
+    "print(elapsed * 1000)\n"
+    "print(','.join(loaded))\n"
+).format(forbidden=set(FORBIDDEN_PREFIXES))
+
+
+def measure_import(repeat: int = 5) -> tuple:
+    """在全新的解释器中多次导入，返回 (最短耗时ms, 被意外导入的模块)"""
+    # 允许写入字节码缓存：首次运行预热，之后测量的是部署环境下的冷启动
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    timings = []
+    forbidden = set()
+    for _ in range(repeat + 1):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE], cwd=ROOT, env=env, check=True,
+            capture_output=True, text=True).stdout.splitlines()
+        timings.append(float(output[0]))
+        if len(output) > 1 and output[1]:
+            forbidden.update(output[1].split(","))
+    return min(timings[1:]), sorted(forbidden)
+
+
+def startup_imports() -> list:
+    """在全新的解释器中导入 STARTUP_MODULES，返回被意外导入的顶层包"""
+    probe = (f"import sys\nimport {', '.join(STARTUP_MODULES)}\n"
+             "print(','.join(sorted({m.split('.')[0] for m in sys.modules} & "
+             f"{set(FORBIDDEN_PREFIXES)!r})))\n")
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout.strip()
+    return output.split(",") if output else []
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=f"{MODULE} 导入开销检查")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="导入耗时上限（毫秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复测量次数")
+    args = parser.parse_args(argv)
+
+    elapsed_ms, forbidden = measure_import(args.repeat)
+    print(f"import {MODULE}: {elapsed_ms:.3f} ms (budget {args.budget_ms} ms)")
+    if forbidden:
+        print(f"FAIL: 导入了GUI/重量级依赖: {', '.join(forbidden)}")
+        return 1
+    startup_forbidden = startup_imports()
+    if startup_forbidden:
+        print(f"FAIL: {', '.join(STARTUP_MODULES)} 导入了GUI/重量级依赖: "
+              f"{', '.join(startup_forbidden)}")
+        return 1
+    if elapsed_ms > args.budget_ms:
+        print("FAIL: 超出导入耗时预算")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""可复现的合成比赛数据生成器（固定随机种子）"""
+import numpy as np
+
+PROFILES = ('realistic', 'zero_deaths', 'one_round', 'multikill_heavy', 'no_rws')
+
+
+def generate_columns(size: int, profile: str = 'realistic', seed: int = 20240501) -> dict:
+    """生成一批列式比赛数据（键与 get_input_values 一致，rws 为 NaN 表示无RWS）"""
+    if profile not in PROFILES:
+        raise ValueError(f"未知的数据分布: {profile}")
+    rng = np.random.default_rng(seed)
+
+    if profile == 'one_round':
+        rounds = np.ones(size, dtype=np.int64)
+    else:
+        # 常见比赛回合数：13-30（MR12/MR15及加时）
+        rounds = rng.integers(13, 31, size)
+
+    kpr = rng.gamma(shape=6.0, scale=0.12, size=size)
+    kills = np.minimum(rng.poisson(kpr * rounds), rounds * 5)
+    if profile == 'zero_deaths':
+        deaths = np.zeros(size, dtype=np.int64)
+    else:
+        deaths = np.minimum(rng.poisson(0.68 * rounds), rounds)
+    assists = rng.poisson(0.18 * rounds)
+    mvps = np.minimum(rng.poisson(0.12 * rounds), rounds)
+    adr = np.clip(rng.normal(78, 22, size), 0, 200).round(1)
+    hs_percent = np.clip(rng.normal(45, 15, size), 0, 100).round(1)
+
+    multikill_scale = 4.0 if profile == 'multikill_heavy' else 1.0
+    kills_3k = rng.poisson(0.05 * rounds * multikill_scale)
+    kills_4k = rng.poisson(0.012 * rounds * multikill_scale)
+    kills_5k = rng.poisson(0.002 * rounds * multikill_scale)
+
+    rws = np.clip(rng.normal(10, 4, size), 0, 30).round(2)
+    if profile == 'no_rws':
+        rws[:] = np.nan
+    else:
+        rws[rng.random(size) < 0.3] = np.nan
+
+    return {
+        'kills': kills, 'deaths': deaths, 'assists': assists, 'rounds': rounds,
+        'mvps': mvps, 'adr': adr, 'hs_percent': hs_percent,
+        'kills_3k': kills_3k, 'kills_4k': kills_4k, 'kills_5k': kills_5k,
+        'rws': rws,
+    }
+
+
+def generate_inputs(size: int, profile: str = 'realistic', seed: int = 20240501) -> list:
+    """生成逐行的输入字典（与 MainWindow.get_input_values 返回值格式一致）"""
+    columns = generate_columns(size, profile, seed)
+    rows = []
+    for values in zip(*(columns[name].tolist() for name in columns)):
+        row = dict(zip(columns, values))
+        row['rws'] = None if row['rws'] != row['rws'] else row['rws']
+        rows.append(row)
+    return rows
+
+
+def generate_server_log(stream, matches: int = 1, seed: int = 20240501, rounds: int = 24):
+    """生成CS2服务器控制台日志（写入二进制流，格式与 models.server_log 解析的一致）"""
+    rng = np.random.default_rng(seed)
+    weapons = (b'ak47', b'm4a1', b'awp', b'deagle', b'usp_silencer', b'glock')
+    stamp = b'L 10/18/2025 - 20:14:03: '
+
+    def token(player):
+        index, team = player
+        return b'"Player%d<%d><[U:1:%d]><%s>"' % (index, index + 2, 1000 + index, team)
+
+    for match in range(matches):
+        players = [(i, b'CT' if i < 5 else b'TERRORIST') for i in range(10)]
+        for player in players:
+            stream.write(stamp + token((player[0], b'')) + b' switched from team <Unassigned> to <'
+                         + player[1] + b'>\n')
+        stream.write(stamp + b'World triggered "Match_Start" on "de_dust2"\n')
+        for _ in range(rounds):
+            stream.write(stamp + b'World triggered "Round_Start"\n')
+            health = [100] * 10
+            alive = {b'CT': list(range(5)), b'TERRORIST': list(range(5, 10))}
+            while alive[b'CT'] and alive[b'TERRORIST']:
+                side = b'CT' if rng.random() < 0.5 else b'TERRORIST'
+                other = b'TERRORIST' if side == b'CT' else b'CT'
+                attacker = players[alive[side][rng.integers(len(alive[side]))]]
+                victim_index = alive[other][rng.integers(len(alive[other]))]
+                victim = players[victim_index]
+                damage = int(rng.integers(8, 110))
+                health[victim_index] = max(0, health[victim_index] - damage)
+                weapon = weapons[rng.integers(len(weapons))]
+                position = b' [-1024 512 64]'
+                stream.write(stamp + token(attacker) + position + b' attacked ' + token(victim)
+                             + position + b' with "' + weapon + b'" (damage "%d") (damage_armor "5") '
+                             b'(health "%d") (armor "95") (hitgroup "chest")\n'
+                             % (damage, health[victim_index]))
+                if health[victim_index] == 0:
+                    headshot = b' (headshot)' if rng.random() < 0.45 else b''
+                    stream.write(stamp + token(attacker) + position + b' killed ' + token(victim)
+                                 + position + b' with "' + weapon + b'"' + headshot + b'\n')
+                    if rng.random() < 0.2 and len(alive[side]) > 1:
+                        helper = players[next(i for i in alive[side] if i != attacker[0])]
+                        stream.write(stamp + token(helper) + b' assisted killing '
+                                     + token(victim) + b'\n')
+                    alive[other].remove(victim_index)
+            winner = b'CT' if alive[b'CT'] else b'TERRORIST'
+            notice = b'SFUI_Notice_CTs_Win' if winner == b'CT' else b'SFUI_Notice_Terrorists_Win'
+            stream.write(stamp + b'Team "' + winner + b'" triggered "' + notice + b'"\n')
+            stream.write(stamp + b'World triggered "Round_End"\n')
+        stream.write(stamp + b'Game Over: competitive 1092904694 de_dust2 score 13:11 after 40 min\n')
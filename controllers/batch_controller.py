@@ -0,0 +1,246 @@
+import argparse
+import io
+import json
+import sys
+from itertools import chain
+
+from models.batch_calculator import BatchRatingCalculator
+from models.formula_registry import default_registry
+from models.rating_calculator import RatingCalculator
+from models.result_store import ResultStore
+from models.uncertainty import DEFAULT_SAMPLES, DEFAULT_SEED, QUANTILES, rating_intervals
+from models.validation import ValidationError, describe, validate
+from models import record_io
+
+# 结果行追加的字段
+RESULT_FIELDS = ('rating', 'tier')
+# 开启置信区间时再追加的字段（评分的 5%/50%/95% 分位数）
+INTERVAL_FIELDS = tuple(f"rating_p{quantile:g}" for quantile in QUANTILES)
+
+
+def rate_records(records: list, method: str, store: ResultStore = None,
+                 interval: tuple = None, unparseable: set = None) -> tuple:
+    """计算一块记录的评分，返回 (附加了 rating/tier 字段的结果行, 校验状态位数组)
+
+    未通过校验（含无法解析）的行 rating/tier 为空，不会输出看似正常的评分。
+    给出结果库时只计算库中没有的行。
+    interval = (重采样次数, 种子) 时追加 INTERVAL_FIELDS（见 models/uncertainty.py）。
+    unparseable 为解析原始文本时已无法解析的行号。
+    """
+    unparseable = set(unparseable or ())
+    columns = record_io.records_to_columns(records, unparseable)
+    report = validate(columns, unparseable)
+    if store is None:
+        ratings = BatchRatingCalculator.calculate(method, columns)
+    else:
+        ratings = store.rate(default_registry().get(method), columns, report.valid)
+    quantiles = None
+    if interval is not None:
+        samples, seed = interval
+        quantiles = rating_intervals(columns, [method], samples, seed,
+                                     valid=report.valid)[method].tolist()
+
+    rows = []
+    for i, (record, rating, status) in enumerate(
+            zip(records, ratings.tolist(), report.status.tolist())):
+        row = dict(record)
+        if status:
+            row['rating'] = row['tier'] = None
+        else:
+            row['rating'] = rating
+            row['tier'] = RatingCalculator.get_rating_description(rating)[0]
+        if quantiles is not None:
+            values = [None] * len(INTERVAL_FIELDS) if status else quantiles[i]
+            row.update(zip(INTERVAL_FIELDS, values))
+        rows.append(row)
+    return rows, report.status
+
+
+def rate_raw_chunk(raw_records: list, job: tuple, store: ResultStore = None) -> tuple:
+    """解析、计算并格式化一块原始记录，返回 (输出文本, 校验状态位数组)
+
+    job = (method, input_format, input_fields, output_format, output_fields, interval)。
+    单进程与多进程都通过该函数生成输出，保证结果逐字节一致。
+    """
+    method, input_format, input_fields, output_format, output_fields, interval = job
+    unparseable = set()
+    records = record_io.parse_raw_records(raw_records, input_format, input_fields, unparseable)
+    buffer = io.StringIO()
+    writer = record_io.RecordWriter(buffer, output_format, output_fields)
+    rows, status = rate_records(records, method, store, interval, unparseable)
+    writer.write_rows(rows)
+    return buffer.getvalue(), status
+
+
+class BatchController:
+    """无界面批量计算控制器（不依赖PyQt5）"""
+
+    def __init__(self, method: str = "composite", chunk_size: int = 8192,
+                 strict: bool = False):
+        default_registry().get(method)  # 未知方法抛出 ValueError
+        if chunk_size <= 0:
+            raise ValueError("chunk_size 必须大于0")
+        self.method = method
+        self.chunk_size = chunk_size
+        # strict: 遇到未通过校验的行时中止（抛出 ValidationError），否则输出空评分并记录
+        self.strict = strict
+        # 最近一次 run() 的统计：总行数与各问题的行数
+        self.rows = 0
+        self.rejected = 0
+        self.reject_counts = {}
+        # 结果库（可选，见 models/result_store.py）：只计算库中没有的行
+        self.store = None
+        # 置信区间（可选）：(重采样次数, 种子)，输出追加 INTERVAL_FIELDS
+        self.interval = None
+
+    def rate_stream(self, records):
+        """流式计算：逐块产出结果行，内存占用只与块大小有关"""
+        for chunk in record_io.iter_chunks(records, self.chunk_size):
+            yield rate_records(chunk, self.method, interval=self.interval)[0]
+
+    def run(self, input_path: str, output_path: str,
+            input_format: str = None, output_format: str = None, rejects_path: str = None):
+        """读取输入文件并写出评分结果
+
+        rejects_path 给出时把未通过校验的行写为 JSONL 报告：{"row": 数据行号（从0开始）, "errors": [...]}。
+        """
+        self.rows = self.rejected = 0
+        self.reject_counts = {}
+        rejects = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+        try:
+            self._run(input_path, output_path, input_format, output_format, rejects)
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+    def _run(self, input_path, output_path, input_format, output_format, rejects):
+        input_format = input_format or record_io.detect_format(input_path)
+        output_format = output_format or record_io.detect_format(output_path, input_format)
+        result_fields = list(RESULT_FIELDS) + list(INTERVAL_FIELDS if self.interval else ())
+
+        with record_io.open_input(input_path) as source, \
+                record_io.open_output(output_path) as target:
+            if input_format == 'csv':
+                input_fields = record_io.read_csv_header(source)
+                raw_records = record_io.iter_raw_records(source, input_format)
+                output_fields = input_fields + result_fields
+            else:
+                # JSONL输入：以第一条能解析为对象的记录的字段作为CSV输出列
+                # （之前的无法解析的行照常作为未通过校验的行输出；全部无法解析时使用统计字段）
+                input_fields = None
+                raw_records = record_io.iter_raw_records(source, input_format)
+                head = []
+                fields = None
+                for raw in raw_records:
+                    head.append(raw)
+                    fields = record_io.jsonl_fields([raw])
+                    if fields is not None:
+                        break
+                if not head:
+                    return
+                raw_records = chain(head, raw_records)
+                output_fields = (fields or list(record_io.STAT_FIELDS)) + result_fields
+
+            writer = record_io.RecordWriter(target, output_format, output_fields)
+            writer.write_header()
+
+            job = (self.method, input_format, input_fields, output_format, output_fields,
+                   self.interval)
+            chunks = record_io.iter_chunks(raw_records, self.chunk_size)
+            for text, status in self._map_chunks(job, chunks):
+                if status.any():
+                    self._reject(status, rejects)
+                target.write(text)
+                self.rows += len(status)
+            writer.flush()
+
+    def _reject(self, status, rejects):
+        """记录一块中未通过校验的行（strict 模式下中止）"""
+        rows = [{'row': self.rows + int(row), 'errors': describe(int(status[row]))}
+                for row in status.nonzero()[0].tolist()]
+        if self.strict:
+            raise ValidationError(rows)
+        self.rejected += len(rows)
+        for item in rows:
+            for error in item['errors']:
+                self.reject_counts[error] = self.reject_counts.get(error, 0) + 1
+        if rejects is not None:
+            rejects.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in rows)
+
+    def _map_chunks(self, job: tuple, chunks):
+        """按输入顺序产出每块的 (输出文本, 校验状态位)（单进程实现）"""
+        for chunk in chunks:
+            yield rate_raw_chunk(chunk, job, self.store)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="rate", description="CS2 Rating 批量计算（无界面模式）")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    parser.add_argument("-o", "--output", default="-",
+                        help="输出文件，'-' 表示标准输出")
+    parser.add_argument("-m", "--method", default="composite",
+                        choices=default_registry().ids(),
+                        help="计算方法（由 models/formulas.json 定义）")
+    parser.add_argument("--input-format", choices=record_io.FORMATS,
+                        help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--output-format", choices=record_io.FORMATS,
+                        help="输出格式（默认按扩展名判断，否则与输入一致）")
+    parser.add_argument("--chunk-size", type=int, default=8192,
+                        help="每块处理的行数")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="并行进程数（1 表示单进程）")
+    parser.add_argument("--rejects", help="未通过校验的行的报告文件 (JSONL)")
+    parser.add_argument("--strict", action="store_true",
+                        help="遇到未通过校验的行时中止（默认输出空评分并继续）")
+    parser.add_argument("--store", help="结果库目录：只计算库中没有的行并保存新结果（仅单进程）")
+    parser.add_argument("--interval", action="store_true",
+                        help="追加评分的 5%%/50%%/95%% 分位数（按回合重采样）")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                        help="置信区间的每行重采样次数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED,
+                        help="置信区间的随机数种子（同一种子结果可复现）")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.workers > 1:
+            from controllers.parallel_engine import ParallelRatingEngine
+            controller = ParallelRatingEngine(args.method, args.chunk_size, args.workers,
+                                              strict=args.strict)
+        else:
+            controller = BatchController(args.method, args.chunk_size, args.strict)
+        if args.store:
+            if args.workers > 1:
+                raise ValueError("--store 只支持单进程（-j 1）")
+            controller.store = ResultStore(args.store)
+        if args.interval:
+            if args.samples <= 0:
+                raise ValueError("--samples 必须大于0")
+            controller.interval = (args.samples, args.seed)
+        try:
+            controller.run(args.input, args.output,
+                           args.input_format, args.output_format, args.rejects)
+        finally:
+            if controller.store is not None:
+                controller.store.close()
+    except (OSError, ValueError) as e:
+        print(f"[rate] {str(e)}", file=sys.stderr)
+        return 2
+    if controller.store is not None:
+        store = controller.store
+        print(f"[rate] 结果库命中 {store.hits:,} 行，新计算 {store.misses:,} 行", file=sys.stderr)
+    if controller.rejected:
+        counts = ', '.join(f"{error} {count:,}" for error, count in controller.reject_counts.items())
+        print(f"[rate] {controller.rejected:,}/{controller.rows:,} 行未通过校验，未计算评分（{counts}）",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from models import instrumentation
+from models.formula_registry import default_registry
+from models.record_io import STAT_FIELDS
+from models.validation import validate
+from models import record_io
+
+
+class _BulkTaskSignals(QObject):
+    """批量评分任务的信号"""
+    # (代号, 文本列名, 文本列, 统计列, 评分, 校验状态位, 进度0-1)
+    chunk_ready = pyqtSignal(int, object, object, object, object, object, float)
+    # (代号, 已评分行数, 未通过校验的行数, 是否被取消)
+    finished = pyqtSignal(int, int, int, bool)
+    failed = pyqtSignal(int, str)
+
+
+class _BulkRatingTask(QRunnable):
+    """在线程池中分块读取、解析并向量化计算整个文件"""
+
+    def __init__(self, generation: int, path: str, method_id: str,
+                 chunk_size: int, cancel_event: threading.Event):
+        super().__init__()
+        self.generation = generation
+        self.path = path
+        self.method_id = method_id
+        self.chunk_size = chunk_size
+        self.cancel_event = cancel_event
+        self.signals = _BulkTaskSignals()
+
+    def run(self):
+        rows = rejected = 0
+        try:
+            formula = default_registry().get(self.method_id)
+            fmt = record_io.detect_format(self.path)
+            total = max(1, os.path.getsize(self.path))
+            consumed = 0
+            with record_io.open_input(self.path) as source:
+                fieldnames = record_io.read_csv_header(source) if fmt == 'csv' else None
+                text_fields = None
+                raw_records = record_io.iter_raw_records(source, fmt)
+                for chunk in record_io.iter_chunks(raw_records, self.chunk_size):
+                    if self.cancel_event.is_set():
+                        break
+                    # 无法解析的行（坏单元格、不是对象的 JSONL 行）记为 UNPARSEABLE，不中止导入
+                    unparseable = set()
+                    records = record_io.parse_raw_records(chunk, fmt, fieldnames, unparseable)
+                    if text_fields is None:
+                        # 统计字段之外的列（如选手名、队伍）作为文本列显示
+                        # （JSONL 取第一条能解析的记录的字段）
+                        names = fieldnames or next(filter(None, records), [])
+                        text_fields = [name for name in names
+                                       if name not in STAT_FIELDS and name is not None]
+                    stat_columns = record_io.records_to_columns(records, unparseable)
+                    # 只计算通过校验的行，其余行不给出评分（表格中显示为空）
+                    report = validate(stat_columns, unparseable)
+                    ratings = np.full(len(records), np.nan)
+                    if report.ok:
+                        ratings = formula.vector(stat_columns)
+                    elif report.valid.any():
+                        ratings[report.valid] = formula.vector(
+                            {field: values[report.valid]
+                             for field, values in stat_columns.items()})
+                    rejected += len(records) - int(np.count_nonzero(report.valid))
+                    text_columns = {field: [record.get(field, '') for record in records]
+                                    for field in text_fields}
+                    consumed += sum(map(len, chunk))
+                    rows += len(records)
+                    self.signals.chunk_ready.emit(self.generation, text_fields, text_columns,
+                                                  stat_columns, ratings, report.status,
+                                                  consumed / total)
+        except Exception as e:
+            instrumentation.record_error("BulkRatingController.import_file", e)
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, rows, rejected, self.cancel_event.is_set())
+
+
+class BulkRatingController:
+    """批量评分控制器：后台分块计算，结果逐块填入表格模型"""
+
+    CHUNK_SIZE = 5000
+
+    def __init__(self, view):
+        self.view = view
+        self.model = view.model
+        # 每次导入递增代号，丢弃已取消/被替换的导入发来的数据
+        self._generation = 0
+        self._cancel_event = None
+        self._tasks = {}
+        self._fields_ready = False
+        self._thread_pool = QThreadPool()
+        self._thread_pool.setMaxThreadCount(1)
+        self._connect_signals()
+
+    def _connect_signals(self):
+        """连接信号与槽"""
+        self.view.import_btn.clicked.connect(self.import_file)
+        self.view.cancel_btn.clicked.connect(self.cancel)
+        self.view.filter_changed.connect(self.apply_filter)
+
+    def import_file(self):
+        """选择文件并开始导入"""
+        path = self.view.ask_input_path()
+        if path:
+            self.start(path)
+
+    def start(self, path: str):
+        """开始后台导入与评分（会取消正在进行的导入）"""
+        self.cancel()
+        self._generation += 1
+        self._cancel_event = threading.Event()
+        self._fields_ready = False
+        self.model.reset_fields([])
+
+        task = _BulkRatingTask(self._generation, path, self.view.get_selected_method_id(),
+                               self.CHUNK_SIZE, self._cancel_event)
+        task.signals.chunk_ready.connect(self._on_chunk)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        # 保留任务及其信号对象的引用，直到任务结束
+        self._tasks[self._generation] = task
+        self.view.set_running(True)
+        self.view.set_progress(0)
+        self.view.show_status(f"正在导入 {os.path.basename(path)} ...")
+        self._thread_pool.start(task)
+
+    def cancel(self):
+        """取消当前导入（已完成的块保留在表格中）"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def apply_filter(self):
+        """按视图中的过滤条件过滤表格"""
+        text, min_rating = self.view.get_filter()
+        self.model.set_filter(text, min_rating)
+        self._show_counts()
+
+    def _on_chunk(self, generation: int, text_fields, text_columns, stat_columns,
+                  ratings, status, progress: float):
+        """一块计算完成（界面线程）：追加到模型"""
+        if generation != self._generation:
+            return
+        if not self._fields_ready:
+            self.model.reset_fields(text_fields)
+            self._fields_ready = True
+            text, min_rating = self.view.get_filter()
+            if text or min_rating is not None:
+                self.model.set_filter(text, min_rating)
+        self.model.append_chunk(text_columns, stat_columns, ratings, status)
+        self.view.set_progress(progress)
+        self._show_counts("已评分")
+
+    def _on_finished(self, generation: int, rows: int, rejected: int, cancelled: bool):
+        self._tasks.pop(generation, None)
+        if generation != self._generation:
+            return
+        self.view.set_running(False)
+        if not cancelled:
+            self.view.set_progress(1.0)
+        note = f"（{rejected:,} 行数据无效，未计算评分）" if rejected else ""
+        self._show_counts("已取消，保留" if cancelled else "完成", note)
+
+    def _on_failed(self, generation: int, message: str):
+        self._tasks.pop(generation, None)
+        if generation != self._generation:
+            return
+        self.view.set_running(False)
+        self.view.show_status(f"导入失败: {message}")
+
+    def _show_counts(self, prefix: str = "显示", note: str = ""):
+        """状态栏显示行数（过滤后/总数）"""
+        total = self.model.total_count()
+        visible = self.model.visible_count()
+        if visible == total:
+            self.view.show_status(f"{prefix} {total:,} 行{note}")
+        else:
+            self.view.show_status(f"{prefix} {total:,} 行，过滤后显示 {visible:,} 行{note}")
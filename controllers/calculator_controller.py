@@ -1,248 +1,176 @@
 from PyQt5.QtWidgets import QMessageBox
-from models.rating_calculator import RatingCalculator
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from models import instrumentation
+from models.formula_registry import default_registry
+from models import report
+from models.validation import check_stats
+
+
+class _RatingTaskSignals(QObject):
+    """后台计算任务的信号（QRunnable本身不能发信号）"""
+    finished = pyqtSignal(int, float, str, str, object)
+    failed = pyqtSignal(int, str)
+
+
+class _RatingTask(QRunnable):
+    """在线程池中执行一次评分计算与详细数据格式化"""
+
+    def __init__(self, controller, generation: int, inputs: dict,
+                 method_id: str, method_name: str, interval: bool = False):
+        super().__init__()
+        self.controller = controller
+        self.generation = generation
+        self.inputs = inputs
+        self.method_id = method_id
+        self.method_name = method_name
+        self.interval = interval
+        self.signals = _RatingTaskSignals()
+
+    def run(self):
+        try:
+            rating, details = self.controller.compute(self.inputs, self.method_id)
+            interval = (self.controller.compute_interval(self.inputs, self.method_id)
+                        if self.interval else None)
+        except ValueError as e:
+            # 未通过校验：界面内联显示，不计为错误
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        except Exception as e:
+            instrumentation.record_error("CalculatorController.calculate_live", e)
+            self.signals.failed.emit(self.generation, f"计算失败: {e}")
+            return
+        self.signals.finished.emit(self.generation, rating, details, self.method_name, interval)
 
 
 class CalculatorController:
     """计算器控制器，处理业务逻辑"""
 
+    # 实时计算的防抖间隔（毫秒）：连续输入只在停顿后计算一次
+    LIVE_DEBOUNCE_MS = 150
+
     def __init__(self, view):
         self.view = view
+        # 实时计算：每次提交递增代号，只接受最新一次提交的结果
+        self._generation = 0
+        self._pending_tasks = {}
+        self._thread_pool = QThreadPool()
+        self._thread_pool.setMaxThreadCount(1)
+        self._debounce_timer = QTimer()
+        self._debounce_timer.setSingleShot(True)
+        self._debounce_timer.setInterval(self.LIVE_DEBOUNCE_MS)
+        self._debounce_timer.timeout.connect(self.calculate_live)
+        self._bulk_window = None
+        self._bulk_controller = None
         self._connect_signals()
 
     def _connect_signals(self):
         """连接信号与槽"""
         self.view.calculate_btn.clicked.connect(self.calculate_rating)
         self.view.about_btn.clicked.connect(self.show_about)
+        self.view.bulk_btn.clicked.connect(self.show_bulk_window)
+        self.view.inputs_changed.connect(self._schedule_live_calculation)
+        self.view.live_checkbox.toggled.connect(self._schedule_live_calculation)
+        self.view.interval_checkbox.toggled.connect(self._schedule_live_calculation)
 
     def calculate_rating(self):
         """根据选择的方法计算Rating"""
         try:
-            inputs = self.view.get_input_values()
-            method = self.view.get_selected_method()
-
-            # 验证输入
-            if inputs['rounds'] <= 0:
-                raise ValueError("回合数必须大于0")
-
-            # 准备基础参数
-            base_params = {
-                'kills': inputs['kills'],
-                'deaths': inputs['deaths'],
-                'assists': inputs['assists'],
-                'rounds': inputs['rounds'],
-                'mvps': inputs['mvps'],
-                'adr': inputs['adr'],
-                'hs_percent': inputs['hs_percent'],
-                'kills_3k': inputs['kills_3k'],
-                'kills_4k': inputs['kills_4k'],
-                'kills_5k': inputs['kills_5k'],
-                'rws': inputs['rws']
-            }
-
-            # 根据选择的方法计算
-            if method == "综合评分 (三种算法平均)":
-                rating = self._calculate_composite_rating(inputs)
-                details = self.prepare_all_details(inputs)
-            elif method == "Rating 1.0 (基础算法)":
-                rating = RatingCalculator.calculate_rating_1_0(
-                    inputs['kills'],
-                    inputs['deaths'],
-                    inputs['rounds'],
-                    inputs['kills_3k'],
-                    inputs['kills_4k'],
-                    inputs['kills_5k']
-                )
-                details = self.prepare_rating1_details(inputs)
-            elif method == "Rating 2.0 (HLTV算法)":
-                rating = RatingCalculator.calculate_rating_2_0(
-                    kills=inputs['kills'],
-                    deaths=inputs['deaths'],
-                    assists=inputs['assists'],
-                    rounds=inputs['rounds'],
-                    adr=inputs['adr'],
-                    kills_3k=inputs['kills_3k'],
-                    kills_4k=inputs['kills_4k'],
-                    kills_5k=inputs['kills_5k']
-                )
-                details = self.prepare_rating2_details(inputs)
-            else:  # 自定义算法
-                rating = RatingCalculator.calculate_custom_rating(**base_params)
-                details = self.prepare_custom_details(inputs)
-
-            # 更新视图
-            self.view.update_results(rating, details, method)
-
+            inputs, method_id, method_name = self._read_inputs()
+            rating, details = self.compute(inputs, method_id)
+            interval = (self.compute_interval(inputs, method_id)
+                        if self.view.is_interval_mode() else None)
+        except ValueError as e:
+            # 输入不完整或未通过校验（ValidationError）：内联显示具体问题
+            self.view.show_validation_error(str(e))
+            return
         except Exception as e:
-            QMessageBox.warning(self.view, "输入错误", str(e))
-            import traceback
-            traceback.print_exc()
-
-    def _calculate_composite_rating(self, inputs: dict) -> float:
-        """计算综合评分"""
-        rating1 = RatingCalculator.calculate_rating_1_0(
-            inputs['kills'],
-            inputs['deaths'],
-            inputs['rounds'],
-            inputs['kills_3k'],
-            inputs['kills_4k'],
-            inputs['kills_5k']
-        )
-
-        rating2 = RatingCalculator.calculate_rating_2_0(
-            kills=inputs['kills'],
-            deaths=inputs['deaths'],
-            assists=inputs['assists'],
-            rounds=inputs['rounds'],
-            adr=inputs['adr'],
-            kills_3k=inputs['kills_3k'],
-            kills_4k=inputs['kills_4k'],
-            kills_5k=inputs['kills_5k']
-        )
-
-        custom = RatingCalculator.calculate_custom_rating(
-            kills=inputs['kills'],
-            deaths=inputs['deaths'],
-            assists=inputs['assists'],
-            rounds=inputs['rounds'],
-            mvps=inputs['mvps'],
-            adr=inputs['adr'],
-            hs_percent=inputs['hs_percent'],
-            rws=inputs['rws']
-        )
-
-        return (rating1 + rating2 + custom) / 3
-
-    def prepare_all_details(self, inputs: dict) -> str:
-        """准备综合评分的详细数据"""
-        rounds = inputs['rounds']
-        rating1 = RatingCalculator.calculate_rating_1_0(
-            inputs['kills'],
-            inputs['deaths'],
-            inputs['rounds'],
-            inputs['kills_3k'],
-            inputs['kills_4k'],
-            inputs['kills_5k']
-        )
-
-        rating2 = RatingCalculator.calculate_rating_2_0(
-            kills=inputs['kills'],
-            deaths=inputs['deaths'],
-            assists=inputs['assists'],
-            rounds=inputs['rounds'],
-            adr=inputs['adr'],
-            kills_3k=inputs['kills_3k'],
-            kills_4k=inputs['kills_4k'],
-            kills_5k=inputs['kills_5k']
-        )
-
-        custom = RatingCalculator.calculate_custom_rating(
-            kills=inputs['kills'],
-            deaths=inputs['deaths'],
-            assists=inputs['assists'],
-            rounds=inputs['rounds'],
-            mvps=inputs['mvps'],
-            adr=inputs['adr'],
-            hs_percent=inputs['hs_percent'],
-            rws=inputs['rws']
-        )
-
-        return (
-            f"综合评分 (三种算法平均)\n"
-            f"Rating 1.0: {rating1:.2f}\n"
-            f"Rating 2.0: {rating2:.2f}\n"
-            f"自定义算法: {custom:.2f}\n\n"
-            f"详细统计:\n"
-            f"KPR: {inputs['kills'] / rounds:.2f}\n"
-            f"DPR: {inputs['deaths'] / rounds:.2f}\n"
-            f"APR: {inputs['assists'] / rounds:.2f}\n"
-            f"ADR: {inputs['adr']:.1f}\n"
-            f"爆头率: {inputs['hs_percent']:.1f}%\n"
-            f"3杀回合: {inputs['kills_3k']}\n"
-            f"4杀回合: {inputs['kills_4k']}\n"
-            f"5杀回合: {inputs['kills_5k']}"
-        )
-
-    def prepare_rating1_details(self, inputs: dict) -> str:
-        """准备Rating 1.0的详细数据"""
-        rounds = max(1, inputs['rounds'])
-        kpr = inputs['kills'] / rounds
-        spr = (rounds - inputs['deaths']) / rounds
-        rmk = min(
-            (inputs['kills_3k'] * 2.0 + inputs['kills_4k'] * 3.0 + inputs['kills_5k'] * 4.0) / rounds,
-            1.5
-        )
-
-        return (
-            f"Rating 1.0 详细计算:\n"
-            f"KPR (每回合击杀): {kpr:.2f}\n"
-            f"SPR (每回合存活率): {spr:.2f}\n"
-            f"RMK (多杀回合价值): {rmk:.2f}\n\n"
-            f"公式: (KPR + 0.7*SPR + RMK) / 2.7\n\n"
-            f"多杀统计:\n"
-            f"3杀回合: {inputs['kills_3k']}\n"
-            f"4杀回合: {inputs['kills_4k']}\n"
-            f"5杀回合: {inputs['kills_5k']}"
-        )
-
-    def prepare_rating2_details(self, inputs: dict) -> str:
-        """准备Rating 2.0的详细数据"""
-        rounds = inputs['rounds']
-        kpr = inputs['kills'] / rounds
-        dpr = inputs['deaths'] / rounds
-        kast = RatingCalculator.BaseRatingCalculator.calculate_kast(
-            inputs['kills'],
-            inputs['deaths'],
-            inputs['assists'],
-            rounds
-        )
-        impact = RatingCalculator.BaseRatingCalculator.calculate_impact(
-            inputs['kills_3k'],
-            inputs['kills_4k'],
-            inputs['kills_5k'],
-            rounds
-        )
-
-        return (
-            f"Rating 2.0 (HLTV算法) 详细计算:\n"
-            f"KPR: {kpr:.4f}\n"
-            f"DPR: {dpr:.4f}\n"
-            f"Impact: {impact:.4f}\n"
-            f"ADR: {inputs['adr']:.1f}\n"
-            f"KAST: {kast:.1f}%\n\n"
-            f"公式: 0.3591*KPR - 0.5329*DPR + 0.2372*Impact + \n"
-            f"0.0032*ADR + 0.0073*KAST + 0.1587\n\n"
-            f"多杀统计:\n"
-            f"3杀回合: {inputs['kills_3k']}\n"
-            f"4杀回合: {inputs['kills_4k']}\n"
-            f"5杀回合: {inputs['kills_5k']}"
-        )
-
-    def prepare_custom_details(self, inputs: dict) -> str:
-        """准备自定义算法的详细数据"""
-        rounds = inputs['rounds']
-        kpr = inputs['kills'] / rounds
-        dpr = inputs['deaths'] / rounds
-        apr = inputs['assists'] / rounds
-        mvp_rate = inputs['mvps'] / rounds
-        rws_factor = RatingCalculator.BaseRatingCalculator.calculate_rws_factor(inputs['rws'])
-
-        return (
-            f"自定义算法详细计算:\n"
-            f"KPR: {kpr:.2f}\n"
-            f"DPR: {dpr:.2f}\n"
-            f"APR: {apr:.2f}\n"
-            f"ADR贡献: {inputs['adr'] / 100:.2f}\n"
-            f"爆头率贡献: {inputs['hs_percent'] / 100:.2f}\n"
-            f"MVP率: {mvp_rate:.2f}\n"
-            f"RWS调整系数: {rws_factor:.2f}\n\n"
-            f"公式: 0.6*KPR + 0.2*(1-DPR) + 0.1*APR + \n"
-            f"0.05*(ADR/100) + 0.05*(HS%/100) + 0.05*MVP率\n"
-            f"然后乘以RWS调整系数\n\n"
-            f"多杀统计:\n"
-            f"3杀回合: {inputs['kills_3k']}\n"
-            f"4杀回合: {inputs['kills_4k']}\n"
-            f"5杀回合: {inputs['kills_5k']}"
-        )
+            instrumentation.record_error("CalculatorController.calculate_rating", e)
+            self.view.show_validation_error(f"计算失败: {e}")
+            return
+
+        # 作废尚未返回的实时计算结果，避免覆盖本次结果
+        self._generation += 1
+        # 更新视图
+        self.view.update_results(rating, details, method_name, interval)
+
+    def compute(self, inputs: dict, method_id: str) -> tuple:
+        """计算评分与详细数据（不访问界面，可在工作线程中调用）
+
+        输入先经 models.validation 校验，不通过时抛出 ValidationError（ValueError 子类）。
+        """
+        # 验证输入（与批量计算使用同一校验规则）
+        check_stats(inputs)
+
+        # 评分与中间值由注册表中编译好的公式一次算出，详细数据只由该结果格式化
+        formula = default_registry().get(method_id)
+        result = formula.evaluate(**inputs)
+        return result.rating, report.details(formula, result)
+
+    def compute_interval(self, inputs: dict, method_id: str) -> tuple:
+        """评分的 (5%, 50%, 95%) 分位数（按回合重采样，固定种子，同一输入结果不变）"""
+        # 重采样依赖 numpy，只在开启置信区间时导入，不影响启动时间
+        from models.uncertainty import rating_interval
+        return rating_interval(method_id, **inputs)
+
+    def _read_inputs(self) -> tuple:
+        """在界面线程中读取并校验输入，返回 (输入值, 方法ID, 方法名称)"""
+        invalid = self.view.invalid_fields()
+        if invalid:
+            raise ValueError(f"输入不完整: {', '.join(invalid)}")
+        return (self.view.get_input_values(), self.view.get_selected_method_id(),
+                self.view.get_selected_method())
+
+    def _schedule_live_calculation(self, *args):
+        """实时模式下输入变化：重新开始防抖计时"""
+        if self.view.is_live_mode():
+            self._debounce_timer.start()
+        else:
+            self._debounce_timer.stop()
+
+    def calculate_live(self):
+        """防抖结束后提交一次后台计算"""
+        self._generation += 1
+        try:
+            inputs, method_id, method_name = self._read_inputs()
+        except ValueError as e:
+            self.view.show_validation_error(str(e))
+            return
+
+        # 尚未开始执行的旧任务直接从队列中撤回
+        for generation, task in list(self._pending_tasks.items()):
+            if self._thread_pool.tryTake(task):
+                del self._pending_tasks[generation]
+
+        task = _RatingTask(self, self._generation, inputs, method_id, method_name,
+                           self.view.is_interval_mode())
+        task.signals.finished.connect(self._on_live_result)
+        task.signals.failed.connect(self._on_live_error)
+        # 保留任务及其信号对象的引用，直到结果返回
+        self._pending_tasks[self._generation] = task
+        self._thread_pool.start(task)
+
+    def _on_live_result(self, generation: int, rating: float, details: str, method: str,
+                        interval):
+        """后台计算完成（界面线程）：丢弃过期结果"""
+        self._pending_tasks.pop(generation, None)
+        if generation == self._generation:
+            self.view.update_results(rating, details, method, interval)
+
+    def _on_live_error(self, generation: int, message: str):
+        """后台计算失败（界面线程）：内联显示错误"""
+        self._pending_tasks.pop(generation, None)
+        if generation == self._generation:
+            self.view.show_validation_error(message)
+
+    def show_bulk_window(self):
+        """打开批量评分窗口（首次打开时创建）"""
+        if self._bulk_window is None:
+            from views.bulk_window import BulkRatingWindow
+            from controllers.bulk_controller import BulkRatingController
+            self._bulk_window = BulkRatingWindow(self.view)
+            self._bulk_controller = BulkRatingController(self._bulk_window)
+        self._bulk_window.show()
+        self._bulk_window.raise_()
 
     def show_about(self):
         """显示关于信息"""
@@ -264,4 +192,7 @@ class CalculatorController:
             "注意: 这不是官方工具，计算结果仅供参考。"
             "由于单场比赛RWS，IMPACT, KAST都难以计算，数据仅供参考"
         )
-        QMessageBox.about(self.view, "关于CS2 Rating计算器", about_text)
\ No newline at end of file
+        QMessageBox.about(self.view, "关于CS2 Rating计算器", about_text)
+
+
+instrumentation.instrument(CalculatorController, 'compute', 'compute_interval')
@@ -0,0 +1,92 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from models.calibration import FEATURES, CustomCalibrator
+from models.formula_registry import FORMULAS_ENV
+from models.validation import validate
+from models import record_io
+
+
+def calibrate_file(calibrator: CustomCalibrator, input_path: str, target: str,
+                   input_format: str = None, chunk_size: int = 65536) -> tuple:
+    """流式读取带标签的比赛数据并累加到校准器，返回 (读取的行数, 未通过校验的行数)
+
+    未通过校验的行与目标为空的行一样不参与拟合（不把不可能的数据当作样本）。
+    """
+    fmt = input_format or record_io.detect_format(input_path)
+    rows = skipped = 0
+    with record_io.open_input(input_path) as source:
+        for records in record_io.iter_chunks(record_io.iter_records(source, fmt), chunk_size):
+            if target not in records[0]:
+                raise ValueError(f"输入中没有目标列: {target}")
+            labels = np.array([_parse_target(record.get(target)) for record in records])
+            unparseable = set()
+            columns = record_io.records_to_columns(records, unparseable)
+            valid = validate(columns, unparseable).valid
+            if not valid.all():
+                skipped += int((~valid).sum())
+                labels[~valid] = np.nan
+            calibrator.update(columns, labels)
+            rows += len(records)
+    return rows, skipped
+
+
+def _parse_target(value) -> float:
+    """目标列的值（空值为 NaN，该行不参与拟合）"""
+    return float('nan') if value in (None, '') else float(value)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="calibrate", description="由带标签的比赛数据校准自定义算法系数")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    parser.add_argument("-t", "--target", required=True, help="目标评分列")
+    parser.add_argument("-o", "--output", default="-",
+                        help=f"公式定义输出文件（可通过 {FORMULAS_ENV} 加载），'-' 表示标准输出")
+    parser.add_argument("--base", default="custom", help="作为起点的自定义算法公式ID")
+    parser.add_argument("--id", help="输出公式的ID（默认与 --base 相同，即替换原公式）")
+    parser.add_argument("--name", help="输出公式的显示名称")
+    parser.add_argument("--version", type=int, help="输出公式的版本号（默认原版本+1）")
+    parser.add_argument("-a", "--alpha", type=float, action="append",
+                        help="岭回归强度（可重复，多个候选时按交叉验证选择；默认0）")
+    parser.add_argument("-k", "--folds", type=int, default=1, help="交叉验证折数")
+    parser.add_argument("--input-format", choices=record_io.FORMATS,
+                        help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="每块读取的行数")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        calibrator = CustomCalibrator(args.base, args.folds)
+        rows, skipped = calibrate_file(calibrator, args.input, args.target, args.input_format,
+                                       args.chunk_size)
+        result = calibrator.fit(args.alpha or (0.0,), args.version, args.id, args.name)
+        with record_io.open_output(args.output) as target:
+            json.dump(result.document(), target, ensure_ascii=False, indent=2)
+            target.write('\n')
+    except (OSError, ValueError) as e:
+        print(f"[calibrate] {str(e)}", file=sys.stderr)
+        return 2
+
+    if skipped:
+        print(f"[calibrate] {skipped:,} 行未通过校验，不参与拟合", file=sys.stderr)
+    print(f"[calibrate] 读取 {rows:,} 行，拟合 {result.rows:,} 行，alpha={result.alpha:g}，"
+          f"RMSE={result.rmse:.5f}，R²={result.r2:.4f}", file=sys.stderr)
+    for alpha, error in result.cv_rmse.items():
+        print(f"[calibrate]   交叉验证 alpha={alpha:g}: RMSE={error:.5f}", file=sys.stderr)
+    weights = ', '.join(f"{name}={result.weights[name]:.4f}" for name in FEATURES)
+    print(f"[calibrate] {weights}, offset={result.offset:.4f}, rws_base={result.rws_base:.4f}, "
+          f"rws_divisor={1 / result.rws_slope:.3f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
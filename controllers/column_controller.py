@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from models.column_store import ColumnStoreReader, ColumnStoreWriter
+from models.formula_registry import default_registry
+from models.rating_calculator import RatingCalculator
+from models import record_io
+
+
+def pack(input_path: str, output_path: str, input_format: str = None,
+         block_rows: int = 65536) -> int:
+    """把 CSV/JSONL 记录写入列式文件，返回行数
+
+    先写临时文件，成功后才替换输出文件：任一行无法解析时不留下不完整的文件，也不影响已有的输出文件。
+    """
+    fmt = input_format or record_io.detect_format(input_path)
+    temp_path = output_path + '.tmp'
+    try:
+        with record_io.open_input(input_path) as source, \
+                ColumnStoreWriter(temp_path, block_rows) as writer:
+            for row, record in enumerate(record_io.iter_records(source, fmt)):
+                try:
+                    writer.append(record)
+                except ValueError as e:
+                    raise ValueError(f"第 {row} 行: {e}") from e
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return writer.row_count
+
+
+def rate_columns(input_path: str, output_path: str, method: str = "composite",
+                 output_format: str = None, batch_rows: int = 65536) -> tuple:
+    """按批计算列式文件中每行的评分并写出 rating/tier，返回 (行数, 未通过校验的行数)
+
+    内存占用只与批大小有关；未通过校验的行 rating/tier 为空。
+    """
+    fmt = output_format or record_io.detect_format(output_path)
+    rows = rejected = 0
+    with ColumnStoreReader(input_path) as reader, \
+            record_io.open_output(output_path) as target:
+        writer = record_io.RecordWriter(target, fmt, ['rating', 'tier'])
+        writer.write_header()
+        for ratings in reader.rate(method, batch_rows):
+            rejected += int(np.isnan(ratings).sum())
+            rows += len(ratings)
+            writer.write_rows(
+                {'rating': None, 'tier': None} if rating != rating else
+                {'rating': rating, 'tier': RatingCalculator.get_rating_description(rating)[0]}
+                for rating in ratings.tolist())
+        writer.flush()
+    return rows, rejected
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="columns", description="CS2 Rating 列式比赛数据文件（内存映射，按批计算）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack_command = commands.add_parser("pack", help="把 CSV/JSONL 记录转换为列式文件")
+    pack_command.add_argument("input", help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    pack_command.add_argument("-o", "--output", required=True, help="列式文件")
+    pack_command.add_argument("--input-format", choices=record_io.FORMATS,
+                              help="输入格式（默认按扩展名判断）")
+    pack_command.add_argument("--block-rows", type=int, default=65536, help="每块的行数")
+
+    rate_command = commands.add_parser("rate", help="按批计算列式文件中每行的评分")
+    rate_command.add_argument("input", help="列式文件")
+    rate_command.add_argument("-o", "--output", default="-",
+                              help="输出文件（每行 rating/tier），'-' 表示标准输出")
+    rate_command.add_argument("-m", "--method", default="composite",
+                              choices=default_registry().ids(),
+                              help="计算方法（由 models/formulas.json 定义）")
+    rate_command.add_argument("--output-format", choices=record_io.FORMATS,
+                              help="输出格式（默认按扩展名判断）")
+    rate_command.add_argument("--batch-rows", type=int, default=65536, help="每批计算的行数")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "pack":
+            rows = pack(args.input, args.output, args.input_format, args.block_rows)
+            print(f"[columns] 写入 {rows:,} 行", file=sys.stderr)
+        else:
+            rows, rejected = rate_columns(args.input, args.output, args.method,
+                                          args.output_format, args.batch_rows)
+            message = f"[columns] 输出 {rows:,} 行"
+            if rejected:
+                message += f"，{rejected:,} 行未通过校验，未计算评分"
+            print(message, file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"[columns] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import argparse
+import json
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from controllers.batch_controller import RESULT_FIELDS, rate_raw_chunk
+from models import instrumentation
+from models.formula_registry import default_registry
+from models.job_spool import (DEFAULT_LEASE_TTL, DEFAULT_UNIT_SIZE, JobSpool,
+                              default_worker_id)
+from models.validation import describe
+from models import record_io
+
+
+def init_job(spool_path: str, inputs: list, method: str = "composite", input_format: str = None,
+             output_format: str = None, unit_size: int = DEFAULT_UNIT_SIZE) -> JobSpool:
+    """把输入切分为作业目录中的工作单元（多个CSV输入的表头必须一致）"""
+    if unit_size <= 0:
+        raise ValueError("unit_size 必须大于0")
+    input_format = input_format or record_io.detect_format(inputs[0])
+    settings = {
+        'method': method, 'fingerprint': default_registry().get(method).fingerprint,
+        'input_format': input_format, 'output_format': output_format or input_format,
+        'unit_size': unit_size, 'input_fields': None, 'output_fields': None,
+    }
+
+    # 输入/输出列在读到表头（JSONL 为第一条能解析为对象的记录）时才确定；
+    # JobSpool.create 读完所有单元后才写入 settings，因此这里边读边补上
+    def raw_records():
+        for path in inputs:
+            with record_io.open_input(path) as source:
+                if input_format == 'csv':
+                    header = record_io.read_csv_header(source)
+                    if settings['input_fields'] is None:
+                        settings['input_fields'] = header
+                        settings['output_fields'] = header + list(RESULT_FIELDS)
+                    elif header != settings['input_fields']:
+                        raise ValueError(f"{path} 的表头与第一个输入不一致")
+                yield from record_io.iter_raw_records(source, input_format)
+
+    # JSONL 与 rate 一致：取第一条能解析为对象的记录的字段，全部无法解析时使用统计字段
+    def units():
+        empty = True
+        for chunk in record_io.iter_chunks(raw_records(), unit_size):
+            empty = False
+            if settings['output_fields'] is None:
+                fields = record_io.jsonl_fields(chunk)
+                if fields is not None:
+                    settings['output_fields'] = fields + list(RESULT_FIELDS)
+            yield chunk
+        if settings['output_fields'] is None and not empty:
+            settings['output_fields'] = list(record_io.STAT_FIELDS) + list(RESULT_FIELDS)
+
+    return JobSpool.create(spool_path, settings, units())
+
+
+class JobWorker:
+    """领取并计算工作单元，直到所有单元完成（每个节点运行一个或多个）"""
+
+    def __init__(self, spool: JobSpool, worker_id: str = None, lease_ttl: float = DEFAULT_LEASE_TTL,
+                 poll: float = 1.0):
+        settings = spool.settings
+        if default_registry().get(settings['method']).fingerprint != settings['fingerprint']:
+            raise ValueError(f"本机的 {settings['method']} 公式系数与作业不一致，拒绝计算")
+        if lease_ttl <= 0:
+            raise ValueError("lease_ttl 必须大于0")
+        self.spool = spool
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.poll = poll
+        self.job = (settings['method'], settings['input_format'], settings['input_fields'],
+                    settings['output_format'], settings['output_fields'], None)
+        # 本 worker 完成的单元数与行数
+        self.units = 0
+        self.rows = 0
+
+    def run(self, stop: threading.Event = None) -> int:
+        """循环领取单元；其余单元都被其他 worker 持有时等待（其租约过期后回收），返回完成的单元数"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            lease = self.spool.claim(self.worker_id, self.lease_ttl)
+            if lease is not None:
+                self._process(lease)
+            elif all(self.spool.is_done(unit) for unit in range(self.spool.units)):
+                break
+            else:
+                stop.wait(self.poll)
+        return self.units
+
+    def _process(self, lease):
+        """计算一个单元并提交（计算期间由后台线程按 TTL 的 1/3 续约）"""
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(self.lease_ttl / 3):
+                if not self.spool.renew(lease, self.lease_ttl):
+                    # 租约已被回收：继续计算，提交的内容与其他 worker 相同
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        try:
+            thread.start()
+            with open(self.spool.unit_path(lease.unit), 'r', encoding='utf-8', newline='') as f:
+                raw_records = list(record_io.iter_raw_records(f, self.job[1]))
+            text, status = rate_raw_chunk(raw_records, self.job)
+            start = lease.unit * self.spool.settings['unit_size']
+            rejects = [{'row': start + row, 'errors': describe(int(status[row]))}
+                       for row in status.nonzero()[0].tolist()]
+            finished.set()
+            thread.join()
+            self.spool.commit(lease, text, {'rows': len(raw_records), 'rejects': rejects})
+        except BaseException as e:
+            # 中断或出错时释放租约，其他 worker 不必等到过期即可接手
+            finished.set()
+            self.spool.release(lease)
+            if isinstance(e, Exception):
+                instrumentation.record_error("JobWorker.process", e)
+            raise
+        self.units += 1
+        self.rows += len(raw_records)
+
+
+def collect(spool: JobSpool, output_path: str, rejects_path: str = None) -> tuple:
+    """按单元顺序拼接输出（所有单元完成后），返回 (行数, 未通过校验的行数)"""
+    missing = [unit for unit in range(spool.units) if not spool.is_done(unit)]
+    if missing:
+        raise ValueError(f"还有 {len(missing):,} 个单元未完成（如 {missing[0]:06d}）")
+    settings = spool.settings
+    rows = rejected = 0
+    rejects = open(rejects_path, 'w', encoding='utf-8') if rejects_path else None
+    try:
+        with record_io.open_output(output_path) as target:
+            if settings['output_fields'] is not None:
+                writer = record_io.RecordWriter(target, settings['output_format'],
+                                                settings['output_fields'])
+                writer.write_header()
+            for unit in range(spool.units):
+                with open(spool.output_path(unit), 'r', encoding='utf-8', newline='') as f:
+                    shutil.copyfileobj(f, target)
+                checkpoint = spool.checkpoint(unit)
+                rows += checkpoint['rows']
+                rejected += len(checkpoint['rejects'])
+                if rejects is not None:
+                    rejects.writelines(json.dumps(item, ensure_ascii=False) + '\n'
+                                       for item in checkpoint['rejects'])
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return rows, rejected
+
+
+def _work(spool_path: str, worker_id: str, lease_ttl: float, poll: float) -> tuple:
+    """子进程中运行一个 worker（-j 用多个本地进程模拟多个节点）"""
+    worker = JobWorker(JobSpool(spool_path), worker_id, lease_ttl, poll)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    return worker.units, worker.rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="job", description="CS2 Rating 可断点续算的批量作业（多节点共享作业目录）")
+    parser.add_argument("spool", help="作业目录（各节点共享）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="把输入切分为工作单元")
+    init.add_argument("inputs", nargs="+", help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    init.add_argument("-m", "--method", default="composite", choices=default_registry().ids(),
+                      help="计算方法（由 models/formulas.json 定义）")
+    init.add_argument("--input-format", choices=record_io.FORMATS,
+                      help="输入格式（默认按扩展名判断）")
+    init.add_argument("--output-format", choices=record_io.FORMATS,
+                      help="输出格式（默认与输入一致）")
+    init.add_argument("--unit-size", type=int, default=DEFAULT_UNIT_SIZE,
+                      help="每个工作单元的行数")
+
+    work = commands.add_parser("work", help="领取并计算工作单元，直到全部完成")
+    work.add_argument("--worker-id", help="worker 名称（默认 主机名:进程号）")
+    work.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                      help="租约有效期（秒），持有者每 1/3 有效期续约一次")
+    work.add_argument("--poll", type=float, default=1.0,
+                      help="其余单元都被占用时的等待间隔（秒）")
+    work.add_argument("-j", "--workers", type=int, default=1,
+                      help="本机启动的 worker 进程数")
+
+    commands.add_parser("status", help="显示作业进度")
+
+    collect_command = commands.add_parser("collect", help="按输入顺序拼接所有单元的输出")
+    collect_command.add_argument("-o", "--output", default="-",
+                                 help="输出文件，'-' 表示标准输出")
+    collect_command.add_argument("--rejects", help="未通过校验的行的报告文件 (JSONL)")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "init":
+            spool = init_job(args.spool, args.inputs, args.method, args.input_format,
+                             args.output_format, args.unit_size)
+            print(f"[job] {spool.settings['rows']:,} 行，切分为 {spool.units:,} 个单元",
+                  file=sys.stderr)
+            return 0
+        spool = JobSpool(args.spool)
+        if args.command == "work":
+            _run_workers(spool, args)
+        elif args.command == "status":
+            status = spool.status()
+            print(f"单元 {status['done']:,}/{status['units']:,} 完成，{status['leased']:,} 个计算中，"
+                  f"{status['expired']:,} 个租约已过期；行 {status['rows_done']:,}/{status['rows']:,}")
+            for worker in status['workers']:
+                print(f"  {worker}")
+        else:
+            rows, rejected = collect(spool, args.output, args.rejects)
+            message = f"[job] 输出 {rows:,} 行"
+            if rejected:
+                message += f"，{rejected:,} 行未通过校验，未计算评分"
+            print(message, file=sys.stderr)
+    except KeyboardInterrupt:
+        print("[job] 已中断，未完成的单元可由任意 worker 继续计算", file=sys.stderr)
+        return 130
+    except (OSError, ValueError) as e:
+        print(f"[job] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _run_workers(spool: JobSpool, args):
+    """运行 worker（-j > 1 时每个进程一个 worker），完成后报告各自的单元数"""
+    if args.workers <= 0:
+        raise ValueError("--workers 必须大于0")
+    worker_id = args.worker_id or default_worker_id()
+    started = time.perf_counter()
+    if args.workers == 1:
+        worker = JobWorker(spool, worker_id, args.lease_ttl, args.poll)
+        worker.run()
+        results = [(worker.units, worker.rows)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(_work, spool.path, f"{worker_id}/{i}",
+                                       args.lease_ttl, args.poll)
+                       for i in range(args.workers)]
+            results = [future.result() for future in futures]
+    units = sum(count for count, _ in results)
+    rows = sum(count for _, count in results)
+    print(f"[job] 本机完成 {units:,} 个单元、{rows:,} 行，用时 {time.perf_counter() - started:.1f} 秒",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
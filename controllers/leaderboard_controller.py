@@ -0,0 +1,124 @@
+import argparse
+import sys
+
+import numpy as np
+
+from models.formula_registry import default_registry
+from models.leaderboard import DEFAULT_K, DEFAULT_TIE_BREAK, Leaderboard
+from models.percentile_index import PercentileIndex
+from models.validation import validate
+from models import record_io
+
+
+def build_leaderboard(board: Leaderboard, input_path: str, method: str = "composite",
+                      input_format: str = None, chunk_size: int = 65536) -> int:
+    """把文件中的记录加入排行榜，返回读取的行数
+
+    记录带 rating 列时直接使用（如 rate/ingest 命令的输出，空评分的行跳过），
+    否则校验后按 method 计算，未通过校验的行跳过。
+    """
+    fmt = input_format or record_io.detect_format(input_path)
+    formula = default_registry().get(method)
+    rows = 0
+    with record_io.open_input(input_path) as source:
+        for records in record_io.iter_chunks(record_io.iter_records(source, fmt), chunk_size):
+            if 'rating' in records[0]:
+                columns = None
+                ratings = np.array([_parse_rating(record.get('rating')) for record in records])
+            else:
+                unparseable = set()
+                columns = record_io.records_to_columns(records, unparseable)
+                ratings = np.where(validate(columns, unparseable).valid,
+                                   formula.vector(columns), np.nan)
+            board.update(records, ratings, columns)
+            rows += len(records)
+    return rows
+
+
+def _parse_rating(value) -> float:
+    """rating 列的值（空值为 NaN，不参与排行）"""
+    return float('nan') if value in (None, '') else float(value)
+
+
+def write_tables(board: Leaderboard, output_path: str, output_format: str = None,
+                 thresholds: tuple = None) -> int:
+    """逐行写出各组排行榜（分组列、名次、原记录字段、评分、等级），返回行数"""
+    fmt = output_format or record_io.detect_format(output_path)
+    leading = board.group_names + ['rank']
+    trailing = ['rating', 'tier']
+    fields = leading + [field for field in board.record_fields()
+                        if field not in leading and field not in trailing] + trailing
+    count = 0
+    with record_io.open_output(output_path) as target:
+        writer = record_io.RecordWriter(target, fmt, fields)
+        writer.write_header()
+        for row in board.rows(thresholds):
+            writer.write_rows([row])
+            count += 1
+        writer.flush()
+    return count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="leaderboard", description="CS2 Rating 分组排行榜（流式 top-K，可合并分片结果）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="由评分结果或比赛数据文件生成排行榜")
+    build.add_argument("inputs", nargs="*", default=["-"],
+                       help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    build.add_argument("-k", type=int, default=DEFAULT_K, help="每组保留的名次数")
+    build.add_argument("-g", "--group-by", action="append", default=[],
+                       help="分组字段（可重复），如 map、team、week:date（按 ISO 周）")
+    build.add_argument("--min-rounds", type=int, default=0, help="参与排行的最少回合数")
+    build.add_argument("--tie-break", default=','.join(DEFAULT_TIE_BREAK),
+                       help="评分相同时依次比较的字段，逗号分隔，'-字段' 表示越小越靠前"
+                            "（如 rounds,-deaths；以 '-' 开头时写作 --tie-break=-deaths）")
+    build.add_argument("-m", "--method", default="composite", choices=default_registry().ids(),
+                       help="输入没有 rating 列时使用的计算方法")
+    build.add_argument("--input-format", choices=record_io.FORMATS,
+                       help="输入格式（默认按扩展名判断）")
+    build.add_argument("--shard", type=int, default=0,
+                       help="分片号（并行处理时各分片按输入顺序编号，合并后与单次处理一致）")
+
+    merge = commands.add_parser("merge", help="合并各分片 --save 写出的部分结果")
+    merge.add_argument("parts", nargs="+", help="部分结果文件")
+
+    for command in (build, merge):
+        command.add_argument("-o", "--output", default="-", help="排行榜输出文件，'-' 表示标准输出")
+        command.add_argument("--output-format", choices=record_io.FORMATS,
+                             help="输出格式（默认按扩展名判断）")
+        command.add_argument("--save", help="同时写出部分结果（供 merge 合并）")
+        command.add_argument("--index", help="按百分位索引（rank 命令）的人群分界给出等级")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "build":
+            board = Leaderboard(args.k, args.group_by, args.min_rounds,
+                                [field for field in args.tie_break.split(',') if field],
+                                args.shard)
+            for path in args.inputs:
+                build_leaderboard(board, path, args.method, args.input_format)
+        else:
+            board = Leaderboard.load(args.parts[0])
+            for path in args.parts[1:]:
+                board.merge(Leaderboard.load(path))
+        if args.save:
+            board.save(args.save)
+        thresholds = PercentileIndex.load(args.index).tier_boundaries() if args.index else None
+        count = write_tables(board, args.output, args.output_format, thresholds)
+    except (OSError, ValueError) as e:
+        print(f"[leaderboard] {str(e)}", file=sys.stderr)
+        return 2
+    print(f"[leaderboard] 读取 {board.seen:,} 行，{len(board):,} 个分组，输出 {count:,} 行",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
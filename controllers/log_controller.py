@@ -0,0 +1,120 @@
+import argparse
+import json
+import sys
+
+from models.formula_registry import default_registry
+from models.rating_calculator import RatingCalculator
+from models.record_io import STAT_FIELDS
+from models.validation import describe, stats_status
+from models import record_io, server_log
+
+# 输出行在评分输入字段之外附加的字段
+ID_FIELDS = ('match', 'map', 'player', 'steam_id')
+# errors 只出现在未通过校验的行
+RESULT_FIELDS = ('rating', 'tier', 'errors')
+
+
+class LogIngestController:
+    """服务器日志导入控制器：日志 → 选手单场数据 → 评分（不依赖PyQt5）"""
+
+    def __init__(self, method: str = "composite"):
+        self.formula = default_registry().get(method)
+
+    def rate(self, records: list) -> list:
+        """为选手记录附加评分与等级
+
+        与其他入口使用同一套校验：未通过校验的记录 rating/tier 为空，errors 给出问题。
+        """
+        rows = []
+        for record in records:
+            stats = {name: record[name] for name in STAT_FIELDS}
+            stats['kast'] = record.get('kast')
+            row = dict(record)
+            status = stats_status(stats)
+            if status:
+                row['rating'] = row['tier'] = None
+                row['errors'] = '; '.join(describe(status))
+            else:
+                rating = self.formula.scalar(**stats)
+                row['rating'] = rating
+                row['tier'] = RatingCalculator.get_rating_description(rating)[0]
+            rows.append(row)
+        return rows
+
+    def ingest(self, lines, emit_rounds: bool = False):
+        """日志行 → (事件类型, 比赛序号, 地图/回合, 评分结果行) 的生成器管道"""
+        tracker = server_log.MatchTracker()
+        events = server_log.parse_events(lines)
+        for kind, label, records in tracker.process(events, emit_rounds):
+            yield kind, tracker.matches + 1, label, self.rate(records)
+
+    def run(self, log_path: str, output_path: str, output_format: str = None):
+        """一次性导入日志文件，把每场比赛的选手评分写入输出"""
+        output_format = output_format or record_io.detect_format(output_path)
+        fields = list(ID_FIELDS) + list(STAT_FIELDS) + ['kast'] + list(RESULT_FIELDS)
+        # 先打开日志：输入有误时不创建输出文件
+        lines = server_log.iter_lines(log_path)
+        with record_io.open_output(output_path) as target:
+            writer = record_io.RecordWriter(target, output_format, fields)
+            writer.write_header()
+            for kind, match, map_name, rows in self.ingest(lines):
+                for row in rows:
+                    row['match'] = match
+                    row['map'] = map_name
+                writer.write_rows(rows)
+            writer.flush()
+
+    def follow(self, log_path: str, output_path: str, poll_interval: float = 0.5,
+               stop=None, from_end: bool = False):
+        """跟踪增长中的日志：每回合结束输出一次实时评分（JSONL）"""
+        lines = server_log.follow_lines(log_path, poll_interval, stop, from_end)
+        with record_io.open_output(output_path) as target:
+            for kind, match, label, rows in self.ingest(lines, emit_rounds=True):
+                event = {'event': kind, 'match': match, 'method': self.formula.id,
+                         'players': rows}
+                event['round' if kind == 'round' else 'map'] = label
+                target.write(json.dumps(event, ensure_ascii=False) + '\n')
+                target.flush()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="ingest", description="CS2 服务器日志导入与实时评分")
+    parser.add_argument("log", help="服务器控制台日志文件")
+    parser.add_argument("-o", "--output", default="-",
+                        help="输出文件，'-' 表示标准输出")
+    parser.add_argument("-m", "--method", default="composite",
+                        choices=default_registry().ids(),
+                        help="计算方法（由 models/formulas.json 定义）")
+    parser.add_argument("--output-format", choices=record_io.FORMATS,
+                        help="输出格式（默认按扩展名判断；跟踪模式固定为JSONL）")
+    parser.add_argument("-f", "--follow", action="store_true",
+                        help="持续跟踪日志文件，每回合结束输出实时评分")
+    parser.add_argument("--from-end", action="store_true",
+                        help="跟踪模式下从文件末尾开始（忽略已有内容）")
+    parser.add_argument("--poll-interval", type=float, default=0.5,
+                        help="跟踪模式的轮询间隔（秒）")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    controller = LogIngestController(args.method)
+    try:
+        if args.follow:
+            controller.follow(args.log, args.output, args.poll_interval,
+                              from_end=args.from_end)
+        else:
+            controller.run(args.log, args.output, args.output_format)
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"[ingest] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from controllers.batch_controller import BatchController, rate_raw_chunk
+
+
+class ParallelRatingEngine(BatchController):
+    """多进程批量计算引擎
+
+    主进程只负责切分原始记录与按序写出，解析、计算与格式化都在子进程中完成。
+    每块输出由与单进程相同的 rate_raw_chunk 生成，因此结果逐字节一致。
+    """
+
+    def __init__(self, method: str = "composite", chunk_size: int = 8192,
+                 workers: int = None, max_pending: int = None, strict: bool = False):
+        super().__init__(method, chunk_size, strict)
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers <= 0:
+            raise ValueError("workers 必须大于0")
+        # 限制同时在途的块数，保证内存占用与输入大小无关
+        self.max_pending = max_pending or self.workers * 2
+
+    def _map_chunks(self, job: tuple, chunks):
+        """并行计算各块，并按输入顺序产出 (输出文本, 校验状态位)"""
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(rate_raw_chunk, chunk, job))
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from models.formula_registry import default_registry
+from models.percentile_index import DEFAULT_TIER_QUANTILES, PercentileIndex
+from models.rating_calculator import RatingCalculator
+from models import record_io
+
+# 未指定 --key 时依次尝试的选手键字段
+KEY_FIELDS = ('steam_id', 'player')
+
+
+def build_index(index: PercentileIndex, input_path: str, method: str = "composite",
+                key: str = None, input_format: str = None, chunk_size: int = 65536) -> int:
+    """把文件中的评分加入索引，返回加入的行数
+
+    记录带 rating 列时直接使用（如 rate/ingest 命令的输出），否则按 method 计算；
+    带选手键时按选手更新（同一选手只保留最后一次评分），否则作为匿名评分加入。
+    """
+    fmt = input_format or record_io.detect_format(input_path)
+    formula = default_registry().get(method)
+    rows = 0
+    with record_io.open_input(input_path) as source:
+        for records in record_io.iter_chunks(record_io.iter_records(source, fmt), chunk_size):
+            first = records[0]
+            if 'rating' in first:
+                ratings = np.array([_parse_rating(record.get('rating')) for record in records])
+            else:
+                ratings = formula.vector(record_io.records_to_columns(records))
+            field = key or next((name for name in KEY_FIELDS if first.get(name)), None)
+            players = [str(record.get(field, '')) for record in records] if field else None
+            index.extend(ratings, players)
+            rows += len(records)
+    return rows
+
+
+def _parse_rating(value) -> float:
+    """rating 列的值（空值为 NaN，不加入索引）"""
+    return float('nan') if value in (None, '') else float(value)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="rank", description="CS2 Rating 人群百分位索引")
+    parser.add_argument("-i", "--index", required=True, help="百分位索引文件")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="由评分结果或比赛数据文件建立/更新索引")
+    build.add_argument("input", nargs="?", default="-",
+                       help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    build.add_argument("-m", "--method", default="composite", choices=default_registry().ids(),
+                       help="输入没有 rating 列时使用的计算方法")
+    build.add_argument("--key", help=f"选手键字段（默认依次尝试 {', '.join(KEY_FIELDS)}）")
+    build.add_argument("--input-format", choices=record_io.FORMATS,
+                       help="输入格式（默认按扩展名判断）")
+    build.add_argument("--reset", action="store_true", help="忽略已有索引，重新建立")
+
+    query = commands.add_parser("query", help="查询评分或选手的排名与百分位")
+    query.add_argument("ratings", nargs="*", type=float, help="评分")
+    query.add_argument("-p", "--player", action="append", default=[], help="选手键（可重复）")
+
+    tiers = commands.add_parser("tiers", help="由人群分位数推导的等级分界")
+    tiers.add_argument("-q", "--quantiles", type=float, nargs=4, default=DEFAULT_TIER_QUANTILES,
+                       help="超凡/优秀/良好/普通 的人群分位数")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "build":
+            index = PercentileIndex() if args.reset or not os.path.exists(args.index) \
+                else PercentileIndex.load(args.index)
+            rows = build_index(index, args.input, args.method, args.key, args.input_format)
+            index.save(args.index)
+            print(f"[rank] 加入 {rows:,} 行，索引共 {len(index):,} 个评分", file=sys.stderr)
+            return 0
+
+        index = PercentileIndex.load(args.index)
+        if args.command == "query":
+            targets = [(f"{rating:.4f}", rating) for rating in args.ratings]
+            targets += [(player, index.player_rating(player)) for player in args.player]
+            thresholds = index.tier_boundaries()
+            print(f"{'':<20}{'排名':>12}{'百分位':>10}{'前X%':>10}  人群等级")
+            for label, rating in targets:
+                print(f"{label:<20}{index.rank(rating):>12,}{index.percentile(rating):>10.2f}"
+                      f"{index.top_percent(rating):>10.2f}  "
+                      f"{RatingCalculator.get_rating_description(rating, thresholds)[0]}")
+        else:
+            boundaries = index.tier_boundaries(tuple(args.quantiles))
+            for q, boundary, fixed in zip(args.quantiles, boundaries,
+                                          RatingCalculator.TIER_THRESHOLDS):
+                print(f"q={q:<6g} > {boundary:.4f}   (固定分界 > {fixed})")
+    except (OSError, ValueError) as e:
+        print(f"[rank] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
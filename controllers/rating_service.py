@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs
+
+from models import instrumentation
+from models.batch_calculator import BatchRatingCalculator
+from models.formula_registry import default_registry
+from models.percentile_index import PercentileIndex
+from models.rating_calculator import RatingCalculator
+from models.validation import ValidationError, describe, validate
+from models import record_io
+
+# HTTP状态码对应的说明
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class MicroBatcher:
+    """微批处理器：把时间窗口内的并发请求合并为一次向量化计算"""
+
+    def __init__(self, window: float = 0.002, max_batch: int = 4096,
+                 stats_size: int = 100000):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._flush_handle = None
+        # 最近请求的延迟与批大小（有界，用于统计分位数）
+        self._latencies = deque(maxlen=stats_size)
+        self._batch_sizes = deque(maxlen=stats_size)
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, stats: dict, method: str = "composite") -> float:
+        """提交一组统计数据，返回评分"""
+        default_registry().get(method)  # 未知方法抛出 ValueError
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((method, record_io.parse_stats(stats), future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """立即计算当前窗口内的所有请求"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        # 按方法分组，每组一次校验与一次向量化计算（未通过校验的请求得到 ValidationError）
+        groups = {}
+        for item in pending:
+            groups.setdefault(item[0], []).append(item)
+        for method, items in groups.items():
+            try:
+                columns = record_io.records_to_columns([item[1] for item in items])
+                status = validate(columns).status.tolist()
+                ratings = BatchRatingCalculator.calculate(method, columns).tolist()
+            except Exception as e:
+                # flush 在 call_later 回调中运行，异常不会传到任何请求：交给该组每个等待的请求
+                instrumentation.record_error("MicroBatcher.flush", e)
+                for item in items:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+                continue
+            for item, rating, flags in zip(items, ratings, status):
+                if item[2].done():
+                    continue
+                if flags:
+                    item[2].set_exception(ValidationError([{'row': 0, 'errors': describe(flags)}]))
+                else:
+                    item[2].set_result(rating)
+
+        now = time.perf_counter()
+        self._latencies.extend(now - item[3] for item in pending)
+        self._batch_sizes.append(len(pending))
+        self.requests += len(pending)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        """延迟（毫秒）与批大小统计"""
+        latencies = sorted(self._latencies)
+        sizes = list(self._batch_sizes)
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'latency_ms': {
+                'p50': _percentile(latencies, 50) * 1000,
+                'p99': _percentile(latencies, 99) * 1000,
+                'max': (latencies[-1] if latencies else 0.0) * 1000,
+            },
+            'batch_size': {
+                'mean': sum(sizes) / len(sizes) if sizes else 0.0,
+                'p50': _percentile(sorted(sizes), 50),
+                'max': max(sizes) if sizes else 0,
+            },
+        }
+
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    """最近秩法分位数"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RatingService:
+    """本地评分服务（HTTP/1.1 over TCP 或 Unix socket）
+
+    POST /rate   请求体: {"method": "2.0", "stats": {...}}
+                 或 {"method": "2.0", "records": [{...}, ...]}
+                 （启用百分位索引时，带 player/steam_id 的数据会更新索引，结果附带百分位）
+                 数据未通过校验时返回 400，rejected 列出每个无效记录的位置与问题
+    GET  /rank   ?rating=1.12 或 ?player=名称：排名与百分位（需启用百分位索引）
+    GET  /tiers  由人群分位数推导的等级分界（需启用百分位索引）
+    GET  /stats  延迟与批处理统计
+    GET  /metrics 插桩指标（Prometheus文本格式，?format=json 时为JSON快照）
+    GET  /health 健康检查
+    """
+
+    def __init__(self, batcher: MicroBatcher = None, index: PercentileIndex = None,
+                 index_path: str = None, population_tiers: bool = False):
+        self.batcher = batcher or MicroBatcher()
+        # 百分位索引（可选）：index_path 给出时在停止服务时写回
+        self.index = index
+        self.index_path = index_path
+        # 按人群分位数而非固定分界给出等级
+        self.population_tiers = population_tiers
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_path: str = None):
+        """启动服务（指定 unix_path 时监听Unix socket）"""
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def stop(self):
+        """停止服务"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.batcher.flush()
+        if self.index is not None and self.index_path:
+            self.index.save(self.index_path)
+
+    async def rate(self, payload: dict) -> dict:
+        """处理一次评分请求"""
+        if not isinstance(payload, dict):
+            raise ValueError("请求体必须是JSON对象")
+        method = payload.get('method', 'composite')
+        if 'records' in payload:
+            records = payload['records']
+            ratings = await asyncio.gather(
+                *(self.batcher.submit(record, method) for record in records),
+                return_exceptions=True)
+            # 未通过校验的记录汇总为一个错误（行号为在 records 中的位置）
+            rejected = [{'row': row, 'errors': rating.rejected[0]['errors']}
+                        for row, rating in enumerate(ratings)
+                        if isinstance(rating, ValidationError)]
+            if rejected:
+                raise ValidationError(rejected)
+            for rating in ratings:
+                if isinstance(rating, BaseException):
+                    raise rating
+            self._index_ratings(records, ratings)
+            return {'method': method,
+                    'results': [self._describe(rating) for rating in ratings]}
+        stats = payload.get('stats', {})
+        rating = await self.batcher.submit(stats, method)
+        self._index_ratings([stats], [rating])
+        return dict(method=method, **self._describe(rating))
+
+    def rank(self, query: dict) -> dict:
+        """按评分或选手查询排名与百分位"""
+        if self.index is None:
+            raise ValueError("未启用百分位索引（--index）")
+        if 'player' in query:
+            rating = self.index.player_rating(query['player'])
+        elif 'rating' in query:
+            rating = float(query['rating'])
+        else:
+            raise ValueError("需要 rating 或 player 参数")
+        return {'rating': rating, 'rank': self.index.rank(rating), 'total': len(self.index),
+                'percentile': self.index.percentile(rating),
+                'top_percent': self.index.top_percent(rating)}
+
+    def _index_ratings(self, records: list, ratings: list):
+        """带选手键（player/steam_id）的评分写入百分位索引"""
+        if self.index is None:
+            return
+        for record, rating in zip(records, ratings):
+            player = isinstance(record, dict) and (record.get('steam_id') or record.get('player'))
+            if player and rating == rating:
+                self.index.update(str(player), rating)
+
+    def _describe(self, rating: float) -> dict:
+        """评分、等级描述，以及启用索引时的百分位"""
+        index = self.index
+        if index is None or not len(index):
+            return _describe(rating)
+        described = _describe(rating, index.tier_boundaries() if self.population_tiers else None)
+        described['percentile'] = index.percentile(rating)
+        described['top_percent'] = index.top_percent(rating)
+        return described
+
+    async def _handle_connection(self, reader, writer):
+        """处理一个连接（支持keep-alive）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                verb, path, version = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': "请求体过大"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, response = await self._dispatch(verb, path, body)
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.strip() == 'HTTP/1.1')
+                await self._respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, verb: str, path: str, body: bytes) -> tuple:
+        """路由请求，返回 (状态码, 响应对象)"""
+        path, _, query = path.partition('?')
+        if path == '/rate':
+            if verb != 'POST':
+                return 405, {'error': "仅支持POST"}
+            try:
+                return 200, await self.rate(json.loads(body or b'{}'))
+            except ValidationError as e:
+                return 400, {'error': str(e), 'rejected': e.rejected}
+            except (ValueError, TypeError) as e:
+                return 400, {'error': str(e)}
+            except Exception as e:
+                # 计算本身出错（整组请求都收到该异常）：返回 500，而不是断开连接
+                return 500, {'error': f"{type(e).__name__}: {e}"}
+        if path in ('/rank', '/tiers') and verb == 'GET':
+            try:
+                if path == '/tiers':
+                    if self.index is None or not len(self.index):
+                        raise ValueError("百分位索引为空或未启用（--index）")
+                    return 200, {'thresholds': self.index.tier_boundaries(),
+                                 'fixed_thresholds': RatingCalculator.TIER_THRESHOLDS}
+                return 200, self.rank({name: values[-1]
+                                       for name, values in parse_qs(query).items()})
+            except ValueError as e:
+                return 400, {'error': str(e)}
+        if path == '/stats' and verb == 'GET':
+            return 200, self.batcher.stats()
+        if path == '/metrics' and verb == 'GET':
+            if parse_qs(query).get('format', [''])[-1] == 'json':
+                return 200, {'enabled': instrumentation.is_enabled(),
+                             'functions': instrumentation.snapshot()}
+            return 200, instrumentation.to_prometheus()
+        if path == '/health' and verb == 'GET':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f"未知路径: {path}"}
+
+    @staticmethod
+    async def _respond(writer, status: int, response, keep_alive: bool):
+        """写出响应（字符串按纯文本写出，其余按JSON）"""
+        if isinstance(response, str):
+            body = response.encode('utf-8')
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode('latin-1')
+        writer.write(head + body)
+        await writer.drain()
+
+
+def _describe(rating: float, thresholds: tuple = None) -> dict:
+    """评分及其等级描述"""
+    desc, color = RatingCalculator.get_rating_description(rating, thresholds)
+    return {'rating': rating, 'tier': desc, 'color': color}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="serve", description="CS2 Rating 本地评分服务（微批处理）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--unix", help="Unix socket 路径（指定后忽略 host/port）")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="合并请求的时间窗口（毫秒）")
+    parser.add_argument("--max-batch", type=int, default=4096, help="单批最大请求数")
+    parser.add_argument("--index", help="百分位索引文件（不存在时新建，停止服务时写回）")
+    parser.add_argument("--population-tiers", action="store_true",
+                        help="按索引中的人群分位数给出等级（需要 --index）")
+    parser.add_argument("--metrics", action="store_true",
+                        help="开启插桩计时（GET /metrics 导出，默认只统计错误事件）")
+    return parser
+
+
+async def _serve(args):
+    index = None
+    if args.index:
+        index = PercentileIndex.load(args.index) if os.path.exists(args.index) \
+            else PercentileIndex()
+    service = RatingService(MicroBatcher(args.window_ms / 1000, args.max_batch),
+                            index, args.index, args.population_tiers)
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"[serve] 评分服务已启动: {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        # 中断时也要写回百分位索引
+        await service.stop()
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        instrumentation.enable()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import argparse
+import sys
+
+from models.formula_registry import default_registry
+from models.percentile_index import PercentileIndex
+from models.report import FORMATS, ReportTemplate, detect_format
+from models.validation import validate
+from models import record_io
+
+
+def write_report(template: ReportTemplate, input_path: str, output_path: str,
+                 input_format: str = None, chunk_size: int = 8192) -> tuple:
+    """逐块读取记录、渲染并写出报告，返回 (输出行数, 跳过的行数)
+
+    未通过校验的行不出现在报告中（报告里的每个数字都对应一个实际计算出的评分）。
+    """
+    fmt = input_format or record_io.detect_format(input_path)
+    rows = skipped = 0
+    with record_io.open_input(input_path) as source, \
+            record_io.open_output(output_path) as target:
+        target.write(template.header())
+        for records in record_io.iter_chunks(record_io.iter_records(source, fmt), chunk_size):
+            unparseable = set()
+            columns = record_io.records_to_columns(records, unparseable)
+            valid = validate(columns, unparseable).valid
+            if not valid.all():
+                skipped += int((~valid).sum())
+                columns = {field: values[valid] for field, values in columns.items()}
+                records = [record for record, ok in zip(records, valid.tolist()) if ok]
+                if not records:
+                    continue
+            target.write(template.render(columns, records))
+            rows += len(records)
+        target.write(template.footer())
+    return rows, skipped
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="report", description="CS2 Rating 批量报告（Markdown/HTML/CSV，逐块流式输出）")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="输入文件 (CSV/JSONL)，'-' 表示标准输入")
+    parser.add_argument("-o", "--output", default="-", help="报告文件，'-' 表示标准输出")
+    parser.add_argument("-m", "--method", default="composite", choices=default_registry().ids(),
+                        help="计算方法（由 models/formulas.json 定义）")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="报告格式（默认按扩展名判断 .md/.html/.csv，否则为 markdown）")
+    parser.add_argument("-l", "--label", action="append", default=[],
+                        help="报告前几列显示的记录字段（可重复），如 player、team")
+    parser.add_argument("--input-format", choices=record_io.FORMATS,
+                        help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="每块处理的行数")
+    parser.add_argument("--index", help="按百分位索引（rank 命令）的人群分界给出等级")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.chunk_size <= 0:
+            raise ValueError("--chunk-size 必须大于0")
+        thresholds = PercentileIndex.load(args.index).tier_boundaries() if args.index else None
+        template = ReportTemplate(default_registry().get(args.method),
+                                  args.format or detect_format(args.output),
+                                  args.label, thresholds)
+        rows, skipped = write_report(template, args.input, args.output,
+                                     args.input_format, args.chunk_size)
+    except (OSError, ValueError) as e:
+        print(f"[report] {str(e)}", file=sys.stderr)
+        return 2
+    message = f"[report] 输出 {rows:,} 行"
+    if skipped:
+        message += f"，{skipped:,} 行未通过校验，已跳过"
+    print(message, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import argparse
+import sys
+
+from models.formula_registry import default_registry
+from models.result_store import ResultStore
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="store", description="CS2 Rating 评分结果库（rate --store 使用的目录）")
+    parser.add_argument("path", help="结果库目录")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="列出各公式版本保存的结果数")
+    commands.add_parser("prune", help="删除系数已变更（指纹不属于当前公式）的旧结果")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    registry = default_registry()
+    current = {registry.get(formula_id).fingerprint for formula_id in registry.ids()}
+    try:
+        store = ResultStore(args.path)
+        if args.command == "list":
+            print(f"{'公式':<12}{'版本':>6}  {'指纹':<18}{'结果数':>14}")
+            for formula_id, version, fingerprint, count in store.entries():
+                state = "" if fingerprint in current else "  (已过期)"
+                print(f"{formula_id:<12}{version:>6}  {fingerprint:<18}{count:>14,}{state}")
+        else:
+            removed = store.prune(registry)
+            for formula_id, version, fingerprint, count in removed:
+                print(f"[store] 删除 {formula_id} v{version} {fingerprint}: {count:,} 个结果",
+                      file=sys.stderr)
+            print(f"[store] 共删除 {len(removed)} 个文件", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"[store] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
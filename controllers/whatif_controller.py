@@ -0,0 +1,115 @@
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from models.formula_registry import default_registry
+from models.sensitivity import INPUT_FIELDS, OPTIONAL_FIELDS, sensitivity, what_if_grid
+
+# 输入字段的类型（整数字段的变化量也按整数解析）
+_FLOAT_FIELDS = ('adr', 'hs_percent', 'rws', 'kast')
+
+
+def parse_delta(text: str) -> tuple:
+    """解析 "字段=变化量"，如 "adr=10"、"deaths=-1" """
+    field, sep, value = text.partition('=')
+    if not sep or field not in INPUT_FIELDS:
+        raise ValueError(f"变化量格式应为 字段=数值（字段: {', '.join(INPUT_FIELDS)}）: {text}")
+    return field, float(value)
+
+
+def parse_axis(text: str) -> tuple:
+    """解析 "字段:起点:终点:点数"，如 "kills:0:60:200" """
+    parts = text.split(':')
+    if len(parts) != 4 or parts[0] not in INPUT_FIELDS:
+        raise ValueError(f"坐标轴格式应为 字段:起点:终点:点数: {text}")
+    return parts[0], np.linspace(float(parts[1]), float(parts[2]), int(parts[3]))
+
+
+def report(stats: dict, methods: list, deltas: list) -> str:
+    """各算法的评分、偏导数，以及给定变化量的一阶估计与实际变化"""
+    registry = default_registry()
+    lines = [f"{'':<14}" + ''.join(f"{method:>12}" for method in methods)]
+    ratings = {method: registry.get(method).scalar(**stats) for method in methods}
+    lines.append(f"{'rating':<14}" + ''.join(f"{ratings[method]:>12.4f}" for method in methods))
+    partials = {method: sensitivity(method, **stats) for method in methods}
+    for field in INPUT_FIELDS:
+        if field in OPTIONAL_FIELDS and stats.get(field) is None:
+            continue
+        lines.append(f"{'d/d ' + field:<14}" + ''.join(
+            f"{partials[method][field]:>+12.5f}" for method in methods))
+
+    for field, change in deltas:
+        changed = dict(stats)
+        value = (stats.get(field) or 0) + change
+        changed[field] = value if field in _FLOAT_FIELDS else int(round(value))
+        estimate = ''.join(f"{(partials[method][field] or 0) * change:>+12.4f}"
+                           for method in methods)
+        actual = ''.join(
+            f"{registry.get(method).scalar(**changed) - ratings[method]:>+12.4f}"
+            for method in methods)
+        lines.append(f"\n{field} {change:+g}")
+        lines.append(f"{'  估计':<12}{estimate}")
+        lines.append(f"{'  实际':<12}{actual}")
+    return '\n'.join(lines)
+
+
+def write_surface(path: str, stats: dict, x_axis: tuple, y_axis: tuple, methods: list):
+    """写出二维评分曲面（CSV 长表：x, y, 各算法评分）"""
+    (x_field, x_values), (y_field, y_values) = x_axis, y_axis
+    surfaces = what_if_grid(stats, x_field, x_values, y_field, y_values, methods)
+    target = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(target)
+        writer.writerow([x_field, y_field] + methods)
+        xs, ys = np.meshgrid(x_values, y_values)
+        columns = [xs.ravel(), ys.ravel()] + [surfaces[method].ravel() for method in methods]
+        writer.writerows(zip(*(column.tolist() for column in columns)))
+    finally:
+        if target is not sys.stdout:
+            target.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数定义"""
+    parser = argparse.ArgumentParser(
+        prog="whatif", description="CS2 Rating 敏感度分析与 what-if 评分曲面")
+    for field in INPUT_FIELDS:
+        if field in OPTIONAL_FIELDS:
+            parser.add_argument(f"--{field}", type=float, default=None, help="可选")
+        else:
+            parser.add_argument(f"--{field}", type=float if field in _FLOAT_FIELDS else int,
+                                default=0)
+    parser.add_argument("-m", "--method", action="append", choices=default_registry().ids(),
+                        help="计算方法（可重复，默认全部）")
+    parser.add_argument("-d", "--delta", action="append", default=[], type=parse_delta,
+                        help="输入变化量，如 adr=10、deaths=-1（可重复）")
+    parser.add_argument("--x", type=parse_axis, help="曲面的x轴，如 kills:0:60:200")
+    parser.add_argument("--y", type=parse_axis, help="曲面的y轴，如 deaths:0:40:200")
+    parser.add_argument("-o", "--output", default="-", help="曲面CSV输出文件，'-' 表示标准输出")
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    args = build_parser().parse_args(argv)
+    stats = {field: getattr(args, field) for field in INPUT_FIELDS}
+    methods = args.method or default_registry().ids()
+    try:
+        if args.x or args.y:
+            if not (args.x and args.y):
+                raise ValueError("曲面需要同时指定 --x 与 --y")
+            write_surface(args.output, stats, args.x, args.y, methods)
+        else:
+            if stats['rounds'] <= 0:
+                raise ValueError("回合数必须大于0")
+            print(report(stats, methods, args.delta))
+    except (OSError, ValueError) as e:
+        print(f"[whatif] {str(e)}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
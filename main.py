@@ -1,11 +1,32 @@
+import importlib
 import sys
-from PyQt5.QtWidgets import QApplication, QMessageBox
-from views.main_window import MainWindow
-from controllers.calculator_controller import CalculatorController
+
+# 命令行子命令 → 控制器模块（各模块提供 main(argv)；按需导入，命令行模式不加载PyQt5）
+SUBCOMMANDS = {
+    "rate": "controllers.batch_controller",               # 批量计算
+    "serve": "controllers.rating_service",                # 本地评分服务
+    "ingest": "controllers.log_controller",               # 服务器日志导入
+    "whatif": "controllers.whatif_controller",            # 敏感度分析
+    "rank": "controllers.rank_controller",                # 人群百分位索引
+    "leaderboard": "controllers.leaderboard_controller",  # 分组排行榜
+    "report": "controllers.report_controller",            # 批量报告
+    "job": "controllers.job_controller",                  # 多节点断点续算作业
+    "store": "controllers.store_controller",              # 评分结果库
+    "columns": "controllers.column_controller",           # 列式数据文件
+    "calibrate": "controllers.calibrate_controller",      # 系数校准
+}
 
 
 def main():
     """应用程序入口"""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        module = importlib.import_module(SUBCOMMANDS[sys.argv[1]])
+        sys.exit(module.main(sys.argv[2:]))
+
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from views.main_window import MainWindow
+    from controllers.calculator_controller import CalculatorController
+
     try:
         app = QApplication(sys.argv)
         app.setStyle('Fusion')
@@ -30,4 +51,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,60 @@
+from models import instrumentation
+from models.formula_registry import default_registry
+
+
+class BatchRatingCalculator:
+    """CS2 Rating批量计算模型（按列向量化，结果与RatingCalculator逐行计算完全一致）
+
+    各计算方法是默认公式注册表中对应公式的向量化求值函数的简便入口，系数不在此处重复定义。
+    所有参数均为等长的一维数组（或可广播的标量），返回float64数组。
+    rws 中的 NaN 表示"无RWS数据"（对应单场计算中的 rws=None）。
+    """
+
+    @staticmethod
+    def calculate_rating_1_0(kills, deaths, rounds, kills_3k=0, kills_4k=0, kills_5k=0):
+        """Rating 1.0批量计算（注册表中的 1.0 公式）"""
+        return BatchRatingCalculator.calculate("1.0", _columns(
+            kills=kills, deaths=deaths, rounds=rounds,
+            kills_3k=kills_3k, kills_4k=kills_4k, kills_5k=kills_5k))
+
+    @staticmethod
+    def calculate_rating_2_0(kills, deaths, assists, rounds, adr, kast=None,
+                             kills_3k=0, kills_4k=0, kills_5k=0):
+        """Rating 2.0批量计算（注册表中的 2.0 公式，kast 中的 NaN 或 0 表示未提供）"""
+        return BatchRatingCalculator.calculate("2.0", _columns(
+            kills=kills, deaths=deaths, assists=assists, rounds=rounds, adr=adr, kast=kast,
+            kills_3k=kills_3k, kills_4k=kills_4k, kills_5k=kills_5k))
+
+    @staticmethod
+    def calculate_custom_rating(kills, deaths, assists, rounds, mvps, adr, hs_percent,
+                                rws=None, kills_3k=0, kills_4k=0, kills_5k=0):
+        """自定义算法批量计算（注册表中的 custom 公式）"""
+        return BatchRatingCalculator.calculate("custom", _columns(
+            kills=kills, deaths=deaths, assists=assists, rounds=rounds, mvps=mvps, adr=adr,
+            hs_percent=hs_percent, rws=rws, kills_3k=kills_3k, kills_4k=kills_4k,
+            kills_5k=kills_5k))
+
+    @staticmethod
+    def calculate_rating(kills, deaths, assists, rounds, mvps, adr, hs_percent,
+                         kills_3k=0, kills_4k=0, kills_5k=0, rws=None):
+        """综合评分批量计算（注册表中的 composite 公式）"""
+        return BatchRatingCalculator.calculate("composite", _columns(
+            kills=kills, deaths=deaths, assists=assists, rounds=rounds, mvps=mvps, adr=adr,
+            hs_percent=hs_percent, kills_3k=kills_3k, kills_4k=kills_4k, kills_5k=kills_5k,
+            rws=rws))
+
+    @staticmethod
+    def calculate(method: str, columns: dict):
+        """按方法ID计算一批数据（columns 的键与 get_input_values 返回的字段一致）"""
+        return default_registry().get(method).vector(columns)
+
+
+def _columns(**values) -> dict:
+    """组装列字典：未给出的统计字段为 0，rws/kast 为 None 时不传入（表示没有数据）"""
+    columns = {'kills': 0, 'deaths': 0, 'assists': 0, 'rounds': 0, 'mvps': 0, 'adr': 0.0,
+               'hs_percent': 0.0, 'kills_3k': 0, 'kills_4k': 0, 'kills_5k': 0}
+    columns.update((field, value) for field, value in values.items() if value is not None)
+    return columns
+
+
+instrumentation.instrument(BatchRatingCalculator, 'calculate')
@@ -0,0 +1,267 @@
+import copy
+
+import numpy as np
+
+from models.formula_registry import SCHEMA_VERSION, default_registry
+
+# 自定义算法系数校准
+#
+# 模型（与 custom 公式一致，拟合时不做 [0, 3] 截断）:
+#   base   = Σ w_i * f_i，f = (KPR, 1-min(1,DPR), APR, min(200,ADR)/100, min(100,HS%)/100, MVP率)
+#   rating = offset + scale * base                         （无RWS）
+#   rating = offset + scale * base * (a + b * min(30, max(0, RWS)))   （有RWS，a=rws_base, b=1/rws_divisor）
+# scale 与 w 只有乘积可辨识，scale 保持不变，拟合 w、offset、a、b。
+#
+# 数据只流式读取一遍：每块计算设计矩阵 Z = [1, f*(无RWS), f*(有RWS), f*RWS*(有RWS)]，
+# 按折累加 ZᵀZ、Zᵀy、yᵀy。w 与 (a, b) 在这些小矩阵上交替求解（各自是线性最小二乘），
+# 交叉验证的训练/验证误差也由各折的统计量精确算出，不需要再次读取数据。
+FEATURES = ('kpr', 'survival', 'apr', 'adr', 'hs', 'mvp')
+_WIDTH = 1 + 3 * len(FEATURES)
+
+
+class _Moments:
+    """一组数据的充分统计量"""
+
+    __slots__ = ('gram', 'moment', 'yy', 'rows', 'rws_rows')
+
+    def __init__(self):
+        self.gram = np.zeros((_WIDTH, _WIDTH))
+        self.moment = np.zeros(_WIDTH)
+        self.yy = 0.0
+        self.rows = 0
+        self.rws_rows = 0
+
+    def add(self, design: np.ndarray, target: np.ndarray, has_rws: np.ndarray):
+        self.gram += design.T @ design
+        self.moment += design.T @ target
+        self.yy += float(target @ target)
+        self.rows += len(target)
+        self.rws_rows += int(has_rws.sum())
+
+    def __add__(self, other):
+        total = _Moments()
+        for moments in (self, other):
+            total.gram += moments.gram
+            total.moment += moments.moment
+            total.yy += moments.yy
+            total.rows += moments.rows
+            total.rws_rows += moments.rws_rows
+        return total
+
+    def __sub__(self, other):
+        rest = _Moments()
+        rest.gram = self.gram - other.gram
+        rest.moment = self.moment - other.moment
+        rest.yy = self.yy - other.yy
+        rest.rows = self.rows - other.rows
+        rest.rws_rows = self.rws_rows - other.rws_rows
+        return rest
+
+    def sse(self, theta: np.ndarray) -> float:
+        """设计矩阵系数 theta 下的残差平方和"""
+        return max(0.0, self.yy - 2 * theta @ self.moment + theta @ self.gram @ theta)
+
+
+class CalibrationResult:
+    """校准结果：拟合的系数与误差统计"""
+
+    def __init__(self, spec: dict, weights: np.ndarray, offset: float, rws_base: float,
+                 rws_slope: float, alpha: float, rmse: float, r2: float, rows: int,
+                 cv_rmse: dict = None):
+        self.spec = spec
+        self.weights = dict(zip(FEATURES, weights.tolist()))
+        self.offset = offset
+        self.rws_base = rws_base
+        self.rws_slope = rws_slope
+        self.alpha = alpha
+        self.rmse = rmse
+        self.r2 = r2
+        self.rows = rows
+        self.cv_rmse = cv_rmse or {}
+
+    def document(self) -> dict:
+        """可由 FormulaRegistry.load 加载的公式定义文档"""
+        return {'schema_version': SCHEMA_VERSION, 'formulas': [self.spec]}
+
+
+class CustomCalibrator:
+    """自定义算法系数校准器：update() 逐块累加，fit() 求解"""
+
+    def __init__(self, base_formula: str = "custom", folds: int = 1, registry=None):
+        formula = (registry or default_registry()).get(base_formula)
+        if formula.kind != 'custom':
+            raise ValueError(f"只能校准自定义算法类型的公式: {base_formula}")
+        if folds < 1:
+            raise ValueError("折数必须至少为1")
+        self.base = formula
+        self.folds = folds
+        self._fold_moments = [_Moments() for _ in range(folds)]
+        self._seen = 0
+
+    @property
+    def rows(self) -> int:
+        return self._seen
+
+    def features(self, columns: dict) -> tuple:
+        """由一批列数据计算特征矩阵 (n×6)、RWS是否存在、截断后的RWS"""
+        caps = self.base.spec['caps']
+        rounds = np.maximum(np.asarray(columns['rounds'], dtype=np.float64), 1)
+        deaths = np.asarray(columns['deaths'], dtype=np.float64)
+        features = np.column_stack((
+            np.asarray(columns['kills']) / rounds,
+            1 - np.fmin(caps['dpr'], deaths / rounds),
+            np.asarray(columns['assists']) / rounds,
+            np.fmin(caps['adr'], np.asarray(columns['adr'], dtype=np.float64)) / 100,
+            np.fmin(caps['hs_percent'], np.asarray(columns['hs_percent'], dtype=np.float64)) / 100,
+            np.asarray(columns['mvps']) / rounds,
+        ))
+        rws = columns.get('rws')
+        if rws is None:
+            rws = np.full(len(rounds), np.nan)
+        rws = np.broadcast_to(np.asarray(rws, dtype=np.float64), rounds.shape)
+        has_rws = ~np.isnan(rws)
+        clipped = np.where(has_rws, np.fmin(caps['rws'], np.fmax(0.0, np.nan_to_num(rws))), 0.0)
+        return features, has_rws, clipped
+
+    def update(self, columns: dict, target):
+        """累加一批带标签的数据（target 中的 NaN 行被忽略）"""
+        target = np.asarray(target, dtype=np.float64)
+        features, has_rws, clipped = self.features(columns)
+        labeled = ~np.isnan(target)
+        if not labeled.all():
+            features, has_rws, clipped, target = (features[labeled], has_rws[labeled],
+                                                  clipped[labeled], target[labeled])
+        design = np.empty((len(target), _WIDTH))
+        design[:, 0] = 1.0
+        with_rws = has_rws[:, np.newaxis]
+        design[:, 1:7] = np.where(with_rws, 0.0, features)
+        design[:, 7:13] = np.where(with_rws, features, 0.0)
+        design[:, 13:19] = design[:, 7:13] * clipped[:, np.newaxis]
+
+        # 按全局行号取模分折（与分块方式无关）
+        start = self._seen % self.folds
+        for fold in range(self.folds):
+            rows = slice((fold - start) % self.folds, None, self.folds)
+            self._fold_moments[fold].add(design[rows], target[rows], has_rws[rows])
+        self._seen += len(target)
+
+    def fit(self, alphas=(0.0,), version: int = None, formula_id: str = None,
+            name: str = None) -> CalibrationResult:
+        """求解系数
+
+        alphas 为岭回归强度候选（向当前系数收缩，按行数归一化）。多个候选且折数>1时
+        按交叉验证误差选择，最终用全部数据以选中的强度重新求解。
+        """
+        total = sum(self._fold_moments, _Moments())
+        if total.rows <= _WIDTH:
+            raise ValueError(f"标注数据过少: {total.rows} 行")
+        alphas = tuple(alphas)
+        cv_rmse = {}
+        if self.folds > 1:
+            for alpha in alphas:
+                errors = 0.0
+                for held_out in self._fold_moments:
+                    theta = self._solve(total - held_out, alpha)[0]
+                    errors += held_out.sse(theta)
+                cv_rmse[alpha] = float(np.sqrt(errors / total.rows))
+            alpha = min(alphas, key=cv_rmse.get)
+        elif len(alphas) == 1:
+            alpha = alphas[0]
+        else:
+            raise ValueError("多个岭回归强度候选需要交叉验证（折数>1）")
+
+        theta, weights, offset, rws_base, rws_slope = self._solve(total, alpha)
+        sse = total.sse(theta)
+        mean = total.moment[0] / total.rows
+        variance = total.yy - total.rows * mean * mean
+        return CalibrationResult(
+            self._spec(weights, offset, rws_base, rws_slope, version, formula_id, name,
+                       total.rows, alpha),
+            weights, offset, rws_base, rws_slope, alpha,
+            float(np.sqrt(sse / total.rows)),
+            float(1 - sse / variance) if variance > 0 else float('nan'),
+            total.rows, cv_rmse)
+
+    def _solve(self, moments: _Moments, alpha: float, iterations: int = 200,
+               tolerance: float = 1e-12) -> tuple:
+        """交替最小二乘：固定 (a, b) 解 (offset, w)，固定 w 解 (offset, a, b)"""
+        c = self.base.spec['coefficients']
+        scale = c['scale']
+        prior = np.array([c[name] for name in FEATURES], dtype=np.float64)
+        weights = prior.copy()
+        offset = float(c['offset'])
+        rws_base = float(c['rws_base'])
+        rws_slope = 1.0 / c['rws_divisor']
+        # 全部数据都有RWS时，系数 a 与 w 的整体缩放不可区分，保持 a 不变
+        fit_base = moments.rws_rows < moments.rows
+        fit_rws = moments.rws_rows > 0
+        # 岭回归强度按行数归一化，使 alpha 的含义与数据量无关
+        penalty = alpha * moments.rows * np.diag([0.0] + [1.0] * len(FEATURES))
+        count = len(FEATURES)
+
+        previous = None
+        for _ in range(iterations):
+            # 1) 固定 (a, b)：theta = A @ (offset, w)
+            mapping = np.zeros((_WIDTH, 1 + count))
+            mapping[0, 0] = 1.0
+            for i in range(count):
+                mapping[1 + i, 1 + i] = scale
+                mapping[7 + i, 1 + i] = scale * rws_base
+                mapping[13 + i, 1 + i] = scale * rws_slope
+            lhs = mapping.T @ moments.gram @ mapping + penalty
+            rhs = mapping.T @ moments.moment + penalty @ np.concatenate(([0.0], prior))
+            solution = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+            offset, weights = float(solution[0]), solution[1:]
+
+            # 2) 固定 w：theta = fixed + B @ (offset, a, b)
+            if fit_rws:
+                fixed = np.zeros(_WIDTH)
+                fixed[1:7] = scale * weights
+                columns = [np.eye(_WIDTH)[0]]
+                if fit_base:
+                    columns.append(np.concatenate((np.zeros(7), scale * weights, np.zeros(6))))
+                else:
+                    fixed[7:13] = scale * rws_base * weights
+                columns.append(np.concatenate((np.zeros(13), scale * weights)))
+                mapping = np.column_stack(columns)
+                lhs = mapping.T @ moments.gram @ mapping
+                rhs = mapping.T @ (moments.moment - moments.gram @ fixed)
+                solution = np.linalg.lstsq(lhs, rhs, rcond=None)[0]
+                offset = float(solution[0])
+                if fit_base:
+                    rws_base = float(solution[1])
+                rws_slope = float(solution[-1])
+
+            theta = self._theta(weights, offset, rws_base, rws_slope)
+            loss = moments.sse(theta) + alpha * moments.rows * float((weights - prior) @
+                                                                     (weights - prior))
+            if previous is not None and previous - loss <= tolerance * max(1.0, previous):
+                break
+            previous = loss
+        return theta, weights, offset, rws_base, rws_slope
+
+    def _theta(self, weights, offset, rws_base, rws_slope) -> np.ndarray:
+        scale = self.base.spec['coefficients']['scale']
+        return np.concatenate(([offset], scale * weights, scale * rws_base * weights,
+                               scale * rws_slope * weights))
+
+    def _spec(self, weights, offset, rws_base, rws_slope, version, formula_id, name,
+              rows, alpha) -> dict:
+        """新的公式定义（系数替换为拟合值，版本号递增）"""
+        if rws_slope == 0:
+            raise ValueError("拟合得到的RWS系数为0，无法表示为 rws_divisor")
+        spec = copy.deepcopy(self.base.spec)
+        spec.pop('calibration', None)
+        coefficients = spec['coefficients']
+        coefficients.update(zip(FEATURES, weights.tolist()))
+        coefficients['offset'] = offset
+        coefficients['rws_base'] = rws_base
+        coefficients['rws_divisor'] = 1.0 / rws_slope
+        spec['id'] = formula_id or self.base.id
+        spec['version'] = version or self.base.version + 1
+        if name:
+            spec['name'] = name
+        spec['calibration'] = {'base': f"{self.base.id} v{self.base.version}",
+                               'base_fingerprint': self.base.fingerprint,
+                               'rows': rows, 'alpha': alpha}
+        return spec
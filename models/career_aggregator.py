@@ -0,0 +1,175 @@
+from array import array
+
+from models.formula_registry import default_registry
+from models import record_io
+
+# 累加字段：整数计数（环形缓冲区中以uint16存储）与浮点累计值
+COUNT_FIELDS = ('kills', 'deaths', 'assists', 'rounds', 'mvps',
+                'kills_3k', 'kills_4k', 'kills_5k', 'rws_rounds')
+VALUE_FIELDS = ('damage', 'hs_kills', 'rws_weighted')
+SUM_FIELDS = COUNT_FIELDS + VALUE_FIELDS
+_COUNT_SIZE = len(COUNT_FIELDS)
+_SUM_SIZE = len(SUM_FIELDS)
+_MAX_COUNT = 0xFFFF
+
+
+class PlayerState:
+    """单个选手的累计状态（紧凑存储）
+
+    sums:        生涯累计值 + 各滚动窗口累计值，依次排列
+    ring_counts: 最近 max_window 场的整数字段（按需增长，满后循环覆盖）
+    ring_values: 最近 max_window 场的浮点字段
+    """
+
+    __slots__ = ('matches', 'sums', 'ring_counts', 'ring_values')
+
+    def __init__(self, window_count: int):
+        self.matches = 0
+        self.sums = array('d', bytes(8 * _SUM_SIZE * (window_count + 1)))
+        self.ring_counts = array('H')
+        self.ring_values = array('d')
+
+
+class CareerAggregator:
+    """选手生涯/滚动窗口评分聚合器
+
+    每场比赛到达时以O(1)更新生涯与所有窗口的累计值（加入新场次、减去滑出窗口的场次），
+    评分始终由公式注册表中的同一套公式基于累计数据计算。
+    """
+
+    def __init__(self, windows: tuple = (10, 50, 100)):
+        windows = tuple(sorted(set(windows)))
+        if not windows or windows[0] <= 0:
+            raise ValueError("窗口大小必须为正整数")
+        self.windows = windows
+        self.max_window = windows[-1]
+        self._players = {}
+
+    def __len__(self):
+        return len(self._players)
+
+    def __contains__(self, player_id):
+        return player_id in self._players
+
+    def players(self):
+        """所有选手ID"""
+        return self._players.keys()
+
+    def matches(self, player_id) -> int:
+        """选手已记录的比赛场数"""
+        return self._players[player_id].matches
+
+    def add_match(self, player_id, stats: dict):
+        """记录一场比赛（字段与 get_input_values 一致，rws 为空表示无RWS）"""
+        counts, values = self._match_vector(record_io.parse_stats(stats))
+        state = self._players.get(player_id)
+        if state is None:
+            state = self._players[player_id] = PlayerState(len(self.windows))
+
+        sums = state.sums
+        match_index = state.matches
+        max_window = self.max_window
+        slot = match_index % max_window
+
+        # 生涯累计
+        for i in range(_COUNT_SIZE):
+            sums[i] += counts[i]
+        for i in range(len(VALUE_FIELDS)):
+            sums[_COUNT_SIZE + i] += values[i]
+
+        # 各窗口：加入新场次，减去滑出窗口的场次（需在覆盖环形缓冲区之前读取）
+        for w, window in enumerate(self.windows, start=1):
+            base = w * _SUM_SIZE
+            if match_index >= window:
+                old = (match_index - window) % max_window
+                for i in range(_COUNT_SIZE):
+                    sums[base + i] += counts[i] - state.ring_counts[old * _COUNT_SIZE + i]
+                for i in range(len(VALUE_FIELDS)):
+                    sums[base + _COUNT_SIZE + i] += (
+                            values[i] - state.ring_values[old * len(VALUE_FIELDS) + i])
+            else:
+                for i in range(_COUNT_SIZE):
+                    sums[base + i] += counts[i]
+                for i in range(len(VALUE_FIELDS)):
+                    sums[base + _COUNT_SIZE + i] += values[i]
+
+        # 写入环形缓冲区
+        if match_index < max_window:
+            state.ring_counts.extend(counts)
+            state.ring_values.extend(values)
+        else:
+            state.ring_counts[slot * _COUNT_SIZE:(slot + 1) * _COUNT_SIZE] = array('H', counts)
+            state.ring_values[slot * len(VALUE_FIELDS):(slot + 1) * len(VALUE_FIELDS)] = \
+                array('d', values)
+        state.matches = match_index + 1
+
+        # 每转满一圈按缓冲区重算窗口浮点累计值，消除加减带来的舍入误差（均摊O(1)）
+        if slot == max_window - 1:
+            self._resync_windows(state)
+
+    def totals(self, player_id, window: int = None) -> dict:
+        """生涯（window=None）或最近 window 场的累计数据，转换为评分输入字段"""
+        state = self._players[player_id]
+        if window is None:
+            base = 0
+        elif window in self.windows:
+            base = (self.windows.index(window) + 1) * _SUM_SIZE
+        else:
+            raise ValueError(f"未配置的窗口大小: {window}")
+
+        sums = dict(zip(SUM_FIELDS, state.sums[base:base + _SUM_SIZE]))
+        rounds = int(sums['rounds'])
+        kills = int(sums['kills'])
+        return {
+            'kills': kills,
+            'deaths': int(sums['deaths']),
+            'assists': int(sums['assists']),
+            'rounds': rounds,
+            'mvps': int(sums['mvps']),
+            'adr': sums['damage'] / rounds if rounds else 0.0,
+            'hs_percent': sums['hs_kills'] / kills * 100 if kills else 0.0,
+            'kills_3k': int(sums['kills_3k']),
+            'kills_4k': int(sums['kills_4k']),
+            'kills_5k': int(sums['kills_5k']),
+            'rws': sums['rws_weighted'] / sums['rws_rounds'] if sums['rws_rounds'] else None,
+        }
+
+    def evaluate(self, player_id, method: str = "composite", window: int = None):
+        """基于累计数据计算完整评分结果（RatingResult）"""
+        return default_registry().get(method).evaluate(**self.totals(player_id, window))
+
+    def rating(self, player_id, method: str = "composite", window: int = None) -> float:
+        """生涯或滚动窗口评分（与 rate/rank 命令使用同一注册表中的公式）"""
+        return default_registry().get(method).scalar(**self.totals(player_id, window))
+
+    @staticmethod
+    def _match_vector(stats: dict) -> tuple:
+        """单场数据转换为累加向量 (整数字段, 浮点字段)"""
+        rws = stats['rws']
+        has_rws = rws == rws  # NaN 表示无RWS
+        rounds = stats['rounds']
+        counts = (stats['kills'], stats['deaths'], stats['assists'], rounds,
+                  stats['mvps'], stats['kills_3k'], stats['kills_4k'],
+                  stats['kills_5k'], rounds if has_rws else 0)
+        if min(counts) < 0 or max(counts) > _MAX_COUNT:
+            raise ValueError(f"计数字段超出范围 [0, {_MAX_COUNT}]")
+        values = (stats['adr'] * rounds,
+                  stats['hs_percent'] * stats['kills'] / 100,
+                  rws * rounds if has_rws else 0.0)
+        if any(value != value for value in values[:2]):
+            raise ValueError("ADR与爆头率不能为NaN")
+        return counts, values
+
+    def _resync_windows(self, state: PlayerState):
+        """按环形缓冲区精确重算各窗口的浮点累计值"""
+        value_size = len(VALUE_FIELDS)
+        available = len(state.ring_values) // value_size
+        last = (state.matches - 1) % self.max_window
+        for w, window in enumerate(self.windows, start=1):
+            base = w * _SUM_SIZE + _COUNT_SIZE
+            totals = [0.0] * value_size
+            for back in range(min(window, available)):
+                offset = ((last - back) % self.max_window) * value_size
+                for i in range(value_size):
+                    totals[i] += state.ring_values[offset + i]
+            state.sums[base:base + value_size] = array('d', totals)
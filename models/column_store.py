@@ -0,0 +1,229 @@
+import mmap
+import struct
+
+import numpy as np
+
+from models.batch_calculator import BatchRatingCalculator
+from models.validation import validate
+from models import record_io
+
+# 列式比赛数据文件格式（小端序，所有数据段按8字节对齐）
+#   文件头 (32字节):    magic(8) | 版本(u16) | 列数(u16) | 保留(u32) | 总行数(u64) | 每块行数(u32) | 填充(4)
+#   列描述 (每列20字节): 列名(16, 右侧补0) | numpy dtype 字符串(4, 如 '<i4')
+#   数据块 (重复):       块行数(u32) + 填充(4) | 各列定长数据 | RWS空值位图(1=有值)
+# RWS为空的行在数据中存为 NaN，因此读取时可以直接零拷贝交给批量计算。
+MAGIC = b'CSRCOL\x00\x00'
+SCHEMA_VERSION = 1
+_HEADER = struct.Struct('<8sHHIQI4x')
+_COLUMN = struct.Struct('<16s4s')
+_BLOCK = struct.Struct('<I4x')
+
+# 列定义（与 record_io.STAT_FIELDS 一致）
+COLUMN_TYPES = tuple(
+    (field, '<i4' if field in record_io.INT_FIELDS else '<f8')
+    for field in record_io.STAT_FIELDS
+)
+# '<i4' 列可存储的范围
+_INT32_MIN = -2 ** 31
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _aligned(size: int) -> int:
+    """向上对齐到8字节"""
+    return (size + 7) & ~7
+
+
+class ColumnStoreWriter:
+    """列式文件写入器（按块缓冲，内存占用只与块大小有关）"""
+
+    def __init__(self, path: str, block_rows: int = 65536):
+        if block_rows <= 0:
+            raise ValueError("block_rows 必须大于0")
+        self.path = path
+        self.block_rows = block_rows
+        self.row_count = 0
+        self._file = open(path, 'wb')
+        self._buffers = {name: [] for name, _ in COLUMN_TYPES}
+        self._file.write(self._header())
+        for name, dtype in COLUMN_TYPES:
+            self._file.write(_COLUMN.pack(name.encode('ascii'), dtype.encode('ascii')))
+        self._pad()
+
+    def append(self, record: dict):
+        """追加一条记录（字段解析规则与批量命令行一致）"""
+        stats = record_io.parse_stats(record)
+        for name in record_io.INT_FIELDS:
+            if not _INT32_MIN <= stats[name] <= _INT32_MAX:
+                raise ValueError(f"字段 {name} 的值超出32位整数范围: {stats[name]}")
+        for name, buffer in self._buffers.items():
+            buffer.append(stats[name])
+        if len(self._buffers['kills']) >= self.block_rows:
+            self._flush_block()
+
+    def extend(self, records):
+        """追加多条记录"""
+        for record in records:
+            self.append(record)
+
+    def close(self):
+        """写出剩余数据并更新文件头中的总行数"""
+        if self._file.closed:
+            return
+        self._flush_block()
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _header(self) -> bytes:
+        return _HEADER.pack(MAGIC, SCHEMA_VERSION, len(COLUMN_TYPES), 0,
+                            self.row_count, self.block_rows)
+
+    def _flush_block(self):
+        """写出一个数据块"""
+        rows = len(self._buffers['kills'])
+        if not rows:
+            return
+        self._file.write(_BLOCK.pack(rows))
+        # 按文件头声明的 dtype（显式小端、定长）写出，与本机字节序和 C int 宽度无关
+        columns = {name: np.array(self._buffers[name], dtype=dtype)
+                   for name, dtype in COLUMN_TYPES}
+        for name, _ in COLUMN_TYPES:
+            self._file.write(columns[name].tobytes())
+            self._pad()
+
+        self._file.write(np.packbits(~np.isnan(columns['rws']), bitorder='little').tobytes())
+        self._pad()
+
+        self.row_count += rows
+        self._buffers = {name: [] for name, _ in COLUMN_TYPES}
+
+    def _pad(self):
+        position = self._file.tell()
+        self._file.write(b'\x00' * (_aligned(position) - position))
+
+
+class ColumnStoreReader:
+    """列式文件读取器（内存映射，按块/批产出零拷贝的numpy视图）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件无法映射
+            self._file.close()
+            raise ValueError(f"不是有效的列式数据文件: {path}")
+        self._blocks = []
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"不是有效的列式数据文件: {self.path}")
+        magic, version, column_count, _, self.row_count, self.block_rows = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是有效的列式数据文件: {self.path}")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"不支持的文件版本: {version}（当前支持 {SCHEMA_VERSION}）")
+
+        size = len(self._map)
+        offset = _HEADER.size
+        if offset + column_count * _COLUMN.size > size:
+            raise ValueError(f"文件不完整: 列描述超出文件末尾 ({self.path})")
+        self.columns = []
+        for _ in range(column_count):
+            name, dtype = _COLUMN.unpack_from(self._map, offset)
+            try:
+                self.columns.append((name.rstrip(b'\x00').decode('ascii'),
+                                     np.dtype(dtype.rstrip(b'\x00').decode('ascii'))))
+            except (UnicodeDecodeError, TypeError) as e:
+                raise ValueError(f"列描述无效: {e}") from e
+            offset += _COLUMN.size
+        offset = _aligned(offset)
+        missing = set(record_io.STAT_FIELDS) - {name for name, _ in self.columns}
+        if missing:
+            raise ValueError(f"缺少列: {', '.join(sorted(missing))}")
+
+        # 建立数据块索引：(行数, {列名: 偏移}, 位图偏移)。打开时检查每块的结束位置，
+        # 截断的文件在这里报错，而不是在之后读取时才由 NumPy 报错
+        total = 0
+        while offset < size:
+            if offset + _BLOCK.size > size:
+                raise ValueError(f"文件不完整: 第 {len(self._blocks)} 块的块头被截断")
+            rows, = _BLOCK.unpack_from(self._map, offset)
+            offset += _BLOCK.size
+            column_offsets = {}
+            for name, dtype in self.columns:
+                column_offsets[name] = offset
+                offset = _aligned(offset + rows * dtype.itemsize)
+            bitmap_offset = offset
+            end = offset + (rows + 7) // 8
+            if end > size:
+                raise ValueError(f"文件不完整: 第 {len(self._blocks)} 块需要 {end:,} 字节，"
+                                 f"文件只有 {size:,} 字节")
+            offset = _aligned(end)
+            self._blocks.append((rows, column_offsets, bitmap_offset))
+            total += rows
+        if total != self.row_count:
+            raise ValueError(f"文件不完整: 期望 {self.row_count} 行，实际 {total} 行")
+
+    def __len__(self):
+        return self.row_count
+
+    def iter_blocks(self):
+        """逐块产出 {列名: 只读numpy视图}"""
+        for rows, column_offsets, _ in self._blocks:
+            yield {
+                name: np.frombuffer(self._map, dtype=dtype, count=rows,
+                                    offset=column_offsets[name])
+                for name, dtype in self.columns
+            }
+
+    def iter_batches(self, batch_rows: int = 65536):
+        """按指定行数产出批次（批次不跨块，切片仍为零拷贝视图）"""
+        if batch_rows <= 0:
+            raise ValueError("batch_rows 必须大于0")
+        for block in self.iter_blocks():
+            rows = len(block['kills'])
+            for start in range(0, rows, batch_rows):
+                yield {name: values[start:start + batch_rows] for name, values in block.items()}
+
+    def rws_valid_mask(self):
+        """逐块产出RWS有值位图（解包为bool数组）"""
+        for rows, _, bitmap_offset in self._blocks:
+            packed = np.frombuffer(self._map, dtype=np.uint8, count=(rows + 7) // 8,
+                                   offset=bitmap_offset)
+            yield np.unpackbits(packed, count=rows, bitorder='little').astype(bool)
+
+    def rate(self, method: str = "composite", batch_rows: int = 65536):
+        """逐批校验并计算评分，产出float64数组（未通过校验的行为 NaN，与其他入口一致不给出评分）"""
+        for batch in self.iter_batches(batch_rows):
+            valid = validate(batch).valid
+            yield np.where(valid, BatchRatingCalculator.calculate(method, batch), np.nan)
+
+    def close(self):
+        """释放内存映射（之后不应再使用已产出的视图）"""
+        if not self._map.closed:
+            try:
+                self._map.close()
+            except BufferError:
+                # 仍有numpy视图引用映射时无法关闭，交由垃圾回收处理
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,400 @@
+import hashlib
+import json
+import os
+
+from models import instrumentation
+from models.rating_cache import invalidate_all_caches
+from models.rating_calculator import RatingResult
+
+# 默认公式定义文件
+DEFAULT_SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'formulas.json')
+SCHEMA_VERSION = 1
+# 额外加载的公式定义文件（如校准得到的系数，多个文件以 os.pathsep 分隔），同ID公式被替换
+FORMULAS_ENV = 'CS_RATING_FORMULAS'
+
+# 统一的标量求值函数签名（与 RatingCalculator.calculate_rating 参数一致）
+_SCALAR_SIGNATURE = ("kills, deaths, assists, rounds, mvps, adr, hs_percent, "
+                     "kills_3k=0, kills_4k=0, kills_5k=0, rws=None, kast=None")
+
+# 各类公式的必需参数
+_REQUIRED = {
+    'rating_1_0': (('spr', 'divisor', 'rmk_3k', 'rmk_4k', 'rmk_5k'), ('rmk',)),
+    'rating_2_0': (('kpr', 'dpr', 'impact', 'adr', 'kast', 'intercept',
+                    'impact_multikill', 'impact_kpr', 'impact_survival',
+                    'multikill_3k', 'multikill_4k', 'multikill_5k', 'kast_contribution'),
+                   ('adr', 'multikill', 'kast')),
+    'custom': (('kpr', 'survival', 'apr', 'adr', 'hs', 'mvp',
+                'rws_base', 'rws_divisor', 'scale', 'offset'),
+               ('dpr', 'adr', 'hs_percent', 'rws')),
+    'composite': ((), ()),
+}
+
+# 代码模板：系数以字面量写入。这是评分公式的唯一实现，RatingCalculator / BatchRatingCalculator
+# 的各方法只是转调注册表；标量与向量化模板的运算顺序一致，两者结果逐位相同。
+#
+# 标量公式体计算中间值与 rating；scalar 只返回评分，evaluate 在同一段代码之后把中间值
+# 一起返回为 RatingResult（界面明细由它渲染，不再重复计算）。
+_BODY_TEMPLATES = {
+    'rating_1_0': '''
+    rounds = max(1, rounds)
+    kpr = kills / rounds
+    spr = (rounds - deaths) / rounds
+    rmk = min((kills_3k * {c[rmk_3k]!r} + kills_4k * {c[rmk_4k]!r} + kills_5k * {c[rmk_5k]!r}) / rounds,
+              {k[rmk]!r})
+    rating = max({lo!r}, min({hi!r}, (kpr + {c[spr]!r} * spr + rmk) / {c[divisor]!r}))
+''',
+    'rating_2_0': '''
+    rounds = max(1, rounds)
+    kpr = kills / rounds
+    dpr = deaths / rounds
+    kast = kast or min({k[kast]!r}, (min(kills + assists, rounds * {c[kast_contribution]!r}) +
+                                 max(0, rounds - deaths)) / rounds * 100)
+    multikill = min((kills_3k * {c[multikill_3k]!r} + kills_4k * {c[multikill_4k]!r} +
+                     kills_5k * {c[multikill_5k]!r}) / rounds, {k[multikill]!r})
+    impact = ({c[impact_multikill]!r} * multikill + {c[impact_kpr]!r} * kpr +
+              {c[impact_survival]!r} * (rounds - deaths) / rounds)
+    rating = max({lo!r}, min({hi!r}, {rating_expr}))
+''',
+    'custom': '''
+    rounds = max(1, rounds)
+    kpr = kills / rounds
+    dpr = deaths / rounds
+    apr = assists / rounds
+    adr_term = min({k[adr]!r}, adr) / 100
+    hs_term = min({k[hs_percent]!r}, hs_percent) / 100
+    mvp_rate = mvps / rounds
+    base = (
+            {c[kpr]!r} * kpr +
+            {c[survival]!r} * (1 - min({k[dpr]!r}, dpr)) +
+            {c[apr]!r} * apr +
+            {c[adr]!r} * adr_term +
+            {c[hs]!r} * hs_term +
+            {c[mvp]!r} * mvp_rate
+    )
+    rws_factor = None
+    if rws is not None:
+        rws_factor = {c[rws_base]!r} + (min({k[rws]!r}, max(0.0, rws or 0)) / {c[rws_divisor]!r})
+        base *= rws_factor
+    rating = max({lo!r}, min({hi!r}, base * {c[scale]!r} + {c[offset]!r}))
+''',
+    # 组合公式：scalar 调用各组成部分的 scalar，evaluate 调用其 evaluate（各自只算一次）
+    'composite': '''
+    components = ({component_results},)
+    rating = max({lo!r}, min({hi!r}, ({component_result_sum}) / {component_count}))
+    rounds = max(1, rounds)
+    kpr = kills / rounds
+    dpr = deaths / rounds
+    apr = assists / rounds
+''',
+}
+
+# evaluate 额外返回的中间值（其余字段为输入）
+_RESULT_FIELDS = {
+    'rating_1_0': ('kpr', 'spr', 'rmk'),
+    'rating_2_0': ('kpr', 'dpr', 'kast', ('multikill_impact', 'multikill'), 'impact'),
+    'custom': ('kpr', 'dpr', 'apr', 'adr_term', 'hs_term', 'mvp_rate', 'rws_factor'),
+    'composite': ('components', 'kpr', 'dpr', 'apr'),
+}
+_INPUT_FIELDS = ('kills', 'deaths', 'assists', 'rounds', 'mvps', 'adr', 'hs_percent',
+                 'kills_3k', 'kills_4k', 'kills_5k', 'rws')
+
+_SCALAR_TEMPLATES = {
+    kind: "\ndef scalar({signature}):" + body + "    return rating\n"
+    for kind, body in _BODY_TEMPLATES.items() if kind != 'composite'
+}
+_SCALAR_TEMPLATES['composite'] = '''
+def scalar({signature}):
+    return max({lo!r}, min({hi!r}, ({component_sum}) / {component_count}))
+'''
+
+
+def _evaluate_template(kind: str) -> str:
+    """evaluate 的代码模板：公式体之后逐个写入 RatingResult 的槽（比关键字参数构造快）"""
+    fields = [field if isinstance(field, tuple) else (field, field)
+              for field in _RESULT_FIELDS[kind]]
+    fields = [('method', '{method!r}'), ('rating', 'rating')] + \
+        [(name, name) for name in _INPUT_FIELDS] + fields
+    assignments = ''.join(f"    result.{slot} = {name}\n" for slot, name in fields)
+    return ("\ndef evaluate({signature}):" + _BODY_TEMPLATES[kind] +
+            "    result = _new(_RatingResult)\n" + assignments + "    return result\n")
+
+
+_EVALUATE_TEMPLATES = {kind: _evaluate_template(kind) for kind in _BODY_TEMPLATES}
+
+_VECTOR_TEMPLATES = {
+    'rating_1_0': '''
+def vector(columns):
+    rounds = np.maximum(np.asarray(columns['rounds']), 1)
+    kpr = np.asarray(columns['kills']) / rounds
+    spr = (rounds - np.asarray(columns['deaths'])) / rounds
+    rmk = np.fmin((np.asarray(columns['kills_3k']) * {c[rmk_3k]!r} +
+                   np.asarray(columns['kills_4k']) * {c[rmk_4k]!r} +
+                   np.asarray(columns['kills_5k']) * {c[rmk_5k]!r}) / rounds, {k[rmk]!r})
+    return np.fmax({lo!r}, np.fmin({hi!r}, (kpr + {c[spr]!r} * spr + rmk) / {c[divisor]!r})
+                   ).astype(np.float64, copy=False)
+''',
+    'rating_2_0': '''
+def vector(columns):
+    kills = np.asarray(columns['kills'])
+    deaths = np.asarray(columns['deaths'])
+    rounds = np.maximum(np.asarray(columns['rounds']), 1)
+    kpr = kills / rounds
+    dpr = deaths / rounds
+    kast = np.fmin({k[kast]!r}, (np.fmin(kills + np.asarray(columns['assists']),
+                                        rounds * {c[kast_contribution]!r}) +
+                                np.maximum(0, rounds - deaths)) / rounds * 100)
+    multikill = np.fmin((np.asarray(columns['kills_3k']) * {c[multikill_3k]!r} +
+                         np.asarray(columns['kills_4k']) * {c[multikill_4k]!r} +
+                         np.asarray(columns['kills_5k']) * {c[multikill_5k]!r}) / rounds,
+                        {k[multikill]!r})
+    impact = ({c[impact_multikill]!r} * multikill + {c[impact_kpr]!r} * kpr +
+              {c[impact_survival]!r} * (rounds - deaths) / rounds)
+    exact_kast = columns.get('kast')
+    if exact_kast is not None:
+        # 回合级精确KAST：NaN 或 0 表示未提供（与标量的 kast or ... 一致）
+        exact_kast = np.asarray(exact_kast, dtype=np.float64)
+        kast = np.where(np.isnan(exact_kast) | (exact_kast == 0), kast, exact_kast)
+    adr = np.asarray(columns['adr'], dtype=np.float64)
+    rating = {rating_expr_vector}
+    return np.fmax({lo!r}, np.fmin({hi!r}, rating)).astype(np.float64, copy=False)
+''',
+    'custom': '''
+def vector(columns):
+    rounds = np.maximum(np.asarray(columns['rounds']), 1)
+    adr = np.asarray(columns['adr'], dtype=np.float64)
+    hs_percent = np.asarray(columns['hs_percent'], dtype=np.float64)
+    base = (
+            {c[kpr]!r} * (np.asarray(columns['kills']) / rounds) +
+            {c[survival]!r} * (1 - np.fmin({k[dpr]!r}, np.asarray(columns['deaths']) / rounds)) +
+            {c[apr]!r} * (np.asarray(columns['assists']) / rounds) +
+            {c[adr]!r} * (np.fmin({k[adr]!r}, adr) / 100) +
+            {c[hs]!r} * (np.fmin({k[hs_percent]!r}, hs_percent) / 100) +
+            {c[mvp]!r} * (np.asarray(columns['mvps']) / rounds)
+    )
+    rws = columns.get('rws')
+    if rws is not None:
+        rws = np.asarray(rws, dtype=np.float64)
+        factor = {c[rws_base]!r} + (np.fmin({k[rws]!r}, np.fmax(0.0, np.nan_to_num(rws, nan=0.0)))
+                                  / {c[rws_divisor]!r})
+        base = np.where(np.isnan(rws), base, base * factor)
+    return np.fmax({lo!r}, np.fmin({hi!r}, base * {c[scale]!r} + {c[offset]!r})
+                   ).astype(np.float64, copy=False)
+''',
+    'composite': '''
+def vector(columns):
+    return np.fmax({lo!r}, np.fmin({hi!r}, ({component_sum_vector}) / {component_count})
+                   ).astype(np.float64, copy=False)
+''',
+}
+
+
+def _linear_expression(terms: list, intercept: float) -> str:
+    """生成 a*x + b*y - c*z + d 形式的表达式（负系数写作减法）"""
+    parts = []
+    for coefficient, name in terms:
+        if not parts:
+            parts.append(f"{coefficient!r} * {name}")
+        elif coefficient < 0:
+            parts.append(f" - {-coefficient!r} * {name}")
+        else:
+            parts.append(f" + {coefficient!r} * {name}")
+    parts.append(f" - {-intercept!r}" if intercept < 0 else f" + {intercept!r}")
+    return ''.join(parts)
+
+
+class CompiledFormula:
+    """编译后的公式：scalar(**stats) 返回单个评分，vector(columns) 返回评分数组，
+    evaluate(**stats) 返回包含中间值的 RatingResult（与 scalar 同一段运算，评分逐位相同）
+
+    三个求值函数是所有计算入口实际调用的函数，各自登记为插桩点 "formula.<ID>.<函数>"
+    （vector/evaluate 在首次编译时登记）。
+    """
+
+    def __init__(self, spec: dict, fingerprint: str, scalar_source: str,
+                 vector_source: str, namespace: dict, components: list = (),
+                 evaluate_source: str = None):
+        self.id = spec['id']
+        self.name = spec.get('name', spec['id'])
+        self.version = spec.get('version', 1)
+        self.kind = spec['kind']
+        self.spec = spec
+        self.fingerprint = fingerprint
+        # 组合公式的组成部分（编译时的公式对象）
+        self.components = list(components)
+        self.scalar_source = scalar_source
+        self.vector_source = vector_source
+        self.evaluate_source = evaluate_source
+        self._namespace = namespace
+        exec(compile(scalar_source, f"<formula {self.id} scalar>", 'exec'), namespace)
+        # 未插桩的标量函数（组合公式直接调用，不受插桩开关影响）
+        self._scalar = namespace['scalar']
+        self.scalar = self._scalar
+        instrumentation.instrument(self, 'scalar', prefix=f"formula.{self.id}")
+
+    def __getattr__(self, name: str):
+        """vector / evaluate 首次使用时编译，之后为实例属性（不再经过这里）
+
+        vector 延迟编译以避免纯标量场景导入NumPy，evaluate 批量计算不需要。
+        """
+        if name == 'vector':
+            import numpy as np
+            namespace = dict(self._namespace, np=np)
+            source = self.vector_source
+        elif name == 'evaluate':
+            namespace = dict(self._namespace, _RatingResult=RatingResult, _new=object.__new__)
+            source = self.evaluate_source
+        else:
+            raise AttributeError(name)
+        exec(compile(source, f"<formula {self.id} {name}>", 'exec'), namespace)
+        setattr(self, name, namespace[name])
+        instrumentation.instrument(self, name, prefix=f"formula.{self.id}")
+        # 插桩开启时 instrument 已替换为计时包装函数
+        return vars(self)[name]
+
+    def __repr__(self):
+        return f"<CompiledFormula {self.id} v{self.version} {self.fingerprint}>"
+
+
+class FormulaRegistry:
+    """公式注册表：按算法ID分发到编译好的求值函数"""
+
+    def __init__(self):
+        self._formulas = {}
+
+    def __iter__(self):
+        return iter(self._formulas.values())
+
+    def __contains__(self, formula_id):
+        return formula_id in self._formulas
+
+    def ids(self) -> list:
+        """所有算法ID（按注册顺序）"""
+        return list(self._formulas)
+
+    def get(self, formula_id: str) -> CompiledFormula:
+        """按算法ID获取公式"""
+        try:
+            return self._formulas[formula_id]
+        except KeyError:
+            raise ValueError(f"未知的计算方法: {formula_id}") from None
+
+    def load(self, path: str):
+        """加载公式定义文件（已注册的同ID公式被替换并保持原有顺序）"""
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+        if document.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(f"不支持的公式文件版本: {document.get('schema_version')}")
+        existing = list(self._formulas)
+        # 组合公式依赖其他公式，先注册基础公式
+        specs = document['formulas']
+        for spec in sorted(specs, key=lambda spec: spec.get('kind') == 'composite'):
+            self.register(spec)
+        # 已有公式保持原顺序，新公式按文件中的顺序排在后面（决定界面下拉框与命令行选项的顺序）
+        order = existing + [spec['id'] for spec in specs if spec['id'] not in existing]
+        self._formulas = dict(sorted(
+            self._formulas.items(),
+            key=lambda item: order.index(item[0]) if item[0] in order else len(order)))
+        return self
+
+    def register(self, spec: dict) -> CompiledFormula:
+        """编译并注册一个公式（同ID公式被替换时使相关缓存失效）"""
+        formula = self._compile(spec)
+        replaced = formula.id in self._formulas
+        self._formulas[formula.id] = formula
+        if replaced:
+            invalidate_all_caches(formula.id)
+            # 依赖该公式的组合公式需要重新编译
+            for dependent in list(self._formulas.values()):
+                if formula.id in dependent.spec.get('components', ()):
+                    self.register(dependent.spec)
+        return formula
+
+    def evaluate(self, formula_id: str, **stats) -> float:
+        """按算法ID计算单组数据"""
+        return self.get(formula_id).scalar(**stats)
+
+    def evaluate_batch(self, formula_id: str, columns: dict):
+        """按算法ID计算一批列式数据"""
+        return self.get(formula_id).vector(columns)
+
+    def _compile(self, spec: dict) -> CompiledFormula:
+        """校验公式定义并生成专用求值代码"""
+        kind = spec.get('kind')
+        if kind not in _REQUIRED:
+            raise ValueError(f"未知的公式类型: {kind}")
+        if 'id' not in spec:
+            raise ValueError("公式定义缺少 id")
+        coefficients = spec.get('coefficients', {})
+        caps = spec.get('caps', {})
+        required_coefficients, required_caps = _REQUIRED[kind]
+        missing = ([name for name in required_coefficients if name not in coefficients] +
+                   [f"caps.{name}" for name in required_caps if name not in caps])
+        if missing:
+            raise ValueError(f"公式 {spec['id']} 缺少参数: {', '.join(missing)}")
+        lo, hi = spec.get('clamp', (0.0, 3.0))
+
+        values = {'signature': _SCALAR_SIGNATURE, 'c': coefficients, 'k': caps,
+                  'lo': float(lo), 'hi': float(hi), 'method': spec['id']}
+        namespace = {}
+        components = []
+        if kind == 'rating_2_0':
+            terms = [(coefficients['kpr'], 'kpr'), (coefficients['dpr'], 'dpr'),
+                     (coefficients['impact'], 'impact')]
+            tail = [(coefficients['kast'], 'kast')]
+            values['rating_expr'] = _linear_expression(
+                terms + [(coefficients['adr'], f"min({caps['adr']!r}, adr)")] + tail,
+                coefficients['intercept'])
+            values['rating_expr_vector'] = _linear_expression(
+                terms + [(coefficients['adr'], f"np.fmin({caps['adr']!r}, adr)")] + tail,
+                coefficients['intercept'])
+        elif kind == 'composite':
+            components = [self.get(component_id) for component_id in spec['components']]
+            if not components:
+                raise ValueError(f"组合公式 {spec['id']} 没有组成部分")
+            arguments = ("kills, deaths, assists, rounds, mvps, adr, hs_percent, "
+                         "kills_3k, kills_4k, kills_5k, rws, kast")
+            names = [f"_component_{i}" for i in range(len(components))]
+            for name, component in zip(names, components):
+                namespace[name] = component._scalar
+                namespace[f"{name}_formula"] = component
+            values['component_sum'] = ' + '.join(f"{name}({arguments})" for name in names)
+            values['component_sum_vector'] = ' + '.join(
+                f"{name}_formula.vector(columns)" for name in names)
+            values['component_results'] = ', '.join(
+                f"{name}_formula.evaluate({arguments})" for name in names)
+            values['component_result_sum'] = ' + '.join(
+                f"components[{i}].rating" for i in range(len(components)))
+            values['component_count'] = len(components)
+
+        fingerprint = _fingerprint(spec, components)
+        return CompiledFormula(spec, fingerprint,
+                               _SCALAR_TEMPLATES[kind].format(**values),
+                               _VECTOR_TEMPLATES[kind].format(**values), namespace, components,
+                               _EVALUATE_TEMPLATES[kind].format(**values))
+
+
+def _fingerprint(spec: dict, components: list) -> str:
+    """由公式内容（类型、系数、上限、区间及组成部分）得出的版本标识"""
+    content = {
+        'kind': spec['kind'],
+        'coefficients': spec.get('coefficients', {}),
+        'caps': spec.get('caps', {}),
+        'clamp': list(spec.get('clamp', (0.0, 3.0))),
+        'components': [component.fingerprint for component in components],
+    }
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+_default_registry = None
+
+
+def default_registry() -> FormulaRegistry:
+    """默认注册表（首次调用时加载 formulas.json 及 CS_RATING_FORMULAS 指定的文件）"""
+    global _default_registry
+    if _default_registry is None:
+        registry = FormulaRegistry().load(DEFAULT_SPEC_PATH)
+        for path in filter(None, os.environ.get(FORMULAS_ENV, '').split(os.pathsep)):
+            registry.load(path)
+        _default_registry = registry
+    return _default_registry
@@ -0,0 +1,231 @@
+import os
+import time
+from _thread import allocate_lock  # threading 会连带导入 functools/collections，增加导入开销
+
+# 插桩：登记的函数在开启时被替换为计时包装函数，关闭时恢复为原函数对象本身，
+# 因此关闭状态下调用路径与未插桩时完全相同（零开销）。
+#
+# 环境变量 CS_RATING_METRICS:
+#   1/true/on          启动时开启插桩
+#   路径 (*.json/*.prom) 启动时开启，并在进程退出时写出快照（.prom 为Prometheus文本格式）
+ENV_VAR = 'CS_RATING_METRICS'
+
+# 每个函数保留的最近耗时样本数（用于计算分位数）
+SAMPLE_SIZE = 10000
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class FunctionMetrics:
+    """单个函数的调用次数、错误次数、累计耗时与最近耗时样本"""
+
+    __slots__ = ('name', 'calls', 'errors', 'total_seconds', 'samples', 'last_error', '_lock')
+
+    # samples 为环形缓冲区：写满后按 calls 取模覆盖最旧的样本
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.samples = []
+        self.last_error = None
+        self._lock = allocate_lock()
+
+    def record(self, elapsed: float, failed: bool = False):
+        """记录一次调用"""
+        with self._lock:
+            if len(self.samples) < SAMPLE_SIZE:
+                self.samples.append(elapsed)
+            else:
+                self.samples[self.calls % SAMPLE_SIZE] = elapsed
+            self.calls += 1
+            self.total_seconds += elapsed
+            if failed:
+                self.errors += 1
+
+    def record_error(self, error):
+        """记录一次错误事件（被捕获、未向外抛出的异常）"""
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self.samples)
+            snapshot = {
+                'calls': self.calls,
+                'errors': self.errors,
+                'total_seconds': self.total_seconds,
+                'last_error': self.last_error,
+            }
+        for quantile in QUANTILES:
+            snapshot[f'p{int(quantile * 100)}_seconds'] = (
+                samples[min(len(samples) - 1, int(len(samples) * quantile))] if samples else None)
+        return snapshot
+
+
+class _Hook:
+    """一个可插桩的函数：owner.attr（类属性或模块函数）"""
+
+    __slots__ = ('owner', 'attr', 'name', 'original')
+
+    def __init__(self, owner, attr: str, name: str):
+        self.owner = owner
+        self.attr = attr
+        self.name = name
+        self.original = vars(owner)[attr]
+
+
+_metrics = {}
+_hooks = []
+_enabled = False
+_registry_lock = allocate_lock()
+
+
+def metrics(name: str) -> FunctionMetrics:
+    """按名称取得（或创建）函数指标"""
+    metric = _metrics.get(name)
+    if metric is None:
+        with _registry_lock:
+            metric = _metrics.setdefault(name, FunctionMetrics(name))
+    return metric
+
+
+def instrument(owner, *attrs: str, prefix: str = None):
+    """登记可插桩的函数（类的静态方法/普通方法，或模块级函数）
+
+    指标名为 "前缀.函数名"，前缀默认为类名或模块名。
+    """
+    prefix = prefix or getattr(owner, '__qualname__', None) or owner.__name__
+    for attr in attrs:
+        hook = _Hook(owner, attr, f"{prefix}.{attr}")
+        _hooks.append(hook)
+        if _enabled:
+            _patch(hook)
+
+
+def record_error(name: str, error):
+    """记录被捕获的错误事件（始终计数，与是否开启插桩无关）"""
+    metrics(name).record_error(error)
+
+
+def enable():
+    """开启插桩：把所有登记的函数替换为计时包装函数"""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        for hook in _hooks:
+            _patch(hook)
+
+
+def disable():
+    """关闭插桩：恢复原函数"""
+    global _enabled
+    if _enabled:
+        _enabled = False
+        for hook in _hooks:
+            setattr(hook.owner, hook.attr, hook.original)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def hooks() -> list:
+    """所有登记的函数 [(指标名, 所属对象, 属性名, 原函数)]"""
+    return [(hook.name, hook.owner, hook.attr, hook.original) for hook in _hooks]
+
+
+def reset():
+    """清空所有指标"""
+    with _registry_lock:
+        _metrics.clear()
+
+
+def snapshot() -> dict:
+    """所有函数的指标快照 {函数名: {...}}"""
+    return {name: metric.snapshot() for name, metric in sorted(_metrics.items())}
+
+
+def to_json() -> str:
+    import json
+    return json.dumps({'enabled': _enabled, 'functions': snapshot()},
+                      indent=2, ensure_ascii=False)
+
+
+def to_prometheus() -> str:
+    """Prometheus 文本格式（summary + 错误计数器）"""
+    lines = [
+        "# HELP cs_rating_call_seconds Wall time of instrumented functions.",
+        "# TYPE cs_rating_call_seconds summary",
+    ]
+    functions = snapshot()
+    for name, values in functions.items():
+        label = _label(name)
+        for quantile in QUANTILES:
+            value = values[f'p{int(quantile * 100)}_seconds']
+            if value is not None:
+                lines.append(f'cs_rating_call_seconds{{function="{label}",quantile="{quantile}"}} '
+                             f'{value!r}')
+        lines.append(f'cs_rating_call_seconds_sum{{function="{label}"}} {values["total_seconds"]!r}')
+        lines.append(f'cs_rating_call_seconds_count{{function="{label}"}} {values["calls"]}')
+    lines.append("# HELP cs_rating_errors_total Errors raised or caught in instrumented functions.")
+    lines.append("# TYPE cs_rating_errors_total counter")
+    for name, values in functions.items():
+        lines.append(f'cs_rating_errors_total{{function="{_label(name)}"}} {values["errors"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_snapshot(path: str):
+    """写出指标快照（.prom 为Prometheus文本格式，其余为JSON）"""
+    text = to_prometheus() if path.endswith('.prom') else to_json()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _label(name: str) -> str:
+    return name.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _patch(hook: _Hook):
+    """把登记的函数替换为计时包装函数（保持 staticmethod/classmethod 形式）"""
+    original = hook.original
+    if isinstance(original, (staticmethod, classmethod)):
+        wrapped = type(original)(_timed(original.__func__, metrics(hook.name)))
+    else:
+        wrapped = _timed(original, metrics(hook.name))
+    setattr(hook.owner, hook.attr, wrapped)
+
+
+def _timed(func, metric: FunctionMetrics):
+    perf_counter = time.perf_counter
+    record = metric.record
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            record(perf_counter() - start, True)
+            raise
+        record(perf_counter() - start)
+        return result
+
+    wrapper.__name__ = func.__name__
+    wrapper.__qualname__ = func.__qualname__
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def _configure_from_env():
+    value = os.environ.get(ENV_VAR, '').strip()
+    if not value or value.lower() in ('0', 'false', 'off'):
+        return
+    enable()
+    if value.lower() not in ('1', 'true', 'on'):
+        import atexit
+        atexit.register(write_snapshot, value)
+
+
+_configure_from_env()
@@ -0,0 +1,234 @@
+import glob
+import json
+import os
+import socket
+import time
+import uuid
+
+# 可断点续算的作业目录：多台机器只共享文件系统，各自运行 worker 领取工作单元
+#
+#   job.json              作业设置（计算方法、公式指纹、输入/输出格式与列、单元数），切分完成后最后写入
+#   units/000042.in       第42个工作单元的原始记录（CSV 不含表头）
+#   leases/000042.lease   租约 {"worker", "token", "expires"}：写好临时文件后 os.link 原子创建，
+#                         持有者定期续约；过期的租约由其他 worker 改名取走后重新领取
+#   done/000042.json      检查点：该单元的行数、未通过校验的行（先于输出写入）
+#   done/000042.out       该单元的输出（写临时文件、fsync 后 os.replace；文件出现即表示单元完成）
+#
+# 单元的输出只取决于输入与公式（公式指纹不一致的 worker 拒绝工作），重复计算得到相同的文件：
+# 租约被回收而原持有者仍在计算、两个 worker 同时计算同一单元时，提交只是用相同内容替换同一个文件，
+# 不会出现重复或丢失的行。租约只是为了避免重复劳动。过期判断使用各机器的本地时钟，需大致同步。
+SCHEMA_VERSION = 1
+JOB_FILE = 'job.json'
+DEFAULT_UNIT_SIZE = 65536
+DEFAULT_LEASE_TTL = 60.0
+
+
+def default_worker_id() -> str:
+    """worker 名称：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _write_atomic(path: str, text: str):
+    """写临时文件并 fsync 后替换，读者只会看到完整的旧文件或新文件"""
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _read_json(path: str):
+    """读取 JSON 文件（不存在时为 None）"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Lease:
+    """一个工作单元的租约"""
+
+    def __init__(self, unit: int, worker: str, token: str, expires: float):
+        self.unit = unit
+        self.worker = worker
+        self.token = token
+        self.expires = expires
+
+    def to_dict(self) -> dict:
+        return {'worker': self.worker, 'token': self.token, 'expires': self.expires}
+
+
+class JobSpool:
+    """作业目录（见文件开头的说明）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        settings = _read_json(os.path.join(path, JOB_FILE))
+        if not isinstance(settings, dict):
+            raise ValueError(f"不是已初始化的作业目录: {path}")
+        if settings.get('version') != SCHEMA_VERSION:
+            raise ValueError(f"不支持的作业版本: {settings.get('version')}（当前支持 {SCHEMA_VERSION}）")
+        self.settings = settings
+        self.units = settings['units']
+        # 已确认完成的单元（完成后不会再变，不必重复检查）
+        self._done = set()
+
+    @classmethod
+    def create(cls, path: str, settings: dict, chunks) -> 'JobSpool':
+        """切分输入：chunks 逐个产出工作单元的原始记录列表，全部写完后才写入 job.json
+
+        切分中断时目录中没有 job.json，重新运行即可（已写出的单元被覆盖）。
+        """
+        if os.path.exists(os.path.join(path, JOB_FILE)):
+            raise ValueError(f"作业目录已初始化: {path}")
+        for name in ('units', 'leases', 'done'):
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+        units = rows = 0
+        for raw_records in chunks:
+            _write_atomic(os.path.join(path, 'units', f"{units:06d}.in"), ''.join(raw_records))
+            units += 1
+            rows += len(raw_records)
+        settings = dict(settings, version=SCHEMA_VERSION, units=units, rows=rows)
+        _write_atomic(os.path.join(path, JOB_FILE), json.dumps(settings, ensure_ascii=False))
+        return cls(path)
+
+    # ---- 文件路径 ----
+
+    def unit_path(self, unit: int) -> str:
+        return os.path.join(self.path, 'units', f"{unit:06d}.in")
+
+    def _lease_path(self, unit: int) -> str:
+        return os.path.join(self.path, 'leases', f"{unit:06d}.lease")
+
+    def output_path(self, unit: int) -> str:
+        return os.path.join(self.path, 'done', f"{unit:06d}.out")
+
+    def _checkpoint_path(self, unit: int) -> str:
+        return os.path.join(self.path, 'done', f"{unit:06d}.json")
+
+    # ---- 租约 ----
+
+    def is_done(self, unit: int) -> bool:
+        if unit in self._done:
+            return True
+        if os.path.exists(self.output_path(unit)):
+            self._done.add(unit)
+            return True
+        return False
+
+    def claim(self, worker: str, ttl: float = DEFAULT_LEASE_TTL) -> Lease:
+        """领取下一个未完成、无人持有（或租约已过期）的单元，没有时返回 None"""
+        for unit in range(self.units):
+            if self.is_done(unit):
+                continue
+            lease = self._acquire(unit, worker, ttl)
+            if lease is None:
+                continue
+            # 领取前刚好被其他 worker 提交并释放的单元
+            if self.is_done(unit):
+                self.release(lease)
+                continue
+            return lease
+        return None
+
+    def _acquire(self, unit: int, worker: str, ttl: float) -> Lease:
+        lease = Lease(unit, worker, uuid.uuid4().hex, time.time() + ttl)
+        path = self._lease_path(unit)
+        temp_path = f"{path}.{lease.token}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(lease.to_dict(), f)
+        try:
+            for _ in range(2):
+                try:
+                    os.link(temp_path, path)
+                    return lease
+                except FileExistsError:
+                    if not self._reclaim(path):
+                        return None
+            return None
+        finally:
+            os.remove(temp_path)
+
+    def _reclaim(self, path: str) -> bool:
+        """取走已过期的租约（改名是原子的，多个 worker 同时回收时只有一个成功）"""
+        current = _read_json(path)
+        if current is None:
+            return True  # 持有者刚刚释放
+        if current.get('expires', 0) >= time.time():
+            return False
+        stale_path = f"{path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:
+            return True
+        try:
+            taken = _read_json(stale_path) or {}
+            if taken.get('expires', 0) >= time.time():
+                # 改名前持有者刚好续约：放回原处（此时已有新租约则放弃）
+                try:
+                    os.link(stale_path, path)
+                except FileExistsError:
+                    pass
+                return False
+        finally:
+            os.remove(stale_path)
+        return True
+
+    def renew(self, lease: Lease, ttl: float = DEFAULT_LEASE_TTL) -> bool:
+        """续约，租约已被回收时返回 False"""
+        current = _read_json(self._lease_path(lease.unit))
+        if not current or current.get('token') != lease.token:
+            return False
+        lease.expires = time.time() + ttl
+        _write_atomic(self._lease_path(lease.unit), json.dumps(lease.to_dict()))
+        return True
+
+    def release(self, lease: Lease):
+        """释放租约（已被其他 worker 回收时不做任何事）"""
+        current = _read_json(self._lease_path(lease.unit))
+        if current and current.get('token') == lease.token:
+            os.remove(self._lease_path(lease.unit))
+
+    def commit(self, lease: Lease, text: str, checkpoint: dict):
+        """提交单元：先写检查点，再原子替换输出文件（输出出现即完成），最后释放租约"""
+        checkpoint = dict(checkpoint, unit=lease.unit, worker=lease.worker,
+                          finished=time.time())
+        _write_atomic(self._checkpoint_path(lease.unit),
+                      json.dumps(checkpoint, ensure_ascii=False))
+        _write_atomic(self.output_path(lease.unit), text)
+        self._done.add(lease.unit)
+        self.release(lease)
+
+    # ---- 进度 ----
+
+    def checkpoint(self, unit: int) -> dict:
+        """已完成单元的检查点"""
+        return _read_json(self._checkpoint_path(unit))
+
+    def status(self) -> dict:
+        """各状态的单元数与已完成的行数"""
+        now = time.time()
+        done = [unit for unit in range(self.units) if self.is_done(unit)]
+        leases = {}
+        for path in glob.glob(os.path.join(self.path, 'leases', '*.lease')):
+            lease = _read_json(path)
+            if lease is not None:
+                leases[int(os.path.basename(path)[:-len('.lease')])] = lease
+        active = [unit for unit, lease in leases.items()
+                  if unit not in self._done and lease.get('expires', 0) >= now]
+        expired = [unit for unit, lease in leases.items()
+                   if unit not in self._done and lease.get('expires', 0) < now]
+        return {
+            'units': self.units, 'done': len(done), 'leased': len(active),
+            'expired': len(expired), 'pending': self.units - len(done) - len(active),
+            'rows': self.settings['rows'],
+            'rows_done': sum(self.checkpoint(unit)['rows'] for unit in done),
+            'workers': sorted({leases[unit]['worker'] for unit in active}),
+        }
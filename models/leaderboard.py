@@ -0,0 +1,241 @@
+import datetime
+import functools
+import heapq
+import itertools
+import json
+import os
+
+import numpy as np
+
+from models.rating_calculator import RatingCalculator
+
+# 流式分组排行榜：每组一个容量为 K 的最小堆，内存为 O(组数 × K)，与输入大小无关。
+#
+# 排序键（越大越靠前）: (评分, 各并列字段..., -分片号, -行号)
+#   并列字段默认比较回合数（样本更多者靠前），字段名前加 '-' 表示越小越靠前；
+#   最后按分片号、行号（先出现者靠前）保证键唯一，因此分片的部分结果按任意顺序合并，
+#   结果都相同；分片按输入顺序编号时与单次处理全部输入完全一致。
+SCHEMA_VERSION = 1
+DEFAULT_K = 100
+DEFAULT_TIE_BREAK = ('rounds',)
+
+# 分组字段可写为 "变换:字段"，由字段值派生分组值
+GROUP_TRANSFORMS = ('week', 'day', 'month')
+
+
+def _date_of(value: str) -> datetime.date:
+    """日期/时间字段：ISO 日期时间字符串或 Unix 时间戳（秒，UTC）"""
+    try:
+        timestamp = float(value)
+    except ValueError:
+        return datetime.date.fromisoformat(value[:10])
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date()
+
+
+@functools.lru_cache(maxsize=65536)
+def _transform(name: str, value: str) -> str:
+    """分组值变换：week → ISO 周（2024-W18），day → 日期，month → 年月（日期大量重复，结果缓存）"""
+    if not value:
+        return ''
+    try:
+        date = _date_of(value)
+    except ValueError as e:
+        raise ValueError(f"无法解析日期: {value!r}") from e
+    if name == 'week':
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    if name == 'day':
+        return date.isoformat()
+    return f"{date.year}-{date.month:02d}"
+
+
+def _parse_group(spec: str) -> tuple:
+    """分组字段说明 → (输出列名, 变换名或 None, 记录字段)"""
+    name, _, field = spec.partition(':')
+    if not field:
+        return spec, None, spec
+    if name not in GROUP_TRANSFORMS:
+        raise ValueError(f"未知的分组变换: {name}（可用: {', '.join(GROUP_TRANSFORMS)}）")
+    return name, name, field
+
+
+def _float(value) -> float:
+    """数值字段（空值为 NaN）"""
+    return np.nan if value in (None, '') else float(value)
+
+
+class Leaderboard:
+    """分组 top-K 排行榜（流式更新，可合并）
+
+    group_by 为分组字段（如 ('map', 'team', 'week:date')），为空时只有一个总榜；
+    min_rounds 过滤回合数不足的记录；tie_break 为评分相同时依次比较的字段。
+    source 为分片号：并行处理输入的各分片应使用不同的分片号，合并结果才与单次处理一致。
+    """
+
+    def __init__(self, k: int = DEFAULT_K, group_by: tuple = (), min_rounds: int = 0,
+                 tie_break: tuple = DEFAULT_TIE_BREAK, source: int = 0):
+        if k <= 0:
+            raise ValueError("k 必须大于0")
+        self.k = k
+        self.group_by = tuple(group_by)
+        self._groups_spec = [_parse_group(spec) for spec in self.group_by]
+        self.min_rounds = min_rounds
+        self.tie_break = tuple(tie_break)
+        self._ties = [(field[1:], -1.0) if field.startswith('-') else (field, 1.0)
+                      for field in self.tie_break]
+        self.source = source
+        # 已处理的行数（下一块的起始行号）与各组的堆：[(排序键, 序号, 记录)]
+        self.seen = 0
+        self._heaps = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heaps)
+
+    @property
+    def group_names(self) -> list:
+        """分组列的输出列名"""
+        return [name for name, _, _ in self._groups_spec]
+
+    def group_key(self, record: dict) -> tuple:
+        """一条记录所属的分组"""
+        return tuple(str(record.get(field, '')) if transform is None
+                     else _transform(transform, str(record.get(field, '')))
+                     for _, transform, field in self._groups_spec)
+
+    def _group_columns(self, records: list) -> list:
+        """各分组字段的值列表"""
+        values = []
+        for _, transform, field in self._groups_spec:
+            column = [str(record.get(field, '')) for record in records]
+            if transform is not None:
+                column = [_transform(transform, value) for value in column]
+            values.append(column)
+        return values
+
+    def _column(self, records: list, columns: dict, field: str) -> np.ndarray:
+        values = columns.get(field)
+        if values is None:
+            return np.array([_float(record.get(field)) for record in records])
+        return np.asarray(values, dtype=np.float64)
+
+    def update(self, records: list, ratings: np.ndarray, columns: dict = None):
+        """加入一块记录（ratings 为对应评分，NaN 表示没有评分、跳过）
+
+        columns 为已解析的统计列（可选，省去回合数等字段的重复解析）。
+        先在块内按组排序、每组只取前 K 行，再与各组的堆比较。
+        """
+        ratings = np.asarray(ratings, dtype=np.float64)
+        columns = columns or {}
+        size = len(records)
+        keep = ~np.isnan(ratings)
+        if self.min_rounds:
+            keep &= self._column(records, columns, 'rounds') >= self.min_rounds
+
+        # 分组键按列构造（每个分组字段一次列表推导），再映射为块内的组编号
+        group_ids = {}
+        setdefault = group_ids.setdefault
+        group_keys = zip(*self._group_columns(records)) if self._groups_spec else [()] * size
+        groups = np.array([setdefault(key, len(group_ids)) for key in group_keys], dtype=np.intp)
+        ties = []
+        for field, sign in self._ties:
+            values = self._column(records, columns, field) * sign
+            ties.append(np.where(np.isnan(values), -np.inf, values))
+        rows = np.arange(self.seen, self.seen + size)
+
+        # lexsort 最后一个键为主键：组，评分降序，各并列字段降序，行号升序
+        order = np.lexsort((rows, *[-values for values in reversed(ties)], -ratings, groups))
+        order = order[keep[order]]
+        sorted_groups = groups[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_groups[1:] != sorted_groups[:-1])))
+        ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(order))))
+        candidates = order[ranks < self.k].tolist()
+
+        keys = list(group_ids)
+        rating_list = ratings.tolist()
+        tie_lists = [values.tolist() for values in ties]
+        for row in candidates:
+            key = (rating_list[row], *[values[row] for values in tie_lists],
+                   -self.source, -(self.seen + row))
+            self._push(keys[groups[row]], key, records[row])
+        self.seen += size
+
+    def _push(self, group: tuple, key: tuple, record: dict):
+        heap = self._heaps.get(group)
+        if heap is None:
+            heap = self._heaps[group] = []
+        if len(heap) < self.k:
+            heapq.heappush(heap, (key, next(self._counter), record))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, next(self._counter), record))
+
+    def merge(self, other: 'Leaderboard'):
+        """合并另一个排行榜（如并行分片的部分结果），设置必须一致"""
+        if (other.k, other.group_by, other.min_rounds, other.tie_break) != \
+                (self.k, self.group_by, self.min_rounds, self.tie_break):
+            raise ValueError("排行榜设置不一致（k/分组/最少回合数/并列字段），无法合并")
+        for group, heap in other._heaps.items():
+            for key, _, record in heap:
+                self._push(group, key, record)
+        self.seen += other.seen
+
+    def tables(self) -> dict:
+        """各组的排行榜：{分组: [(评分, 记录), ...]}（按组排序，组内按名次）"""
+        return {group: [(key[0], record) for key, _, record in sorted(heap, reverse=True)]
+                for group, heap in sorted(self._heaps.items())}
+
+    def rows(self, thresholds: tuple = None):
+        """排行榜的输出行：分组列、名次、原记录字段、评分与等级（生成器）"""
+        names = self.group_names
+        for group, entries in self.tables().items():
+            for rank, (rating, record) in enumerate(entries, 1):
+                row = dict(zip(names, group))
+                row['rank'] = rank
+                row.update(record)
+                row['rating'] = rating
+                row['tier'] = RatingCalculator.get_rating_description(rating, thresholds)[0]
+                yield row
+
+    def record_fields(self) -> list:
+        """排行榜中记录出现过的字段（按首次出现的顺序）"""
+        fields = {}
+        for heap in self._heaps.values():
+            for _, _, record in heap:
+                fields.update(dict.fromkeys(record))
+        return list(fields)
+
+    # ---- 持久化（分片的部分结果） ----
+
+    def save(self, path: str):
+        """写出部分结果（JSON，先写临时文件再替换）"""
+        state = {
+            'version': SCHEMA_VERSION, 'k': self.k, 'group_by': list(self.group_by),
+            'min_rounds': self.min_rounds, 'tie_break': list(self.tie_break),
+            'source': self.source, 'seen': self.seen,
+            'groups': [[list(group), [[list(key), record] for key, _, record in heap]]
+                       for group, heap in self._heaps.items()],
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'Leaderboard':
+        """读取 save() 写出的部分结果"""
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                state = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"不是有效的排行榜文件: {path}") from e
+        if not isinstance(state, dict) or 'groups' not in state:
+            raise ValueError(f"不是有效的排行榜文件: {path}")
+        if state.get('version') != SCHEMA_VERSION:
+            raise ValueError(f"不支持的文件版本: {state.get('version')}（当前支持 {SCHEMA_VERSION}）")
+        board = cls(state['k'], state['group_by'], state['min_rounds'], state['tie_break'],
+                    state['source'])
+        board.seen = state['seen']
+        for group, entries in state['groups']:
+            for key, record in entries:
+                board._push(tuple(group), tuple(key), record)
+        return board
@@ -0,0 +1,262 @@
+import math
+import os
+import struct
+from array import array
+
+import numpy as np
+
+# 评分百分位索引文件格式（小端序）
+#   文件头 (48字节): magic(8) | 版本(u16) | 保留(u16) | 桶数(u32) | 下限(f8) | 精度(f8)
+#                    | 选手数(u64) | 选手键总字节数(u64)
+#   桶计数:          桶数 × u64
+#   选手:            选手数 × u32 桶号 | 选手数 × u32 键长度 | UTF-8 键（依次拼接）
+MAGIC = b'CSRPIDX\x00'
+SCHEMA_VERSION = 1
+_HEADER = struct.Struct('<8sHHIddQQ')
+
+# 默认量化精度与评分区间（与公式的 [0, 3] 区间一致）
+RESOLUTION = 0.0001
+RATING_RANGE = (0.0, 3.0)
+# 由人群分位数推导等级分界时使用的分位数（依次对应 超凡/优秀/良好/普通 的下限）
+DEFAULT_TIER_QUANTILES = (0.95, 0.80, 0.50, 0.25)
+
+
+class PercentileIndex:
+    """评分百分位索引（量化评分上的树状数组）
+
+    插入、更新、删除与排名/百分位查询均为 O(log 桶数)。评分按 RESOLUTION 量化，
+    同一量化桶内的评分视为相同。按选手键更新时会先移除该选手原来的评分。
+    """
+
+    def __init__(self, resolution: float = RESOLUTION, rating_range: tuple = RATING_RANGE):
+        if resolution <= 0:
+            raise ValueError("resolution 必须大于0")
+        self.resolution = resolution
+        self.lo, self.hi = rating_range
+        self.size = int(round((self.hi - self.lo) / resolution)) + 1
+        self._counts = [0] * self.size
+        self._tree = [0] * (self.size + 1)
+        self._top_bit = 1 << (self.size.bit_length() - 1)
+        self._players = {}
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def __contains__(self, player):
+        return player in self._players
+
+    # ---- 修改 ----
+
+    def add(self, rating: float, count: int = 1):
+        """加入匿名评分"""
+        self._add(self.bucket(rating), count)
+
+    def remove(self, rating: float, count: int = 1):
+        """移除匿名评分"""
+        bucket = self.bucket(rating)
+        if self._counts[bucket] < count:
+            raise ValueError(f"索引中没有评分 {rating}")
+        self._add(bucket, -count)
+
+    def update(self, player: str, rating: float):
+        """设置选手的评分（已存在时替换原评分）"""
+        bucket = self.bucket(rating)
+        previous = self._players.get(player)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self._add(previous, -1)
+        self._players[player] = bucket
+        self._add(bucket, 1)
+
+    def discard(self, player: str):
+        """移除选手（不存在时忽略）"""
+        bucket = self._players.pop(player, None)
+        if bucket is not None:
+            self._add(bucket, -1)
+
+    def extend(self, ratings, players=None):
+        """批量加入评分（players 给出时按选手键更新；NaN 评分被忽略）
+
+        匿名批量加入使用 bincount 后整体重建树状数组，代价与桶数和数据量成线性关系。
+        """
+        ratings = np.asarray(ratings, dtype=np.float64)
+        valid = ~np.isnan(ratings)
+        buckets = self._buckets(ratings[valid])
+        if players is None:
+            counts = np.bincount(buckets, minlength=self.size)
+            self._counts = [a + b for a, b in zip(self._counts, counts.tolist())]
+            self.total += int(valid.sum())
+            self._rebuild()
+            return
+        players = [player for player, ok in zip(players, valid.tolist()) if ok]
+        for player, bucket in zip(players, buckets.tolist()):
+            previous = self._players.get(player)
+            if previous != bucket:
+                if previous is not None:
+                    self._add(previous, -1)
+                self._players[player] = bucket
+                self._add(bucket, 1)
+
+    # ---- 查询 ----
+
+    def bucket(self, rating: float) -> int:
+        """评分对应的量化桶（超出区间的评分归入两端）"""
+        if rating != rating:
+            raise ValueError("评分不能为 NaN")
+        position = (rating - self.lo) / self.resolution
+        return min(self.size - 1, max(0, int(position + 0.5)))
+
+    def rating_of(self, bucket: int) -> float:
+        """量化桶对应的评分"""
+        return self.lo + bucket * self.resolution
+
+    def count_at_most(self, rating: float) -> int:
+        """评分不高于 rating 的人数"""
+        tree = self._tree
+        i = self.bucket(rating) + 1
+        total = 0
+        while i:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+    def rank(self, rating: float) -> int:
+        """排名（1 为最高；比该评分高的人数 + 1）"""
+        return self.total - self.count_at_most(rating) + 1
+
+    def percentile(self, rating: float) -> float:
+        """百分位（评分不高于 rating 的人数占比，0-100）"""
+        if not self.total:
+            raise ValueError("索引为空")
+        return 100.0 * self.count_at_most(rating) / self.total
+
+    def top_percent(self, rating: float) -> float:
+        """"前 X%"（排名占总人数的比例，0-100）"""
+        if not self.total:
+            raise ValueError("索引为空")
+        return 100.0 * min(self.rank(rating), self.total) / self.total
+
+    def player_rating(self, player: str) -> float:
+        """选手在索引中的（量化后）评分"""
+        try:
+            return self.rating_of(self._players[player])
+        except KeyError:
+            raise ValueError(f"索引中没有选手: {player}") from None
+
+    def quantile(self, q: float) -> float:
+        """分位数评分：至少 q 比例的人评分不高于该值（0 < q <= 1）"""
+        if not self.total:
+            raise ValueError("索引为空")
+        if not 0 <= q <= 1:
+            raise ValueError("分位数必须在 0-1 之间")
+        return self.rating_of(self._find(max(1, math.ceil(q * self.total))))
+
+    def tier_boundaries(self, quantiles: tuple = DEFAULT_TIER_QUANTILES) -> tuple:
+        """由人群分位数推导的等级分界（可直接传给 get_rating_description 的 thresholds）
+
+        评分高于分界 q 当且仅当不高于该评分（量化后）的人数超过总人数的 q 比例；
+        分界取第 floor(q*人数)+1 小评分所在桶的下沿，小样本时也不会把最高分划出最高等级。
+        """
+        if not self.total:
+            raise ValueError("索引为空")
+        boundaries = []
+        for q in quantiles:
+            k = math.floor(q * self.total) + 1
+            bucket = self._find(k) if k <= self.total else self.size
+            boundaries.append(self.rating_of(bucket) - self.resolution / 2)
+        return tuple(boundaries)
+
+    # ---- 持久化 ----
+
+    def save(self, path: str):
+        """写出索引（先写临时文件再替换，写出过程中断不会损坏原文件）"""
+        keys = [key.encode('utf-8') for key in self._players]
+        lengths = array('I', map(len, keys))
+        blob = b''.join(keys)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, SCHEMA_VERSION, 0, self.size, self.lo,
+                                 self.resolution, len(keys), len(blob)))
+            f.write(np.asarray(self._counts, dtype='<u8').tobytes())
+            f.write(np.fromiter(self._players.values(), dtype='<u4',
+                                count=len(keys)).tobytes())
+            f.write(np.frombuffer(lengths, dtype=np.uint32).astype('<u4').tobytes())
+            f.write(blob)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """读取 save() 写出的索引"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"不是有效的百分位索引文件: {path}")
+        magic, version, _, size, lo, resolution, player_count, key_bytes = \
+            _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"不是有效的百分位索引文件: {path}")
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"不支持的文件版本: {version}（当前支持 {SCHEMA_VERSION}）")
+
+        index = cls(resolution, (lo, lo + (size - 1) * resolution))
+        if index.size != size:
+            raise ValueError(f"百分位索引文件已损坏: {path}")
+        offset = _HEADER.size
+        counts = np.frombuffer(data, dtype='<u8', count=size, offset=offset)
+        offset += counts.nbytes
+        buckets = np.frombuffer(data, dtype='<u4', count=player_count, offset=offset)
+        offset += buckets.nbytes
+        lengths = np.frombuffer(data, dtype='<u4', count=player_count, offset=offset)
+        offset += lengths.nbytes
+        if len(data) != offset + key_bytes:
+            raise ValueError(f"百分位索引文件已损坏: {path}")
+
+        index._counts = counts.tolist()
+        index.total = int(counts.sum())
+        ends = np.cumsum(lengths, dtype=np.int64) + offset
+        starts = ends - lengths
+        index._players = {data[start:end].decode('utf-8'): bucket for start, end, bucket
+                          in zip(starts.tolist(), ends.tolist(), buckets.tolist())}
+        index._rebuild()
+        return index
+
+    # ---- 内部实现 ----
+
+    def _buckets(self, ratings: np.ndarray) -> np.ndarray:
+        positions = (np.clip(ratings, self.lo, self.hi) - self.lo) / self.resolution
+        return np.minimum(self.size - 1, (positions + 0.5).astype(np.int64))
+
+    def _add(self, bucket: int, delta: int):
+        self._counts[bucket] += delta
+        self.total += delta
+        tree = self._tree
+        size = self.size
+        i = bucket + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def _rebuild(self):
+        """由桶计数线性重建树状数组"""
+        tree = [0] + self._counts
+        size = self.size
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _find(self, k: int) -> int:
+        """第 k 小评分所在的桶（树状数组上二分下降）"""
+        tree = self._tree
+        position = 0
+        step = self._top_bit
+        while step:
+            following = position + step
+            if following <= self.size and tree[following] < k:
+                position = following
+                k -= tree[following]
+            step >>= 1
+        return position
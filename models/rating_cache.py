@@ -0,0 +1,134 @@
+import math
+import threading
+import weakref
+from collections import OrderedDict
+
+# 所有存活的缓存实例，用于公式系数变更时统一失效
+_live_caches = weakref.WeakSet()
+
+
+def invalidate_all_caches(method: str = None):
+    """使所有缓存失效（公式系数变更时调用），method 为空表示全部方法"""
+    for cache in list(_live_caches):
+        cache.invalidate(method)
+
+
+class RatingCache:
+    """评分结果缓存（可选，LRU淘汰，线程安全）
+
+    以"方法ID + 归一化后的统计数据"为键，命中时直接返回之前的计算结果。
+    计算经由默认公式注册表（models/formula_registry.py），与 rate/rank 等命令使用相同的公式与系数；
+    注册表替换公式时通过 invalidate_all_caches 使该公式（及依赖它的组合公式）的条目失效。
+    归一化只做不改变计算结果的变换（如 rounds 取 max(1, rounds)），
+    因此缓存与直接调用公式的结果完全一致。
+    evaluate 返回的 RatingResult 在调用方之间共享，应视为只读。
+    """
+
+    def __init__(self, maxsize: int = 65536, registry=None):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须大于0")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._registry = registry
+        self._entries = OrderedDict()
+        # 每次 invalidate 递增：计算期间发生过失效时，结果可能来自旧公式，不写入缓存
+        self._generation = 0
+        self._lock = threading.Lock()
+        _live_caches.add(self)
+
+    def rating(self, method: str, kills: int, deaths: int, assists: int,
+               rounds: int, mvps: int, adr: float, hs_percent: float,
+               kills_3k: int = 0, kills_4k: int = 0, kills_5k: int = 0,
+               rws: float = None, kast: float = None) -> float:
+        """带缓存的 formula.scalar"""
+        # kast 为 0 与未提供等价（公式使用 kast or ...）
+        key = ("rating", method, kills, deaths, assists, max(1, rounds), mvps, adr,
+               hs_percent, kills_3k, kills_4k, kills_5k, rws, kast or None)
+        return self._get_or_compute(
+            key, lambda: self._formula(method).scalar(
+                kills, deaths, assists, rounds, mvps, adr, hs_percent,
+                kills_3k, kills_4k, kills_5k, rws, kast))
+
+    def evaluate(self, method: str, kills: int, deaths: int, assists: int,
+                 rounds: int, mvps: int, adr: float, hs_percent: float,
+                 kills_3k: int = 0, kills_4k: int = 0, kills_5k: int = 0,
+                 rws: float = None, kast: float = None):
+        """带缓存的 formula.evaluate（结果中保存了输入，rounds 不做归一化）"""
+        key = ("evaluate", method, kills, deaths, assists, rounds, mvps, adr,
+               hs_percent, kills_3k, kills_4k, kills_5k, rws, kast or None)
+        return self._get_or_compute(
+            key, lambda: self._formula(method).evaluate(
+                kills, deaths, assists, rounds, mvps, adr, hs_percent,
+                kills_3k, kills_4k, kills_5k, rws, kast))
+
+    def invalidate(self, method: str = None):
+        """使缓存失效：method 为空时清空全部，否则只清除该方法的条目
+
+        注册表替换公式时会重新注册依赖它的组合公式，组合公式的条目随之失效。
+        """
+        with self._lock:
+            self._generation += 1
+            if method is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1] == method]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """命中/未命中/淘汰计数"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _formula(self, method: str):
+        """按方法ID取公式（注册表导入本模块，这里延迟导入）"""
+        if self._registry is None:
+            from models.formula_registry import default_registry
+            return default_registry().get(method)
+        return self._registry.get(method)
+
+    def _get_or_compute(self, key: tuple, compute):
+        """查找缓存，未命中时计算并写入
+
+        计算在锁外进行；计算期间缓存被失效（如注册表替换了公式）时结果照常返回但不写入，
+        避免旧公式的结果留在缓存中。
+        """
+        try:
+            with self._lock:
+                generation = self._generation
+                value = self._entries[key]
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        except KeyError:
+            pass
+        except TypeError:
+            # 不可哈希的参数（如列表）直接计算
+            return compute()
+
+        value = compute()
+        # NaN 与自身不相等，永远无法命中，不写入缓存
+        cacheable = not _has_nan(key)
+        with self._lock:
+            self.misses += 1
+            if cacheable and generation == self._generation and key not in self._entries:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+
+def _has_nan(key: tuple) -> bool:
+    """键中是否包含NaN"""
+    return any(isinstance(value, float) and math.isnan(value) for value in key)
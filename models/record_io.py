@@ -0,0 +1,243 @@
+import contextlib
+import csv
+import json
+import math
+import sys
+from itertools import islice
+
+import numpy as np
+
+# 输入字段及默认值（与 MainWindow.get_input_values 保持一致）
+INT_FIELDS = ('kills', 'deaths', 'assists', 'rounds', 'mvps',
+              'kills_3k', 'kills_4k', 'kills_5k')
+FLOAT_FIELDS = ('adr', 'hs_percent', 'rws')
+STAT_FIELDS = ('kills', 'deaths', 'assists', 'rounds', 'mvps', 'adr',
+               'hs_percent', 'kills_3k', 'kills_4k', 'kills_5k', 'rws')
+FIELD_DEFAULTS = {
+    'kills': 0, 'deaths': 0, 'assists': 0, 'rounds': 16, 'mvps': 0,
+    'adr': 0.0, 'hs_percent': 0.0, 'kills_3k': 0, 'kills_4k': 0,
+    'kills_5k': 0, 'rws': math.nan,
+}
+
+FORMATS = ('csv', 'jsonl')
+
+# 整数字段的取值范围（列数组为 int64）
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+
+def detect_format(path: str, default: str = 'csv') -> str:
+    """根据文件扩展名判断格式（stdin/stdout 使用默认格式）"""
+    lowered = (path or '').lower()
+    if lowered.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def open_input(path: str):
+    """打开输入文件，'-' 表示标准输入"""
+    if path in (None, '-'):
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def open_output(path: str):
+    """打开输出文件，'-' 表示标准输出"""
+    if path in (None, '-'):
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def iter_records(stream, fmt: str):
+    """逐行读取记录（生成器，不会一次性载入整个文件）"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f"不支持的格式: {fmt}")
+
+
+def read_csv_header(stream) -> list:
+    """读取CSV表头（之后的数据行可由 iter_raw_records 继续读取）"""
+    return next(csv.reader([_read_raw_csv_record(stream)]), [])
+
+
+def iter_raw_records(stream, fmt: str):
+    """逐条产出未解析的原始记录文本（CSV中跨行的引号字段会被合并为一条）"""
+    if fmt == 'csv':
+        while True:
+            raw = _read_raw_csv_record(stream)
+            if not raw:
+                return
+            if raw.strip():
+                yield raw
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield line
+    else:
+        raise ValueError(f"不支持的格式: {fmt}")
+
+
+def parse_raw_records(raw_records: list, fmt: str, fieldnames: list = None,
+                      unparseable: set = None) -> list:
+    """解析一块原始记录文本为dict列表
+
+    给出 unparseable 集合时，无法解析的 JSONL 行（或不是对象）记为空记录并把行号加入该集合，
+    不中止整块（见 records_to_columns）。
+    """
+    if fmt == 'csv':
+        return list(csv.DictReader(raw_records, fieldnames=fieldnames))
+    if unparseable is None:
+        return [json.loads(raw) for raw in raw_records]
+    records = []
+    for row, raw in enumerate(raw_records):
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            record = {}
+            unparseable.add(row)
+        records.append(record)
+    return records
+
+
+def jsonl_fields(raw_records: list):
+    """第一条能解析为对象的 JSONL 记录的字段（没有时为 None）
+
+    无法解析或不是对象的行按未通过校验的行处理，不决定输出列。
+    """
+    for raw in raw_records:
+        try:
+            record = json.loads(raw)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            return list(record)
+    return None
+
+
+def _read_raw_csv_record(stream) -> str:
+    """读取一条完整的CSV记录（引号未闭合时继续读取下一行）"""
+    raw = stream.readline()
+    while raw.count('"') % 2:
+        line = stream.readline()
+        if not line:
+            break
+        raw += line
+    return raw
+
+
+def iter_chunks(records, size: int):
+    """将记录流切分为固定大小的块"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_value(field: str, value):
+    """解析单个字段值，空值使用默认值（整数字段允许 "12.0"，带小数部分的值无效）"""
+    if value is None or value == '':
+        return FIELD_DEFAULTS[field]
+    if field in INT_FIELDS:
+        if isinstance(value, int):
+            return int(value)
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{field} 不是整数: {value!r}")
+        return int(number)
+    return float(value)
+
+
+def parse_stats(record: dict) -> dict:
+    """解析一条记录的全部统计字段"""
+    if not isinstance(record, dict):
+        raise ValueError("统计数据必须是JSON对象")
+    try:
+        stats = {field: parse_value(field, record.get(field)) for field in STAT_FIELDS}
+    except (TypeError, ValueError, OverflowError) as e:
+        # OverflowError: 超出浮点范围等无法转换的值
+        raise ValueError(f"统计数据无效: {e}") from e
+    for field in INT_FIELDS:
+        if not _INT_MIN <= stats[field] <= _INT_MAX:
+            raise ValueError(f"统计数据无效: {field} 超出范围")
+    return stats
+
+
+def records_to_columns(records: list, unparseable: set = None) -> dict:
+    """将一块记录转换为列数组（rws 缺失时为 NaN）
+
+    默认遇到无法解析的值时抛出 ValueError；给出 unparseable 集合时改为逐行解析，
+    无法解析的字段填入默认值并把行号加入该集合（交给 validate 标记为 UNPARSEABLE），
+    一个坏单元格不会中止整块。
+    """
+    columns = {}
+    for field in STAT_FIELDS:
+        dtype = np.int64 if field in INT_FIELDS else np.float64
+        try:
+            values = [parse_value(field, record.get(field)) for record in records]
+            columns[field] = np.array(values, dtype=dtype)
+        except (TypeError, ValueError, OverflowError) as e:
+            # OverflowError: 整数字段超出 int64 范围
+            if unparseable is None:
+                raise ValueError(f"字段 {field} 的值无效: {e}") from e
+            columns[field] = np.array(_parse_rows(field, records, unparseable), dtype=dtype)
+    return columns
+
+
+def _parse_rows(field: str, records: list, unparseable: set) -> list:
+    """逐行解析一个字段（整块解析失败时），无法解析的行使用默认值并记录行号"""
+    values = []
+    for row, record in enumerate(records):
+        try:
+            value = parse_value(field, record.get(field))
+            if field in INT_FIELDS and not _INT_MIN <= value <= _INT_MAX:
+                raise OverflowError(value)
+        except (TypeError, ValueError, OverflowError):
+            value = FIELD_DEFAULTS[field]
+            unparseable.add(row)
+        values.append(value)
+    return values
+
+
+class RecordWriter:
+    """流式写出评分结果（CSV或JSONL）"""
+
+    def __init__(self, stream, fmt: str, fieldnames: list = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}")
+        if fmt == 'csv' and not fieldnames:
+            raise ValueError("CSV输出需要指定列名")
+        self.stream = stream
+        self.fmt = fmt
+        self.fieldnames = fieldnames
+        if fmt == 'csv':
+            self._csv_writer = csv.DictWriter(
+                stream, fieldnames=fieldnames, restval='',
+                extrasaction='ignore', lineterminator='\n')
+
+    def write_header(self):
+        """写出表头（仅CSV）"""
+        if self.fmt == 'csv':
+            self._csv_writer.writeheader()
+
+    def write_rows(self, rows: list):
+        """写出一批结果行（dict）"""
+        if self.fmt == 'jsonl':
+            self.stream.writelines(
+                json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        else:
+            self._csv_writer.writerows(rows)
+
+    def flush(self):
+        self.stream.flush()
@@ -0,0 +1,335 @@
+import csv
+import functools
+import html
+import io
+import operator
+import string
+import sys
+
+from models import instrumentation
+from models.rating_calculator import RatingCalculator
+
+# 评分明细报告：每类公式一个模板，按公式系数编译一次（系数以字面量写入），之后逐块渲染。
+#
+# 明细数据由 breakdown() 向量化计算：评分取公式实际的 vector() 结果，中间量使用同一组系数
+# （formulas.json 或校准后加载的系数），因此报告中的每个数字都与实际使用的评分一致。
+# 单条明细（界面详细数据）使用 text 模板，直接格式化 formula.evaluate() 返回的 RatingResult
+# （评分与中间值只计算一次，不构造数组）；批量报告逐块输出 Markdown / HTML / CSV 表格。
+FORMATS = ('markdown', 'html', 'csv')
+# 输出文件扩展名对应的格式
+EXTENSIONS = {'.md': 'markdown', '.markdown': 'markdown', '.html': 'html', '.htm': 'html',
+              '.csv': 'csv'}
+
+_MULTIKILL_TEXT = "多杀统计:\n3杀回合: {kills_3k:d}\n4杀回合: {kills_4k:d}\n5杀回合: {kills_5k:d}"
+
+# 界面详细数据模板：{字段:格式} 为逐行数据，{name}/{formula}/{components} 等在编译时代入
+_TEXT_TEMPLATES = {
+    'composite': (
+        "{name}\n"
+        "{components}\n\n"
+        "详细统计:\n"
+        "KPR: {kpr:.2f}\n"
+        "DPR: {dpr:.2f}\n"
+        "APR: {apr:.2f}\n"
+        "ADR: {adr:.1f}\n"
+        "爆头率: {hs_percent:.1f}%\n"
+        "3杀回合: {kills_3k:d}\n"
+        "4杀回合: {kills_4k:d}\n"
+        "5杀回合: {kills_5k:d}"
+    ),
+    'rating_1_0': (
+        "{name} 详细计算:\n"
+        "KPR (每回合击杀): {kpr:.2f}\n"
+        "SPR (每回合存活率): {spr:.2f}\n"
+        "RMK (多杀回合价值): {rmk:.2f}\n\n"
+        "公式: {formula}\n"
+        "RMK = {rmk_formula}\n\n" + _MULTIKILL_TEXT
+    ),
+    'rating_2_0': (
+        "{name} 详细计算:\n"
+        "KPR: {kpr:.4f}\n"
+        "DPR: {dpr:.4f}\n"
+        "Impact: {impact:.4f} (多杀影响: {multikill_impact:.4f})\n"
+        "ADR: {adr:.1f}\n"
+        "KAST: {kast:.1f}%\n\n"
+        "公式: {formula}\n\n" + _MULTIKILL_TEXT
+    ),
+    'custom': (
+        "{name} 详细计算:\n"
+        "KPR: {kpr:.2f}\n"
+        "DPR: {dpr:.2f}\n"
+        "APR: {apr:.2f}\n"
+        "ADR贡献: {adr_term:.2f}\n"
+        "爆头率贡献: {hs_term:.2f}\n"
+        "MVP率: {mvp_rate:.2f}\n"
+        "RWS调整系数: {rws_factor_text}\n\n"
+        "公式: {formula}\n\n" + _MULTIKILL_TEXT
+    ),
+}
+
+# 表格报告的列：(表头, 字段, 格式)
+_TABLE_COLUMNS = {
+    'composite': (('KPR', 'kpr', '.2f'), ('DPR', 'dpr', '.2f'), ('APR', 'apr', '.2f'),
+                  ('ADR', 'adr', '.1f'), ('爆头率', 'hs_percent', '.1f')),
+    'rating_1_0': (('KPR', 'kpr', '.2f'), ('SPR', 'spr', '.2f'), ('RMK', 'rmk', '.2f')),
+    'rating_2_0': (('KPR', 'kpr', '.4f'), ('DPR', 'dpr', '.4f'), ('Impact', 'impact', '.4f'),
+                   ('多杀影响', 'multikill_impact', '.4f'), ('ADR', 'adr', '.1f'), ('KAST', 'kast', '.1f')),
+    'custom': (('KPR', 'kpr', '.2f'), ('DPR', 'dpr', '.2f'), ('APR', 'apr', '.2f'),
+               ('ADR贡献', 'adr_term', '.2f'), ('爆头率贡献', 'hs_term', '.2f'),
+               ('MVP率', 'mvp_rate', '.2f'), ('RWS调整系数', 'rws_factor_text', '')),
+}
+_MULTIKILL_COLUMNS = (('3杀', 'kills_3k', 'd'), ('4杀', 'kills_4k', 'd'), ('5杀', 'kills_5k', 'd'))
+
+
+def _expression(terms: list, intercept: float = None, wrap: int = 0) -> str:
+    """系数表达式文本（负系数写作减法），wrap 给出时每 wrap 项换行"""
+    text = ''
+    for i, (coefficient, name) in enumerate(terms):
+        if i:
+            text += " - " if coefficient < 0 else " + "
+            if wrap and i % wrap == 0:
+                text = text.rstrip(' ') + "\n"
+        text += f"{abs(coefficient) if i else coefficient:g}*{name}"
+    if intercept is not None:
+        text += f" - {-intercept:g}" if intercept < 0 else f" + {intercept:g}"
+    return text
+
+
+def _describe(formula) -> dict:
+    """编译时代入模板的公式文本（使用公式的实际系数）"""
+    c = formula.spec.get('coefficients', {})
+    k = formula.spec.get('caps', {})
+    values = {'name': formula.name.replace('{', '{{').replace('}', '}}')}
+    if formula.kind == 'rating_1_0':
+        values['formula'] = f"(KPR + {c['spr']:g}*SPR + RMK) / {c['divisor']:g}"
+        values['rmk_formula'] = (f"min((3杀*{c['rmk_3k']:g} + 4杀*{c['rmk_4k']:g} + "
+                                 f"5杀*{c['rmk_5k']:g}) / 回合数, {k['rmk']:g})")
+    elif formula.kind == 'rating_2_0':
+        values['formula'] = _expression(
+            [(c['kpr'], 'KPR'), (c['dpr'], 'DPR'), (c['impact'], 'Impact'),
+             (c['adr'], 'ADR'), (c['kast'], 'KAST')], c['intercept'], wrap=3)
+    elif formula.kind == 'custom':
+        values['formula'] = (
+            _expression([(c['kpr'], 'KPR'), (c['survival'], '(1-DPR)'), (c['apr'], 'APR'),
+                         (c['adr'], '(ADR/100)'), (c['hs'], '(HS%/100)'), (c['mvp'], 'MVP率')],
+                        wrap=3) +
+            f"\n然后乘以RWS调整系数 ({c['rws_base']:g} + RWS/{c['rws_divisor']:g})"
+            f"\n最后 ×{c['scale']:g} + {c['offset']:g}")
+    else:
+        values['components'] = '\n'.join(
+            f"{component.name}: {{component_{i}:.2f}}"
+            for i, component in enumerate(formula.components))
+    return values
+
+
+def breakdown(formula, columns: dict) -> dict:
+    """一批数据的明细列：rating 为公式实际计算的评分，其余中间量由同一组系数计算"""
+    # 只有批量报告需要 NumPy，界面详细数据（details）不导入，不影响启动时间
+    import numpy as np
+    c = formula.spec.get('coefficients', {})
+    k = formula.spec.get('caps', {})
+    rounds = np.maximum(np.asarray(columns['rounds']), 1)
+    kills = np.asarray(columns['kills'])
+    deaths = np.asarray(columns['deaths'])
+    assists = np.asarray(columns['assists'])
+    adr = np.asarray(columns['adr'], dtype=np.float64)
+    multikills = [np.asarray(columns[field]) for field in ('kills_3k', 'kills_4k', 'kills_5k')]
+    values = {'rating': formula.vector(columns), 'kills_3k': multikills[0],
+              'kills_4k': multikills[1], 'kills_5k': multikills[2]}
+    kpr = kills / rounds
+    dpr = deaths / rounds
+
+    if formula.kind == 'rating_1_0':
+        values['kpr'] = kpr
+        values['spr'] = (rounds - deaths) / rounds
+        values['rmk'] = np.fmin((multikills[0] * c['rmk_3k'] + multikills[1] * c['rmk_4k'] +
+                                 multikills[2] * c['rmk_5k']) / rounds, k['rmk'])
+    elif formula.kind == 'rating_2_0':
+        kast = np.fmin(k['kast'], (np.fmin(kills + assists, rounds * c['kast_contribution']) +
+                                   np.maximum(0, rounds - deaths)) / rounds * 100)
+        exact_kast = columns.get('kast')
+        if exact_kast is not None:
+            exact_kast = np.asarray(exact_kast, dtype=np.float64)
+            kast = np.where(np.isnan(exact_kast) | (exact_kast == 0), kast, exact_kast)
+        multikill = np.fmin((multikills[0] * c['multikill_3k'] +
+                             multikills[1] * c['multikill_4k'] +
+                             multikills[2] * c['multikill_5k']) / rounds, k['multikill'])
+        values.update(kpr=kpr, dpr=dpr, adr=adr, kast=kast, multikill_impact=multikill,
+                      impact=(c['impact_multikill'] * multikill + c['impact_kpr'] * kpr +
+                              c['impact_survival'] * (rounds - deaths) / rounds))
+    elif formula.kind == 'custom':
+        rws = columns.get('rws')
+        rws = np.full(len(rounds), np.nan) if rws is None else np.asarray(rws, dtype=np.float64)
+        factor = c['rws_base'] + np.fmin(k['rws'], np.fmax(0.0, np.nan_to_num(rws))) / \
+            c['rws_divisor']
+        values.update(
+            kpr=kpr, dpr=dpr, apr=assists / rounds,
+            adr_term=np.fmin(k['adr'], adr) / 100,
+            hs_term=np.fmin(k['hs_percent'], np.asarray(columns['hs_percent'])) / 100,
+            mvp_rate=np.asarray(columns['mvps']) / rounds,
+            rws_factor=np.where(np.isnan(rws), np.nan, factor))
+        values['rws_factor_text'] = [_factor_text(None if factor != factor else factor)
+                                     for factor in values['rws_factor'].tolist()]
+    else:
+        for i, component in enumerate(formula.components):
+            values[f"component_{i}"] = component.vector(columns)
+        values.update(kpr=kpr, dpr=dpr, apr=assists / rounds, adr=adr,
+                      hs_percent=np.asarray(columns['hs_percent'], dtype=np.float64))
+    return values
+
+
+def _compile(template: str, constants: dict) -> tuple:
+    """把 {字段:格式} 模板编译为 %-格式字符串，返回 (格式串, 逐行字段列表)
+
+    constants 中的字段在编译时代入（其本身也是模板，可再含逐行字段，如组合公式的组成部分行）。
+    """
+    parts = []
+    fields = []
+    for literal, field, spec, _ in string.Formatter().parse(template):
+        parts.append(literal.replace('%', '%%'))
+        if field is None:
+            continue
+        if field in constants:
+            nested, nested_fields = _compile(constants[field], {})
+            parts.append(nested)
+            fields.extend(nested_fields)
+        else:
+            parts.append(f"%{spec or 's'}")
+            fields.append(field)
+    return ''.join(parts), fields
+
+
+class ReportTemplate:
+    """一个公式在一种输出格式下的报告模板（编译一次，逐块渲染）
+
+    fmt 为 'text'（单条明细，界面使用）或 FORMATS 之一；labels 为表格前几列显示的记录字段
+    （如 player、team）；thresholds 可替换固定的等级分界（如人群分位数分界）。
+    """
+
+    def __init__(self, formula, fmt: str = 'text', labels: tuple = (), thresholds: tuple = None):
+        if fmt != 'text' and fmt not in FORMATS:
+            raise ValueError(f"不支持的报告格式: {fmt}")
+        self.formula = formula
+        self.fmt = fmt
+        self.labels = tuple(labels)
+        self.thresholds = thresholds
+        constants = _describe(formula)
+        if fmt == 'text':
+            self._row_format, self.fields = _compile(_TEXT_TEMPLATES[formula.kind], constants)
+            self._getters = [_result_getter(field) for field in self.fields]
+            return
+
+        components = [(component.name, f"component_{i}", '.2f')
+                      for i, component in enumerate(formula.components)]
+        columns = ([(label, f"label_{i}", '') for i, label in enumerate(self.labels)] +
+                   [('Rating', 'rating', '.2f'), ('等级', 'tier', '')] + components +
+                   list(_TABLE_COLUMNS[formula.kind]) + list(_MULTIKILL_COLUMNS))
+        self.headers = [header for header, _, _ in columns]
+        self.fields = [field for _, field, _ in columns]
+        caption = f"{formula.name} v{formula.version} ({formula.fingerprint})"
+        if formula.kind != 'composite':
+            caption += f" 公式: {constants['formula']}".replace('\n', ' ')
+        self.caption = caption
+        if fmt == 'markdown':
+            cells = [f"%{spec or 's'}" for _, _, spec in columns]
+            self._row_format = '| ' + ' | '.join(cells) + ' |\n'
+        elif fmt == 'html':
+            cells = [f"<td>%{spec or 's'}</td>" for _, _, spec in columns]
+            self._row_format = '<tr>' + ''.join(cells) + '</tr>\n'
+
+    def header(self) -> str:
+        """报告开头（表头）"""
+        if self.fmt == 'markdown':
+            return (f"**{_escape_markdown(self.caption)}**\n\n"
+                    f"| {' | '.join(map(_escape_markdown, self.headers))} |\n"
+                    f"|{'---|' * len(self.headers)}\n")
+        if self.fmt == 'html':
+            return ("<table>\n"
+                    f"<caption>{html.escape(self.caption)}</caption>\n"
+                    f"<thead><tr>{''.join(f'<th>{html.escape(h)}</th>' for h in self.headers)}"
+                    "</tr></thead>\n<tbody>\n")
+        if self.fmt == 'csv':
+            return self._csv_rows([self.headers])
+        return ''
+
+    def footer(self) -> str:
+        """报告结尾"""
+        return "</tbody>\n</table>\n" if self.fmt == 'html' else ''
+
+    def render(self, columns: dict, records: list = None) -> str:
+        """渲染一块数据（columns 为已校验的统计列，records 提供 labels 字段）"""
+        values = breakdown(self.formula, columns)
+        ratings = values['rating'].tolist()
+        describe = RatingCalculator.get_rating_description
+        values['tier'] = [describe(rating, self.thresholds)[0] for rating in ratings]
+        values['rating'] = ratings
+        escape = {'markdown': _escape_markdown, 'html': html.escape}.get(self.fmt)
+        for i, label in enumerate(self.labels):
+            texts = [str(record.get(label, '')) for record in records] if records \
+                else [''] * len(ratings)
+            values[f"label_{i}"] = [escape(text) for text in texts] if escape else texts
+        if escape:
+            values['tier'] = [escape(text) for text in values['tier']]
+        rows = zip(*[_as_list(values[field]) for field in self.fields])
+        if self.fmt == 'csv':
+            return self._csv_rows(rows)
+        row_format = self._row_format
+        return ''.join([row_format % row for row in rows])
+
+    def format_result(self, result) -> str:
+        """渲染单个 RatingResult（formula.evaluate 的结果，只做格式化，不重新计算）"""
+        return self._row_format % tuple([getter(result) for getter in self._getters])
+
+    def _csv_rows(self, rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue()
+
+
+def _factor_text(factor) -> str:
+    """RWS调整系数（未提供RWS时为"无"）"""
+    return "无" if factor is None else f"{factor:.2f}"
+
+
+def _result_getter(field: str):
+    """从 RatingResult 取模板字段的函数（组合公式的组成部分取其评分）"""
+    if field.startswith('component_'):
+        index = int(field[len('component_'):])
+        return lambda result: result.components[index].rating
+    if field == 'rws_factor_text':
+        return lambda result: _factor_text(result.rws_factor)
+    return operator.attrgetter(field)
+
+
+def _as_list(values) -> list:
+    """数组转为列表（其余原样返回）"""
+    return values.tolist() if hasattr(values, 'tolist') else values
+
+
+def _escape_markdown(text: str) -> str:
+    """Markdown 表格单元格转义（竖线与换行）"""
+    return text.replace('|', '\\|').replace('\n', ' ')
+
+
+@functools.lru_cache(maxsize=64)
+def _text_template(formula) -> ReportTemplate:
+    """界面详细数据模板（每个公式对象编译一次）"""
+    return ReportTemplate(formula, 'text')
+
+
+def details(formula, result) -> str:
+    """单组数据的详细数据文本（result 为 formula.evaluate(**stats) 的结果，评分只计算一次）"""
+    return _text_template(formula).format_result(result)
+
+
+def detect_format(path: str, default: str = 'markdown') -> str:
+    """根据输出文件扩展名判断报告格式"""
+    lowered = (path or '').lower()
+    for extension, fmt in EXTENSIONS.items():
+        if lowered.endswith(extension):
+            return fmt
+    return default
+
+
+# 界面详细数据的格式化（与 formula.evaluate 分开计时，见 models/instrumentation.py）
+instrumentation.instrument(sys.modules[__name__], 'details', prefix='report')
@@ -0,0 +1,253 @@
+import glob
+import os
+import struct
+
+import numpy as np
+
+from models.record_io import INT_FIELDS, STAT_FIELDS
+
+# 评分结果库：以"归一化输入的哈希 + 公式指纹"为键保存评分，重新计算时只计算缺失的行
+#
+# 目录中每个公式指纹一个文件 <指纹>.rst（小端序）:
+#   文件头 (72字节): magic(8) | 版本(u16) | 保留(u16) | 公式版本(u32) | 有序记录数(u64)
+#                    | 公式指纹(16) | 公式ID(32, UTF-8 右侧补零)
+#   记录:            (h1 u64, h2 u64, 评分 f8)，前"有序记录数"条按 (h1, h2) 排序，之后为追加的记录
+# 公式系数变化时指纹随之变化，只有该公式（及依赖它的综合评分）的结果失效，旧文件可由 prune() 删除。
+MAGIC = b'CSRRSLT\x00'
+SCHEMA_VERSION = 1
+_HEADER = struct.Struct('<8sHHIQ16s32s')
+_RECORD = np.dtype([('h1', '<u8'), ('h2', '<u8'), ('rating', '<f8')])
+SUFFIX = '.rst'
+
+# 参与哈希的字段（kast 为回合级精确KAST，缺失、NaN 与 0 均表示未提供）
+KEY_FIELDS = STAT_FIELDS + ('kast',)
+_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 终结函数（逐元素，uint64 回绕运算）"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _field_bits(columns: dict, field: str, size: int) -> np.ndarray:
+    """字段值的归一化位模式：整数字段按 int64，浮点字段统一 NaN 与 -0.0"""
+    values = columns.get(field)
+    if field in INT_FIELDS:
+        return np.broadcast_to(np.asarray(values, dtype=np.int64), (size,)).view(np.uint64)
+    if values is None:
+        values = np.full(size, np.nan)
+    values = np.broadcast_to(np.asarray(values, dtype=np.float64), (size,))
+    absent = np.isnan(values)
+    if field == 'kast':
+        absent |= values == 0
+    return np.where(absent, np.nan, values + 0.0).view(np.uint64)
+
+
+def input_keys(columns: dict) -> tuple:
+    """一批列数据的128位内容哈希 (h1, h2)，只取决于解析后的统计值"""
+    size = len(columns['rounds'])
+    h1 = np.full(size, _SEEDS[0], dtype=np.uint64)
+    h2 = np.full(size, _SEEDS[1], dtype=np.uint64)
+    for i, field in enumerate(KEY_FIELDS):
+        bits = _field_bits(columns, field, size)
+        h1 = _mix(h1 ^ bits)
+        h2 = _mix(h2 + (bits ^ np.uint64(_SEEDS[1] * (i + 1) % 2 ** 64)))
+    return h1, h2
+
+
+class _Segment:
+    """一个公式指纹的结果文件（有序部分常驻内存，新结果追加写入，关闭时合并）"""
+
+    def __init__(self, path: str, formula):
+        self.path = path
+        self.formula = formula
+        self.appended = 0
+        self._file = None
+        if os.path.exists(path):
+            records, sorted_count = _read(path)
+            self._records = records if sorted_count == len(records) else _merge(records)
+            if sorted_count != len(records):
+                # 上次未正常关闭留下的追加记录：先合并
+                _write(path, self._records, formula)
+        else:
+            self._records = np.empty(0, dtype=_RECORD)
+        self._split()
+
+    def __len__(self):
+        return len(self._records) + self.appended
+
+    def _split(self):
+        """有序记录拆为连续的列（查找时只访问需要的列）"""
+        self._h1 = np.ascontiguousarray(self._records['h1'])
+        self._h2 = np.ascontiguousarray(self._records['h2'])
+        self._ratings = np.ascontiguousarray(self._records['rating'])
+
+    def lookup(self, h1: np.ndarray, h2: np.ndarray) -> np.ndarray:
+        """查找评分，未找到的为 NaN"""
+        ratings = np.full(len(h1), np.nan)
+        if not len(self._h1):
+            return ratings
+        # 查询键先排序：有序查询的二分查找访存局部性好得多
+        order = np.argsort(h1)
+        positions = np.empty(len(h1), dtype=np.intp)
+        positions[order] = np.searchsorted(self._h1, h1[order])
+        np.minimum(positions, len(self._h1) - 1, out=positions)
+        hit = (self._h1[positions] == h1) & (self._h2[positions] == h2)
+        ratings[hit] = self._ratings[positions[hit]]
+        return ratings
+
+    def append(self, h1: np.ndarray, h2: np.ndarray, ratings: np.ndarray):
+        """追加新结果（先写入文件末尾，关闭时合并进有序部分）"""
+        if self._file is None:
+            if not os.path.exists(self.path):
+                _write(self.path, self._records, self.formula)
+            self._file = open(self.path, 'ab')
+        records = np.empty(len(h1), dtype=_RECORD)
+        records['h1'] = h1
+        records['h2'] = h2
+        records['rating'] = ratings
+        self._file.write(records.tobytes())
+        self.appended += len(records)
+
+    def close(self):
+        """合并本次追加的结果并重写文件"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        records, _ = _read(self.path)
+        self._records = _merge(records)
+        self._split()
+        _write(self.path, self._records, self.formula)
+        self.appended = 0
+
+
+def _read(path: str) -> tuple:
+    """读取结果文件，返回 (全部记录, 有序记录数)；末尾不完整的记录被忽略"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size or data[:8] != MAGIC:
+        raise ValueError(f"不是有效的结果库文件: {path}")
+    _, version, _, _, sorted_count, _, _ = _HEADER.unpack_from(data)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"不支持的文件版本: {version}（当前支持 {SCHEMA_VERSION}）")
+    count = (len(data) - _HEADER.size) // _RECORD.itemsize
+    records = np.frombuffer(data, dtype=_RECORD, count=count, offset=_HEADER.size)
+    return records, min(sorted_count, count)
+
+
+def _read_header(path: str) -> tuple:
+    """读取文件头，返回 (公式ID, 公式版本, 指纹, 记录数)"""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size or header[:8] != MAGIC:
+        raise ValueError(f"不是有效的结果库文件: {path}")
+    _, _, _, version, _, fingerprint, formula_id = _HEADER.unpack(header)
+    count = (os.path.getsize(path) - _HEADER.size) // _RECORD.itemsize
+    return (formula_id.rstrip(b'\0').decode('utf-8'), version,
+            fingerprint.decode('ascii'), count)
+
+
+def _merge(records: np.ndarray) -> np.ndarray:
+    """按 (h1, h2) 排序去重（同一键保留最后写入的记录）"""
+    order = np.lexsort((np.arange(len(records)), records['h2'], records['h1']))
+    records = records[order]
+    last = np.ones(len(records), dtype=bool)
+    last[:-1] = (records['h1'][1:] != records['h1'][:-1]) | \
+                (records['h2'][1:] != records['h2'][:-1])
+    return records[last]
+
+
+def _write(path: str, records: np.ndarray, formula):
+    """写出有序的结果文件（先写临时文件再替换）"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, SCHEMA_VERSION, 0, formula.version, len(records),
+                             formula.fingerprint.encode('ascii'),
+                             formula.id.encode('utf-8')[:32]))
+        f.write(records.tobytes())
+    os.replace(temp_path, path)
+
+
+class ResultStore:
+    """评分结果库（目录，每个公式指纹一个文件）
+
+    同一进程内使用；rate() 只计算库中没有的行，结束时需调用 close() 合并新结果。
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._segments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, formula, keys: tuple) -> np.ndarray:
+        """按输入哈希批量查找评分，未找到的为 NaN"""
+        return self._segment(formula).lookup(*keys)
+
+    def add(self, formula, keys: tuple, ratings: np.ndarray):
+        """保存一批评分"""
+        self._segment(formula).append(*keys, ratings)
+
+    def rate(self, formula, columns: dict, valid: np.ndarray = None) -> np.ndarray:
+        """批量计算评分：库中已有的直接取出，其余计算并写入库
+
+        valid 给出时只计算和保存通过校验的行，其余行（未命中时）为 NaN。
+        """
+        keys = input_keys(columns)
+        segment = self._segment(formula)
+        ratings = segment.lookup(*keys)
+        missing = np.isnan(ratings)
+        if valid is not None:
+            missing &= valid
+        count = int(np.count_nonzero(missing))
+        self.hits += len(ratings) - int(np.count_nonzero(np.isnan(ratings)))
+        self.misses += count
+        if count:
+            subset = {field: np.asarray(values)[missing] if np.ndim(values) else values
+                      for field, values in columns.items()}
+            computed = formula.vector(subset)
+            ratings[missing] = computed
+            segment.append(keys[0][missing], keys[1][missing], computed)
+        return ratings
+
+    def close(self):
+        """合并所有新结果"""
+        for segment in self._segments.values():
+            segment.close()
+
+    def entries(self) -> list:
+        """库中各文件的 (公式ID, 公式版本, 指纹, 记录数)"""
+        return [_read_header(path)
+                for path in sorted(glob.glob(os.path.join(self.path, '*' + SUFFIX)))]
+
+    def prune(self, registry) -> list:
+        """删除指纹不属于注册表中任何公式的文件（系数已变更的旧结果），返回删除的条目"""
+        self.close()
+        current = {registry.get(formula_id).fingerprint for formula_id in registry.ids()}
+        removed = []
+        for path in sorted(glob.glob(os.path.join(self.path, '*' + SUFFIX))):
+            entry = _read_header(path)
+            if entry[2] not in current:
+                self._segments.pop(entry[2], None)
+                os.remove(path)
+                removed.append(entry)
+        return removed
+
+    def _segment(self, formula) -> _Segment:
+        segment = self._segments.get(formula.fingerprint)
+        if segment is None:
+            path = os.path.join(self.path, formula.fingerprint + SUFFIX)
+            segment = self._segments[formula.fingerprint] = _Segment(path, formula)
+        return segment
@@ -0,0 +1,63 @@
+# 回合级输入模型：每名选手的"哪些回合有击杀/助攻/存活/被补枪"用整数位集存储，
+# 第 i 回合对应第 i 位，统计时只需按位或与 popcount（int.bit_count）。
+
+# 补枪判定窗口（秒）：队友被击杀后该时间内击杀凶手，视为该队友被补枪（KAST中的T）
+TRADE_WINDOW = 5
+
+
+class RoundBits:
+    """单个选手单场比赛的回合位集
+
+    kill/assist/survived/traded/won: 对应事件发生过的回合
+    multikill_3k/4k/5k:              该回合恰好3杀/4杀/5杀及以上（互不重叠）
+    rws_points:                      各获胜回合分得的RWS分数之和
+    """
+
+    __slots__ = ('rounds', 'kill', 'assist', 'survived', 'traded', 'won',
+                 'multikill_3k', 'multikill_4k', 'multikill_5k', 'rws_points')
+
+    def __init__(self):
+        self.rounds = 0
+        self.kill = self.assist = self.survived = self.traded = self.won = 0
+        self.multikill_3k = self.multikill_4k = self.multikill_5k = 0
+        self.rws_points = 0.0
+
+    def add_round(self, kills: int = 0, assisted: bool = False, survived: bool = False,
+                  traded: bool = False, won: bool = False, rws_share: float = 0.0):
+        """追加一个回合的结果"""
+        bit = 1 << self.rounds
+        self.rounds += 1
+        if kills:
+            self.kill |= bit
+            if kills >= 5:
+                self.multikill_5k |= bit
+            elif kills == 4:
+                self.multikill_4k |= bit
+            elif kills == 3:
+                self.multikill_3k |= bit
+        if assisted:
+            self.assist |= bit
+        if survived:
+            self.survived |= bit
+        if traded:
+            self.traded |= bit
+        if won:
+            self.won |= bit
+            self.rws_points += rws_share
+
+    def kast_rounds(self) -> int:
+        """有击杀、助攻、存活或被补枪的回合数"""
+        return (self.kill | self.assist | self.survived | self.traded).bit_count()
+
+    def kast(self) -> float:
+        """精确KAST（百分比）"""
+        return self.kast_rounds() / max(1, self.rounds) * 100
+
+    def multikill_counts(self) -> tuple:
+        """(3杀回合数, 4杀回合数, 5杀回合数)"""
+        return (self.multikill_3k.bit_count(), self.multikill_4k.bit_count(),
+                self.multikill_5k.bit_count())
+
+    def rws(self) -> float:
+        """回合胜利分成RWS：获胜回合分数之和 / 总回合数"""
+        return self.rws_points / max(1, self.rounds)
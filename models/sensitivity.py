@@ -0,0 +1,225 @@
+import numpy as np
+
+from models.formula_registry import default_registry
+
+# 敏感度分析：各算法对每个输入的解析偏导数，以及二维 what-if 评分曲面。
+#
+# 偏导数按公式定义（formulas.json 中的系数与上限）逐项前向求导得到，输入按连续量处理。
+# 分段处（上限、下限、[0, 3] 区间）取右导数，即"该输入增加一点时评分的变化率"：
+# 已达上限的项（如 ADR ≥ 300、Impact/RMK 封顶、评分已到 3.0）对应的偏导数为 0。
+INPUT_FIELDS = ('kills', 'deaths', 'assists', 'rounds', 'mvps', 'adr', 'hs_percent',
+                'kills_3k', 'kills_4k', 'kills_5k', 'rws', 'kast')
+# 可选输入：NaN（单组计算中为 None）表示未提供，此时对应的偏导数为 NaN
+OPTIONAL_FIELDS = ('rws', 'kast')
+
+
+class _Dual:
+    """前向求导值：value 为评分中间值数组，grad 为 {输入字段: 偏导数组}"""
+
+    __slots__ = ('value', 'grad')
+
+    def __init__(self, value, grad: dict):
+        self.value = value
+        self.grad = grad
+
+    def __add__(self, other):
+        if not isinstance(other, _Dual):
+            return _Dual(self.value + other, self.grad)
+        return _Dual(self.value + other.value, _linear(self.grad, 1, other.grad, 1))
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return _Dual(-self.value, {name: -d for name, d in self.grad.items()})
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if not isinstance(other, _Dual):
+            return _Dual(self.value * other, {name: d * other for name, d in self.grad.items()})
+        return _Dual(self.value * other.value,
+                     _linear(self.grad, other.value, other.grad, self.value))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if not isinstance(other, _Dual):
+            return _Dual(self.value / other, {name: d / other for name, d in self.grad.items()})
+        value = self.value / other.value
+        return _Dual(value, _linear(self.grad, 1.0 / other.value,
+                                    other.grad, -value / other.value))
+
+
+def _linear(grad_a: dict, scale_a, grad_b: dict, scale_b) -> dict:
+    """scale_a * grad_a + scale_b * grad_b"""
+    grad = {name: d * scale_a for name, d in grad_a.items()}
+    for name, d in grad_b.items():
+        grad[name] = grad[name] + d * scale_b if name in grad else d * scale_b
+    return grad
+
+
+def _lift(x) -> _Dual:
+    return x if isinstance(x, _Dual) else _Dual(np.asarray(x, dtype=np.float64), {})
+
+
+def _fmin(a, b) -> _Dual:
+    """min(a, b) 及其右导数（相等时取两侧导数中较小者）"""
+    a, b = _lift(a), _lift(b)
+    take_a = a.value < b.value
+    tie = a.value == b.value
+    grad = {}
+    for name in a.grad.keys() | b.grad.keys():
+        da = a.grad.get(name, 0.0)
+        db = b.grad.get(name, 0.0)
+        grad[name] = np.where(take_a, da, np.where(tie, np.minimum(da, db), db))
+    return _Dual(np.fmin(a.value, b.value), grad)
+
+
+def _fmax(a, b) -> _Dual:
+    """max(a, b) 及其右导数（相等时取两侧导数中较大者）"""
+    negated = _fmin(-_lift(a), -_lift(b))
+    return -negated
+
+
+def _where(mask, a, b) -> _Dual:
+    a, b = _lift(a), _lift(b)
+    grad = {name: np.where(mask, a.grad.get(name, 0.0), b.grad.get(name, 0.0))
+            for name in a.grad.keys() | b.grad.keys()}
+    return _Dual(np.where(mask, a.value, b.value), grad)
+
+
+def _clamp(spec: dict, rating: _Dual) -> _Dual:
+    lo, hi = spec.get('clamp', (0.0, 3.0))
+    return _fmax(float(lo), _fmin(float(hi), rating))
+
+
+def _rating_1_0(spec: dict, v: dict, registry) -> _Dual:
+    c, k = spec['coefficients'], spec['caps']
+    rounds = _fmax(v['rounds'], 1)
+    kpr = v['kills'] / rounds
+    spr = (rounds - v['deaths']) / rounds
+    rmk = _fmin((v['kills_3k'] * c['rmk_3k'] + v['kills_4k'] * c['rmk_4k'] +
+                 v['kills_5k'] * c['rmk_5k']) / rounds, k['rmk'])
+    return _clamp(spec, (kpr + c['spr'] * spr + rmk) / c['divisor'])
+
+
+def _rating_2_0(spec: dict, v: dict, registry) -> _Dual:
+    c, k = spec['coefficients'], spec['caps']
+    rounds = _fmax(v['rounds'], 1)
+    kpr = v['kills'] / rounds
+    dpr = v['deaths'] / rounds
+    kast = _fmin(k['kast'], (_fmin(v['kills'] + v['assists'], rounds * c['kast_contribution']) +
+                             _fmax(0, rounds - v['deaths'])) / rounds * 100)
+    # 回合级精确KAST（非NaN且非0）替代估算值，与 kast or ... 的语义一致
+    exact = v['kast'].value
+    kast = _where(~np.isnan(exact) & (exact != 0), v['kast'], kast)
+    multikill = _fmin((v['kills_3k'] * c['multikill_3k'] + v['kills_4k'] * c['multikill_4k'] +
+                       v['kills_5k'] * c['multikill_5k']) / rounds, k['multikill'])
+    impact = (c['impact_multikill'] * multikill + c['impact_kpr'] * kpr +
+              c['impact_survival'] * (rounds - v['deaths']) / rounds)
+    rating = (c['kpr'] * kpr + c['dpr'] * dpr + c['impact'] * impact +
+              c['adr'] * _fmin(k['adr'], v['adr']) + c['kast'] * kast + c['intercept'])
+    return _clamp(spec, rating)
+
+
+def _custom(spec: dict, v: dict, registry) -> _Dual:
+    c, k = spec['coefficients'], spec['caps']
+    rounds = _fmax(v['rounds'], 1)
+    base = (c['kpr'] * (v['kills'] / rounds) +
+            c['survival'] * (1 - _fmin(k['dpr'], v['deaths'] / rounds)) +
+            c['apr'] * (v['assists'] / rounds) +
+            c['adr'] * (_fmin(k['adr'], v['adr']) / 100) +
+            c['hs'] * (_fmin(k['hs_percent'], v['hs_percent']) / 100) +
+            c['mvp'] * (v['mvps'] / rounds))
+    rws = v['rws']
+    missing = np.isnan(rws.value)
+    present = _Dual(np.where(missing, 0.0, rws.value), rws.grad)
+    factor = c['rws_base'] + _fmin(k['rws'], _fmax(0.0, present)) / c['rws_divisor']
+    base = _where(missing, base, base * factor)
+    return _clamp(spec, base * c['scale'] + c['offset'])
+
+
+def _composite(spec: dict, v: dict, registry) -> _Dual:
+    total = None
+    for component_id in spec['components']:
+        rating = _differentiate(registry.get(component_id), v, registry)
+        total = rating if total is None else total + rating
+    return _clamp(spec, total / len(spec['components']))
+
+
+_DERIVATIVES = {
+    'rating_1_0': _rating_1_0,
+    'rating_2_0': _rating_2_0,
+    'custom': _custom,
+    'composite': _composite,
+}
+
+
+def _differentiate(formula, variables: dict, registry) -> _Dual:
+    return _DERIVATIVES[formula.kind](formula.spec, variables, registry)
+
+
+def _columns(stats: dict) -> dict:
+    """补齐缺省输入（多杀数为0，rws/kast 为NaN），None 转为 NaN"""
+    columns = {field: (np.nan if field in OPTIONAL_FIELDS else 0) for field in INPUT_FIELDS}
+    columns.update((field, np.nan if value is None else value) for field, value in stats.items())
+    return columns
+
+
+def gradient(method: str, columns: dict, registry=None) -> tuple:
+    """一批数据的评分与偏导数，返回 (评分数组, {输入字段: 偏导数组})
+
+    columns 与 BatchRatingCalculator.calculate 的列一致（可为可广播的标量）；
+    rws/kast 中的 NaN 表示未提供。评分与 formula.vector(columns) 的结果一致。
+    """
+    registry = registry or default_registry()
+    formula = registry.get(method)
+    columns = _columns(columns)
+    arrays = {field: np.asarray(columns[field], dtype=np.float64) for field in INPUT_FIELDS}
+    shape = np.broadcast_shapes(*(array.shape for array in arrays.values()))
+    ones = np.ones(shape)
+    variables = {field: _Dual(array, {field: ones}) for field, array in arrays.items()}
+
+    result = _differentiate(formula, variables, registry)
+    rating = np.broadcast_to(result.value, shape).astype(np.float64)
+    partials = {}
+    for field in INPUT_FIELDS:
+        partial = np.broadcast_to(result.grad.get(field, 0.0), shape).astype(np.float64)
+        if field in OPTIONAL_FIELDS:
+            partial[np.isnan(np.broadcast_to(arrays[field], shape))] = np.nan
+        partials[field] = partial
+    return rating, partials
+
+
+def sensitivity(method: str, registry=None, **stats) -> dict:
+    """单组数据的评分偏导数 {输入字段: 偏导数}（未提供的 rws/kast 对应 None）
+
+    例如 sensitivity('2.0', kills=20, ...)['adr'] * 10 为 ADR +10 时评分的一阶变化。
+    """
+    _, partials = gradient(method, _columns(stats), registry)
+    return {field: (None if np.isnan(partial) else float(partial))
+            for field, partial in partials.items()}
+
+
+def what_if_grid(stats: dict, x_field: str, x_values, y_field: str, y_values,
+                 methods=None, registry=None) -> dict:
+    """二维 what-if 评分曲面：{算法ID: 形状为 (len(y_values), len(x_values)) 的评分数组}
+
+    其余输入取 stats 中的值；每种算法只做一次向量化求值。
+    """
+    if x_field == y_field:
+        raise ValueError("x 与 y 必须是不同的输入字段")
+    for field in (x_field, y_field):
+        if field not in INPUT_FIELDS:
+            raise ValueError(f"未知的输入字段: {field}")
+    registry = registry or default_registry()
+    columns = _columns(stats)
+    columns[x_field] = np.asarray(x_values, dtype=np.float64)[np.newaxis, :]
+    columns[y_field] = np.asarray(y_values, dtype=np.float64)[:, np.newaxis]
+    shape = (columns[y_field].shape[0], columns[x_field].shape[1])
+    return {method: np.broadcast_to(registry.get(method).vector(columns), shape)
+            for method in (methods or registry.ids())}
@@ -0,0 +1,420 @@
+import os
+import re
+import time
+
+from models.round_events import TRADE_WINDOW, RoundBits
+
+# CS2 专用服务器日志解析：逐行读取 → 事件 → 按选手累计单场数据
+#
+# 日志行格式（示例）:
+#   L 10/18/2025 - 20:14:03: "Alice<12><[U:1:1001]><CT>" [..] killed "Bob<13><[U:1:1002]><TERRORIST>" [..] with "ak47" (headshot)
+#   L 10/18/2025 - 20:14:03: "Alice<12><[U:1:1001]><CT>" [..] attacked "Bob<13><[U:1:1002]><TERRORIST>" [..] with "ak47" (damage "27") (damage_armor "3") (health "73") ...
+#   L 10/18/2025 - 20:14:03: "Carol<14><[U:1:1003]><CT>" assisted killing "Bob<13><[U:1:1002]><TERRORIST>"
+#   L 10/18/2025 - 20:14:03: World triggered "Round_Start" / "Round_End" / "Match_Start" on "de_dust2"
+#   L 10/18/2025 - 20:14:03: Team "CT" triggered "SFUI_Notice_CTs_Win" (CT "1") (T "0")
+
+# 事件类型
+MATCH_START = 'match_start'
+ROUND_START = 'round_start'
+ROUND_END = 'round_end'
+TEAM_WIN = 'team_win'
+KILL = 'kill'
+ASSIST = 'assist'
+DAMAGE = 'damage'
+SUICIDE = 'suicide'
+MVP = 'mvp'
+JOIN = 'join'
+DISCONNECT = 'disconnect'
+GAME_OVER = 'game_over'
+
+# 参与比赛的阵营
+PLAYING_TEAMS = ('CT', 'TERRORIST')
+
+_PLAYER = rb'(".+?<\d+><[^>]*><[^>]*>")'
+_POSITION = rb'(?: \[[^\]]*\])?'
+_TOKEN_RE = re.compile(rb'"(.+?)<\d+><([^>]*)><([^>]*)>"')
+_KILL_RE = re.compile(
+    _PLAYER + _POSITION + rb' killed ' + _PLAYER + _POSITION + rb' with "[^"]*"(.*)')
+_ATTACK_RE = re.compile(
+    _PLAYER + _POSITION + rb' attacked ' + _PLAYER + _POSITION +
+    rb' with "[^"]*" \(damage "(\d+)"\) \(damage_armor "\d+"\) \(health "(\d+)"\)')
+_ASSIST_RE = re.compile(_PLAYER + rb' assisted killing ' + _PLAYER)
+_SUICIDE_RE = re.compile(_PLAYER + _POSITION + rb' committed suicide')
+_JOIN_RE = re.compile(_PLAYER + rb' switched from team <[^>]*> to <([^>]*)>')
+_DISCONNECT_RE = re.compile(_PLAYER + rb' disconnected')
+_MVP_RE = re.compile(_PLAYER + rb' triggered "round_mvp"')
+_WORLD_RE = re.compile(rb'World triggered "(Round_Start|Round_End|Match_Start)"(?: on "([^"]*)")?')
+_TEAM_RE = re.compile(rb'Team "(CT|TERRORIST)" triggered "')
+
+# 选手标识解析缓存：同一场比赛中的标识反复出现，条目数只与选手数（及阵营变化）有关
+_PLAYER_CACHE = {}
+_PLAYER_CACHE_SIZE = 4096
+
+
+def _player(token: bytes) -> tuple:
+    """选手标识 (key, 名称, 阵营)：真人按SteamID区分，机器人按名称区分"""
+    player = _PLAYER_CACHE.get(token)
+    if player is None:
+        name, steam_id, team = _TOKEN_RE.match(token).groups()
+        name = name.decode('utf-8', 'replace')
+        steam_id = steam_id.decode('ascii', 'replace')
+        key = f"BOT:{name}" if steam_id == 'BOT' else steam_id
+        player = (key, name, team.decode('ascii', 'replace'))
+        if len(_PLAYER_CACHE) >= _PLAYER_CACHE_SIZE:
+            _PLAYER_CACHE.clear()
+        _PLAYER_CACHE[token] = player
+    return player
+
+
+def parse_line(line: bytes):
+    """解析一行日志，返回事件元组；与评分无关的行返回 None"""
+    # 跳过 "L 10/18/2025 - 20:14:03: " 时间前缀（秒后的 ": " 是第一个冒号加空格）
+    start = line.find(b': ') + 2 if line.startswith(b'L ') else 0
+
+    # 先做子串判断再用正则，绝大多数无关行只需几次 in 运算
+    if b' attacked "' in line:
+        match = _ATTACK_RE.match(line, start)
+        if match:
+            attacker, victim, damage, health = match.groups()
+            return DAMAGE, _player(attacker), _player(victim), int(damage), int(health)
+    elif b' killed "' in line:
+        match = _KILL_RE.match(line, start)
+        if match:
+            attacker, victim, rest = match.groups()
+            return (KILL, _player(attacker), _player(victim), b'headshot' in rest,
+                    _seconds(line, start))
+    elif b' assisted killing "' in line:
+        match = _ASSIST_RE.match(line, start)
+        if match:
+            return ASSIST, _player(match.group(1)), _player(match.group(2))
+    elif line.startswith(b'World triggered', start):
+        match = _WORLD_RE.match(line, start)
+        if match:
+            kind = match.group(1)
+            if kind == b'Round_Start':
+                return (ROUND_START,)
+            if kind == b'Round_End':
+                return (ROUND_END,)
+            return MATCH_START, (match.group(2) or b'').decode('utf-8', 'replace')
+    elif line.startswith(b'Team "', start):
+        match = _TEAM_RE.match(line, start)
+        if match:
+            return TEAM_WIN, match.group(1).decode('ascii')
+    elif line.startswith(b'Game Over', start):
+        return (GAME_OVER,)
+    elif b' switched from team ' in line:
+        match = _JOIN_RE.match(line, start)
+        if match:
+            key, name, _ = _player(match.group(1))
+            return JOIN, (key, name, match.group(2).decode('ascii', 'replace'))
+    elif b' committed suicide' in line:
+        match = _SUICIDE_RE.match(line, start)
+        if match:
+            return SUICIDE, _player(match.group(1))
+    elif b' disconnected' in line:
+        match = _DISCONNECT_RE.match(line, start)
+        if match:
+            return DISCONNECT, _player(match.group(1))
+    elif b'"round_mvp"' in line:
+        match = _MVP_RE.match(line, start)
+        if match:
+            return MVP, _player(match.group(1))
+    return None
+
+
+def _seconds(line: bytes, start: int):
+    """时间前缀中的当日秒数（用于补枪判定），无时间前缀时返回 None"""
+    if start < 10:
+        return None
+    clock = line[start - 10:start - 2]
+    try:
+        return int(clock[0:2]) * 3600 + int(clock[3:5]) * 60 + int(clock[6:8])
+    except ValueError:
+        return None
+
+
+def iter_lines(path: str, buffer_size: int = 1 << 20):
+    """逐行读取日志文件（二进制，只解码与评分相关的行）
+
+    文件在调用时打开（不存在时立即报错，调用方可以先检查输入再创建输出），返回行的生成器。
+    """
+    return _read_lines(open(path, 'rb', buffering=buffer_size))
+
+
+def _read_lines(f):
+    """逐行产出已打开的文件，读完后关闭"""
+    with f:
+        yield from f
+
+
+def follow_lines(path: str, poll_interval: float = 0.5, stop=None, from_end: bool = False):
+    """持续读取不断增长的日志文件（类似 tail -F）
+
+    不完整的最后一行会等写完后再产出；文件被截断或轮转（inode变化）时从头重新读取。
+    stop 为可选的 threading.Event，设置后在下一次轮询时结束。
+    与 iter_lines 相同，文件在调用时打开。
+    """
+    return _follow(open(path, 'rb'), path, poll_interval, stop, from_end)
+
+
+def _follow(f, path: str, poll_interval: float, stop, from_end: bool):
+    """follow_lines 的生成器部分"""
+    try:
+        if from_end:
+            f.seek(0, os.SEEK_END)
+        partial = b''
+        while stop is None or not stop.is_set():
+            line = f.readline()
+            if line:
+                if line.endswith(b'\n'):
+                    yield partial + line
+                    partial = b''
+                else:
+                    partial += line
+                continue
+
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            opened = os.fstat(f.fileno())
+            if current is not None and (current.st_ino != opened.st_ino
+                                        or current.st_size < f.tell()):
+                # 轮转或截断：重新打开并从头读取
+                f.close()
+                f = open(path, 'rb')
+                partial = b''
+                continue
+            time.sleep(poll_interval)
+    finally:
+        f.close()
+
+
+def parse_events(lines):
+    """行 → 事件（生成器，丢弃无关行）"""
+    for line in lines:
+        event = parse_line(line)
+        if event is not None:
+            yield event
+
+
+class PlayerMatchState:
+    """单个选手在当前比赛中的累计数据"""
+
+    __slots__ = ('key', 'name', 'team', 'active', 'kills', 'deaths', 'assists',
+                 'mvps', 'damage', 'hs_kills', 'bits', 'round_kills', 'round_assisted',
+                 'round_traded', 'round_damage', 'health')
+
+    def __init__(self, key: str, name: str, team: str):
+        self.key = key
+        self.name = name
+        self.team = team
+        self.active = True
+        self.reset()
+
+    def reset(self):
+        """清空比赛数据（Match_Start 时调用，保留身份与阵营）"""
+        self.kills = self.deaths = self.assists = self.mvps = 0
+        self.damage = 0
+        self.hs_kills = 0
+        self.bits = RoundBits()
+        self.reset_round()
+
+    def reset_round(self):
+        """清空回合内数据（Round_Start 时调用）"""
+        self.round_kills = 0
+        self.round_assisted = False
+        self.round_traded = False
+        self.round_damage = 0
+        self.health = 100
+
+
+class MatchTracker:
+    """按事件流累计每名选手的单场数据，在回合结束/比赛结束时产出评分输入
+
+    内存只与当前比赛中的选手数量有关：比赛结束后状态即被清空。
+    """
+
+    def __init__(self):
+        self.map_name = ''
+        self.round_number = 0
+        self.matches = 0
+        self._players = {}
+        self._round_winner = None
+        self._round_deaths = []
+        self._has_winners = False
+
+    def __len__(self):
+        return len(self._players)
+
+    def process(self, events, emit_rounds: bool = False):
+        """消费事件流，产出:
+            ('round', 回合数, 记录列表)    每回合结束（emit_rounds=True 时）
+            ('match', 地图名, 记录列表)    比赛结束（Game Over）
+        输入结束时若仍有未结束的比赛，以 ('partial', 地图名, 记录列表) 产出。
+        """
+        handlers = {
+            KILL: self._on_kill, ASSIST: self._on_assist, DAMAGE: self._on_damage,
+            SUICIDE: self._on_suicide, MVP: self._on_mvp, JOIN: self._on_join,
+            DISCONNECT: self._on_disconnect, TEAM_WIN: self._on_team_win,
+            ROUND_START: self._on_round_start, MATCH_START: self._on_match_start,
+        }
+        for event in events:
+            kind = event[0]
+            if kind == ROUND_END:
+                self._on_round_end()
+                if emit_rounds:
+                    yield 'round', self.round_number, self.records()
+            elif kind == GAME_OVER:
+                if self.round_number:
+                    yield 'match', self.map_name, self.records()
+                self._end_match()
+            else:
+                handlers[kind](*event[1:])
+        if self.round_number:
+            yield 'partial', self.map_name, self.records()
+
+    def records(self) -> list:
+        """当前比赛的选手记录（字段与 get_input_values 一致，另含 player/steam_id）
+
+        多杀回合数、KAST与RWS由回合位集精确得出（kast 字段供 Rating 2.0 使用）。
+        """
+        records = []
+        for state in self._players.values():
+            bits = state.bits
+            if not bits.rounds:
+                continue
+            kills_3k, kills_4k, kills_5k = bits.multikill_counts()
+            records.append({
+                'player': state.name,
+                'steam_id': state.key,
+                'kills': state.kills,
+                'deaths': state.deaths,
+                'assists': state.assists,
+                'rounds': bits.rounds,
+                'mvps': state.mvps,
+                'adr': state.damage / bits.rounds,
+                'hs_percent': state.hs_kills / state.kills * 100 if state.kills else 0.0,
+                'kills_3k': kills_3k,
+                'kills_4k': kills_4k,
+                'kills_5k': kills_5k,
+                'rws': bits.rws() if self._has_winners else None,
+                'kast': bits.kast(),
+            })
+        return records
+
+    def _state(self, player: tuple) -> PlayerMatchState:
+        """按日志中的选手标识取得状态（同时更新名称与阵营）"""
+        key, name, team = player
+        state = self._players.get(key)
+        if state is None:
+            state = self._players[key] = PlayerMatchState(key, name, team)
+        else:
+            state.name = name
+            if team:
+                state.team = team
+        return state
+
+    def _on_match_start(self, map_name: str):
+        """比赛开始（含重开）：丢弃热身阶段的数据"""
+        self.map_name = map_name
+        self.round_number = 0
+        self._round_winner = None
+        self._round_deaths = []
+        self._has_winners = False
+        for state in self._players.values():
+            state.reset()
+
+    def _on_round_start(self):
+        self._round_winner = None
+        self._round_deaths = []
+        for state in self._players.values():
+            state.reset_round()
+
+    def _on_team_win(self, team: str):
+        self._round_winner = team
+
+    def _on_round_end(self):
+        """回合结束：把本回合的击杀/助攻/存活/补枪/胜负写入各选手的回合位集"""
+        self.round_number += 1
+        playing = [state for state in self._players.values()
+                   if state.active and state.team in PLAYING_TEAMS]
+
+        # RWS：获胜方按本回合伤害占比分配100分（无伤害时平分）
+        winner = self._round_winner
+        winners = [state for state in playing if state.team == winner]
+        team_damage = sum(state.round_damage for state in winners)
+        if winner is not None:
+            self._has_winners = True
+
+        for state in playing:
+            won = state.team == winner
+            share = 0.0
+            if won:
+                share = (100 * state.round_damage / team_damage if team_damage
+                         else 100 / len(winners))
+            state.bits.add_round(state.round_kills, state.round_assisted, state.health > 0,
+                                 state.round_traded, won, share)
+        self._round_winner = None
+        self._round_deaths = []
+
+    def _end_match(self):
+        """比赛结束：释放所有选手状态"""
+        self.matches += 1
+        self.round_number = 0
+        self.map_name = ''
+        self._has_winners = False
+        self._round_deaths = []
+        self._players.clear()
+
+    def _on_kill(self, attacker: tuple, victim: tuple, headshot: bool, seconds=None):
+        killer = self._state(attacker)
+        dead = self._state(victim)
+        dead.deaths += 1
+        dead.health = 0
+        if killer is dead or killer.team == dead.team:
+            return  # 误杀队友不计击杀
+        killer.kills += 1
+        killer.round_kills += 1
+        if headshot:
+            killer.hs_kills += 1
+
+        # 补枪：凶手在窗口时间内被击杀，则之前被其击杀的队友本回合记为被补枪
+        if seconds is not None:
+            for teammate, teammate_killer, died_at in self._round_deaths:
+                if (teammate_killer is dead and teammate.team == killer.team
+                        and (seconds - died_at) % 86400 <= TRADE_WINDOW):
+                    teammate.round_traded = True
+            self._round_deaths.append((dead, killer, seconds))
+
+    def _on_assist(self, assister: tuple, victim: tuple):
+        helper = self._state(assister)
+        if helper.team != self._state(victim).team:
+            helper.assists += 1
+            helper.round_assisted = True
+
+    def _on_damage(self, attacker: tuple, victim: tuple, damage: int, health: int):
+        """ADR按有效伤害计算：不超过受害者受击前的剩余血量"""
+        source = self._state(attacker)
+        target = self._state(victim)
+        effective = min(damage, target.health)
+        target.health = health
+        if source is target or source.team == target.team:
+            return
+        source.damage += effective
+        source.round_damage += effective
+
+    def _on_suicide(self, player: tuple):
+        state = self._state(player)
+        state.deaths += 1
+        state.health = 0
+
+    def _on_mvp(self, player: tuple):
+        self._state(player).mvps += 1
+
+    def _on_join(self, player: tuple):
+        state = self._state(player)
+        state.active = True
+
+    def _on_disconnect(self, player: tuple):
+        self._state(player).active = False
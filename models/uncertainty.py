@@ -0,0 +1,244 @@
+import functools
+
+import numpy as np
+
+from models.formula_registry import default_registry
+from models.result_store import input_keys
+
+# 单场评分的不确定度：由输入总数构造一组"合理的逐回合结果"，对回合做自助重采样（bootstrap），
+# 得到各算法评分的分位数区间（默认 5%/50%/95%）。
+#
+# 逐回合模型（回合数 R 固定）:
+#   击杀      每回合击杀 0-5：3/4/5杀回合按输入，其余击杀尽量分散为1杀回合（不够时为2杀回合）。
+#             重采样后各类回合数服从多项分布，击杀数与多杀回合数一起变化
+#   死亡/助攻/MVP/KAST  每回合取 floor 或 ceil(总数/R)，重采样后 = R*floor + Bin(R, 小数部分)
+#   ADR       每回合伤害与 (1 + 该回合击杀数) 成正比，随重采样的击杀数变化
+#   爆头率     每个击杀独立地以输入爆头率爆头：Bin(击杀数, 爆头率) / 击杀数
+#   RWS       保持不变
+# 各项之间相互独立（如击杀与死亡），区间只反映"回合数有限"带来的抽样波动。
+#
+# 二项分布用预先算好的累积分布表做逆变换抽样（一块均匀随机数 + 索引表），
+# 比逐个调用 Generator.binomial 快得多。概率为整数之比的表（击杀回合、整数的死亡/助攻/MVP）
+# 按整数缓存，在批量计算、重复计算时复用；爆头率等连续概率的表每次调用只建一张。
+# 每行的随机数种子由 (seed, 输入哈希) 决定，同一组输入的区间与分块方式、行的顺序无关。
+DEFAULT_SAMPLES = 10000
+DEFAULT_SEED = 0
+QUANTILES = (5.0, 50.0, 95.0)
+
+# 击杀回合类别（每回合击杀数），按条件二项分布依次抽取
+_KILL_SIZES = (5, 4, 3, 2, 1)
+# 每个样本使用的均匀随机数个数：5类击杀回合 + 死亡/助攻/MVP/KAST + 爆头
+_UNIFORMS = len(_KILL_SIZES) + 5
+# 每块（公式整块求值）的样本总数上限：块再大则临时数组超出缓存，反而变慢
+_BLOCK_SAMPLES = 1 << 14
+# rating_interval 的多杀字段默认值（与其他接口一致）
+_MULTIKILL_DEFAULTS = {'kills_3k': 0, 'kills_4k': 0, 'kills_5k': 0}
+
+
+class _BinomialTable:
+    """Bin(n, p) 的逆变换抽样表（每行一个 n = low..n_max）
+
+    每行的累积分布配一张等分的索引表（guide table）：均匀随机数 u 先按所在区间查出起点，
+    大多数样本起点即结果，每次抽样只有几次数组运算，不需要二分查找。
+    density 为索引表中每个结果对应的区间数，只影响起点落在结果上的比例，不影响抽样结果：
+    缓存复用的表取大值，只用一次的表取小值以减少建表时间。
+    """
+
+    def __init__(self, n_max: int, p: float, low: int = 0, density: int = 8):
+        self.low = low
+        n, k, rest, log_choose, offsets, targets = _layout(n_max, low, density)
+        if p <= 0.0:
+            pmf = np.broadcast_to(k == 0, (len(n), n_max + 1)).astype(np.float64)
+        elif p >= 1.0:
+            pmf = (k == n).astype(np.float64)
+        else:
+            pmf = np.where(k <= n, np.exp(log_choose + k * np.log(p) + rest * np.log1p(-p)), 0.0)
+        cdf = np.cumsum(pmf, axis=1)
+        # 每行在 k = n 处截止为 1：抽样结果不会超过 n（也消除累加的舍入误差）
+        cdf[k >= n] = 1.0
+        rows, self.width = cdf.shape
+        self.bins = density * self.width
+        # guide[n, j] = 第 n 行中 cdf <= j/bins 的个数，即 u >= j/bins 时结果的下界。
+        # 各行平移 n 后首尾相接仍有序，一次查完；阈值略微放低，平移与 u*bins 的舍入
+        # 不会让起点越过结果。保存为展平后的绝对位置
+        guide = (np.searchsorted((cdf + offsets).ravel(), targets, side='right').reshape(
+            rows, self.bins) - offsets * self.width)
+        self.guide = (np.clip(guide, 0, self.width - 1) + offsets * self.width).ravel()
+        self.cdf_rows = cdf
+        self.cdf = cdf.ravel()
+
+    def draw(self, u: np.ndarray, n: np.ndarray = None) -> np.ndarray:
+        """逆变换抽样：n 为每个样本的试验次数（不给出时均为 low）"""
+        index = (u * self.bins).astype(np.intp)
+        if n is None:
+            row = 0
+            position = self.guide[index]
+        else:
+            row = n - self.low
+            position = self.guide[row * self.bins + index]
+        # 起点即结果的样本占绝大多数；其余（区间内有多个累积概率，多在分布尾部）
+        # 直接数出该行 cdf <= u 的个数，不逐步向后比较
+        active = np.flatnonzero(u >= self.cdf[position])
+        if active.size:
+            rows = row if n is None else row[active]
+            position[active] = rows * self.width + (
+                self.cdf_rows[rows] <= u[active, np.newaxis]).sum(axis=1)
+        return position if n is None else position - row * self.width
+
+
+@functools.lru_cache(maxsize=256)
+def _layout(n_max: int, low: int, density: int) -> tuple:
+    """抽样表中与概率无关的部分：各行的 n、k、n-k、对数组合数，以及索引表的行偏移与查找值"""
+    n = np.arange(low, n_max + 1)[:, np.newaxis]
+    k = np.arange(n_max + 1)[np.newaxis, :]
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, n_max + 1)))))
+    rest = np.where(k <= n, n - k, 0)
+    log_choose = log_factorial[n] - log_factorial[k] - log_factorial[rest]
+    bins = density * (n_max + 1)
+    offsets = np.arange(len(n))[:, np.newaxis]
+    targets = (offsets + np.arange(bins) / bins - 1e-12).ravel()
+    return n, k, rest, log_choose, offsets, targets
+
+
+@functools.lru_cache(maxsize=1024)
+def _table(n_max: int, count: int, total: int, low: int = 0) -> _BinomialTable:
+    """概率为 count/total 的抽样表缓存（以整数为键：浮点概率几乎每次调用都不同，缓存不住）"""
+    return _BinomialTable(n_max, count / total, low)
+
+
+def _count(total: float, rounds: int, u: np.ndarray) -> np.ndarray:
+    """每回合取 floor/ceil(total/R) 的计数，重采样回合后的总数"""
+    base = int(total // rounds)
+    if float(total).is_integer():
+        table = _table(rounds, int(total) - rounds * base, rounds, rounds)
+    else:
+        # 非整数总数（如由KAST百分比换算的回合数）只在本次调用中使用
+        table = _BinomialTable(rounds, total / rounds - base, rounds, density=4)
+    return rounds * base + table.draw(u)
+
+
+def resample(stats: dict, samples: int, rng: np.random.Generator) -> dict:
+    """一组统计数据的 samples 组重采样结果（列式，可直接传给公式的 vector 求值）"""
+    rounds = max(1, int(stats['rounds']))
+    kills = int(stats['kills'])
+    u = rng.random((_UNIFORMS, samples))
+
+    # 击杀回合类别：多杀回合按输入，其余击杀分散到剩余回合
+    multi = {5: int(stats.get('kills_5k', 0)), 4: int(stats.get('kills_4k', 0)),
+             3: int(stats.get('kills_3k', 0))}
+    rest = max(0, kills - sum(size * count for size, count in multi.items()))
+    free = max(0, rounds - sum(multi.values()))
+    doubles = min(max(0, rest - free), free)
+    singles = min(rest - 2 * doubles, free - doubles)
+    # 无法放进回合的多余击杀（输入不自洽时）作为常数保留
+    extra = rest - singles - 2 * doubles
+    counts = {**multi, 2: doubles, 1: singles}
+
+    remaining = np.full(samples, rounds)
+    left = rounds
+    drawn = {}
+    for i, size in enumerate(_KILL_SIZES):
+        if counts[size] <= 0 or left <= 0:
+            drawn[size] = np.zeros(samples, dtype=np.int64)
+            continue
+        table = _table(rounds, counts[size], left)
+        drawn[size] = table.draw(u[i], remaining)
+        remaining -= drawn[size]
+        left -= counts[size]
+    resampled_kills = sum(size * drawn[size] for size in _KILL_SIZES) + extra
+
+    column = len(_KILL_SIZES)
+    deaths = _count(stats['deaths'], rounds, u[column])
+    assists = _count(stats['assists'], rounds, u[column + 1])
+    mvps = _count(stats['mvps'], rounds, u[column + 2])
+
+    adr = float(stats['adr'])
+    adr_samples = adr * (rounds + resampled_kills) / (rounds + kills)
+
+    hs = float(stats['hs_percent'])
+    heads = _BinomialTable(int(resampled_kills.max()), hs / 100, int(resampled_kills.min()),
+                           density=4).draw(u[column + 4], resampled_kills)
+    hs_samples = np.where(resampled_kills > 0, heads * 100 / np.maximum(resampled_kills, 1), hs)
+
+    columns = {
+        'kills': resampled_kills, 'deaths': deaths, 'assists': assists,
+        'rounds': np.full(samples, rounds), 'mvps': mvps,
+        'adr': adr_samples, 'hs_percent': hs_samples,
+        'kills_3k': drawn[3], 'kills_4k': drawn[4], 'kills_5k': drawn[5],
+        'rws': np.full(samples, _optional(stats.get('rws'))),
+    }
+    kast = _optional(stats.get('kast'))
+    if kast == kast and kast:
+        kast_rounds = _count(kast / 100 * rounds, rounds, u[column + 3])
+        columns['kast'] = kast_rounds * 100 / rounds
+    return columns
+
+
+def _optional(value) -> float:
+    """可选输入（None 与 NaN 均表示未提供）"""
+    return np.nan if value is None else float(value)
+
+
+def _percentiles(values: np.ndarray, quantiles: tuple) -> np.ndarray:
+    """每行的分位数（与 np.percentile 默认的线性插值一致，只做一次部分排序）"""
+    position = np.asarray(quantiles, dtype=np.float64) / 100 * (values.shape[-1] - 1)
+    low = np.floor(position).astype(np.intp)
+    high = np.ceil(position).astype(np.intp)
+    ordered = np.partition(values, np.union1d(low, high), axis=-1)
+    return ordered[..., low] + (ordered[..., high] - ordered[..., low]) * (position - low)
+
+
+def _rng(seed: int, h1, h2) -> np.random.Generator:
+    """由全局种子与输入哈希决定的随机数发生器"""
+    return np.random.default_rng([seed, int(h1), int(h2)])
+
+
+def _concatenate(parts: list) -> dict:
+    """把多行的重采样结果首尾相接为一组列（部分行没有 kast 时以 NaN 补齐，即未提供）"""
+    columns = {field: np.concatenate([part[field] for part in parts]) for field in parts[0]
+               if field != 'kast'}
+    if any('kast' in part for part in parts):
+        columns['kast'] = np.concatenate([
+            part['kast'] if 'kast' in part else np.full(len(part['rounds']), np.nan)
+            for part in parts])
+    return columns
+
+
+def rating_intervals(columns: dict, methods, samples: int = DEFAULT_SAMPLES,
+                     seed: int = DEFAULT_SEED, quantiles: tuple = QUANTILES,
+                     valid: np.ndarray = None, registry=None) -> dict:
+    """每行、每个算法的评分分位数：{方法ID: (行数, 分位数个数) 数组}
+
+    valid 给出时只计算通过校验的行，其余行为 NaN。
+    重采样逐行进行（随机数种子只取决于该行的输入），公式求值与分位数按块进行：
+    一块中各行的样本首尾相接，每个算法的 vector 与部分排序在整块上各调用一次。
+    """
+    registry = registry or default_registry()
+    formulas = [(method, registry.get(method)) for method in methods]
+    h1, h2 = input_keys(columns)
+    size = len(h1)
+    results = {method: np.full((size, len(quantiles)), np.nan) for method in methods}
+    fields = [field for field in columns if np.ndim(columns[field])]
+    values = {field: np.asarray(columns[field]).tolist() for field in fields}
+    rows = range(size) if valid is None else np.flatnonzero(valid).tolist()
+    block = max(1, _BLOCK_SAMPLES // samples)
+    for start in range(0, len(rows), block):
+        selected = rows[start:start + block]
+        resampled = _concatenate([
+            resample({field: values[field][row] for field in fields}, samples,
+                     _rng(seed, h1[row], h2[row]))
+            for row in selected])
+        for method, formula in formulas:
+            ratings = formula.vector(resampled).reshape(len(selected), samples)
+            results[method][selected] = _percentiles(ratings, quantiles)
+    return results
+
+
+def rating_interval(method: str, samples: int = DEFAULT_SAMPLES, seed: int = DEFAULT_SEED,
+                    quantiles: tuple = QUANTILES, registry=None, **stats) -> tuple:
+    """单组数据的评分分位数（rws/kast 为 None 表示未提供，多杀字段缺失时按0）"""
+    stats = dict(_MULTIKILL_DEFAULTS, **stats)
+    columns = {field: np.array([_optional(value) if field in ('rws', 'kast') else value])
+               for field, value in stats.items()}
+    return tuple(rating_intervals(columns, [method], samples, seed, quantiles,
+                                  registry=registry)[method][0].tolist())
@@ -0,0 +1,172 @@
+import math
+
+# 输入校验：在计算前一次性检查整批数据，计算内核只处理通过校验的行
+#
+# 每行的状态是以下问题位的组合（0 表示通过）
+NEGATIVE = 1                    # 计数、ADR、爆头率、RWS、KAST 为负
+DEATHS_EXCEED_ROUNDS = 2        # 死亡数超过回合数
+MULTIKILLS_EXCEED_ROUNDS = 4    # 3/4/5杀回合数之和超过回合数
+NOT_FINITE = 8                  # ADR/爆头率为 NaN 或无穷，RWS/KAST 为无穷（二者为 NaN 表示未提供）
+NO_ROUNDS = 16                  # 回合数不大于0
+UNPARSEABLE = 32                # 字段值无法解析为数字（该行只报告此问题，填入的默认值不参与其他检查）
+
+MESSAGES = {
+    NEGATIVE: "数值不能为负",
+    DEATHS_EXCEED_ROUNDS: "死亡数超过回合数",
+    MULTIKILLS_EXCEED_ROUNDS: "多杀回合数超过回合数",
+    NOT_FINITE: "ADR/爆头率/RWS/KAST 不是有效数字",
+    NO_ROUNDS: "回合数必须大于0",
+    UNPARSEABLE: "字段值无法解析",
+}
+
+# 参与非负检查的字段（NaN 不算负数）
+_NON_NEGATIVE = ('kills', 'deaths', 'assists', 'mvps', 'kills_3k', 'kills_4k', 'kills_5k',
+                 'adr', 'hs_percent', 'rws', 'kast')
+_FINITE = ('adr', 'hs_percent')
+_OPTIONAL = ('rws', 'kast')
+_MULTIKILLS = ('kills_3k', 'kills_4k', 'kills_5k')
+
+# 校验规则表：(问题位, 检查, 字段)。validate（整批，NumPy）与 check_stats（单组，纯Python）
+# 按同一张表实现各自的检查，规则只在这里定义一次。
+#   negative  任一字段 < 0            not_finite  任一字段为 NaN 或无穷（仅浮点）
+#   infinite  任一字段为无穷          no_rounds   rounds <= 0
+#   exceeds   字段之和 > rounds
+RULES = (
+    (NEGATIVE, 'negative', _NON_NEGATIVE),
+    (NOT_FINITE, 'not_finite', _FINITE),
+    (NOT_FINITE, 'infinite', _OPTIONAL),
+    (NO_ROUNDS, 'no_rounds', ('rounds',)),
+    (DEATHS_EXCEED_ROUNDS, 'exceeds', ('deaths',)),
+    (MULTIKILLS_EXCEED_ROUNDS, 'exceeds', _MULTIKILLS),
+)
+
+
+def describe(status: int) -> list:
+    """状态位对应的错误说明"""
+    return [message for flag, message in MESSAGES.items() if status & flag]
+
+
+class ValidationReport:
+    """一批数据的校验结果（status 为每行的状态位数组）"""
+
+    def __init__(self, status: 'np.ndarray'):
+        self.status = status
+
+    def __len__(self):
+        return len(self.status)
+
+    @property
+    def valid(self) -> 'np.ndarray':
+        """通过校验的行（布尔掩码）"""
+        return self.status == 0
+
+    @property
+    def ok(self) -> bool:
+        """整批数据是否全部通过"""
+        return not self.status.any()
+
+    def rejected(self) -> 'np.ndarray':
+        """未通过校验的行号"""
+        return self.status.nonzero()[0]
+
+    def rows(self, offset: int = 0) -> list:
+        """未通过校验的行及其错误说明：[{'row': 行号+offset, 'errors': [...]}, ...]"""
+        status = self.status
+        return [{'row': int(row) + offset, 'errors': describe(int(status[row]))}
+                for row in self.rejected().tolist()]
+
+    def counts(self) -> dict:
+        """每种问题的行数"""
+        return {message: int((self.status & flag).astype(bool).sum())
+                for flag, message in MESSAGES.items() if (self.status & flag).any()}
+
+    def raise_if_invalid(self, offset: int = 0):
+        """存在未通过校验的行时抛出 ValidationError"""
+        if not self.ok:
+            raise ValidationError(self.rows(offset))
+
+
+class ValidationError(ValueError):
+    """输入校验失败（rejected 为 ValidationReport.rows() 格式的行列表）"""
+
+    # 错误信息中最多列出的行数
+    MAX_LISTED = 5
+
+    def __init__(self, rejected: list):
+        self.rejected = rejected
+        if len(rejected) == 1:
+            message = f"输入无效: {', '.join(rejected[0]['errors'])}"
+        else:
+            listed = '; '.join(f"第{item['row'] + 1}行 {', '.join(item['errors'])}"
+                               for item in rejected[:self.MAX_LISTED])
+            more = f" 等{len(rejected)}行" if len(rejected) > self.MAX_LISTED else ""
+            message = f"输入无效: {listed}{more}"
+        super().__init__(message)
+
+
+def _vector_check(check: str, values: list, rounds: 'np.ndarray') -> 'np.ndarray':
+    """一条规则的整批检查（values 为各字段的列，缺失的列已去掉）"""
+    import numpy as np
+    if check == 'no_rounds':
+        return rounds <= 0
+    if check == 'exceeds':
+        return sum(values) > rounds
+    failed = np.zeros(len(rounds), dtype=bool)
+    for column in values:
+        if check == 'negative':
+            failed |= column < 0
+        elif column.dtype.kind == 'f':
+            failed |= ~np.isfinite(column) if check == 'not_finite' else np.isinf(column)
+    return failed
+
+
+def validate(columns: dict, unparseable=None) -> ValidationReport:
+    """校验一批列数据（键与 records_to_columns 的输出一致，缺失的 rws/kast 列不检查）
+
+    unparseable 为无法解析的行号（见 records_to_columns），这些行只标记为 UNPARSEABLE。
+    """
+    # 界面单条校验（check_stats）不需要 NumPy，只在整批校验时导入
+    import numpy as np
+    rounds = np.asarray(columns['rounds'])
+    status = np.zeros(len(rounds), dtype=np.uint8)
+    for flag, check, fields in RULES:
+        values = [np.asarray(columns[field]) for field in fields
+                  if columns.get(field) is not None]
+        status[_vector_check(check, values, rounds)] |= flag
+    if unparseable:
+        status[sorted(unparseable)] = UNPARSEABLE
+    return ValidationReport(status)
+
+
+def _scalar_check(check: str, values: list, rounds) -> bool:
+    """一条规则的单组检查（与 _vector_check 对应，None/NaN 的可选字段视为未提供）"""
+    if check == 'no_rounds':
+        return rounds <= 0
+    if check == 'exceeds':
+        return sum(values) > rounds
+    if check == 'negative':
+        return any(value < 0 for value in values)
+    if check == 'not_finite':
+        return any(isinstance(value, float) and not math.isfinite(value) for value in values)
+    return any(isinstance(value, float) and math.isinf(value) for value in values)
+
+
+def stats_status(stats: dict) -> int:
+    """单组数据的状态位（纯Python，规则与 validate 相同；多杀字段缺失时按0）"""
+    rounds = stats['rounds']
+    status = 0
+    for flag, check, fields in RULES:
+        if check == 'exceeds':
+            values = [stats.get(field) or 0 for field in fields]
+        else:
+            values = [value for value in map(stats.get, fields) if value is not None]
+        if _scalar_check(check, values, rounds):
+            status |= flag
+    return status
+
+
+def check_stats(stats: dict):
+    """校验单组数据，不通过时抛出 ValidationError（rws/kast 为 None 表示未提供）"""
+    status = stats_status(stats)
+    if status:
+        raise ValidationError([{'row': 0, 'errors': describe(status)}])
@@ -0,0 +1,214 @@
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+
+from models.rating_calculator import RatingCalculator
+from models.record_io import FLOAT_FIELDS, STAT_FIELDS
+from models.validation import describe
+
+# 统计字段的表头
+FIELD_LABELS = {
+    'kills': "击杀", 'deaths': "死亡", 'assists': "助攻", 'rounds': "回合",
+    'mvps': "MVP", 'adr': "ADR", 'hs_percent': "爆头率%", 'kills_3k': "3杀",
+    'kills_4k': "4杀", 'kills_5k': "5杀", 'rws': "RWS",
+}
+RATING_COLUMN = 'rating'
+TIER_COLUMN = 'tier'
+# 校验状态位（未通过校验的行显示错误说明）
+STATUS_COLUMN = 'status'
+
+
+class BulkTableModel(QAbstractTableModel):
+    """批量评分表格模型（按列存储，只为可见行生成显示数据）
+
+    数据保存在按容量倍增的NumPy列数组中（文本列为object数组），
+    排序与过滤只重排一个行号数组，不移动数据本身。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text_fields = []
+        self._fields = []
+        self._columns = {}
+        self._size = 0
+        self._capacity = 0
+        self._rows = None  # 可见行号（排序/过滤后），None 表示全部按原顺序
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+        self._filter_text = ''
+        self._min_rating = None
+        self._search_keys = []
+
+    # ---- Qt 接口 ----
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._size if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._fields)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(self._row(section) + 1)
+        field = self._fields[section]
+        if field == RATING_COLUMN:
+            return "Rating"
+        if field == TIER_COLUMN:
+            return "评价"
+        if field == STATUS_COLUMN:
+            return "校验"
+        return FIELD_LABELS.get(field, field)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = self._fields[index.column()]
+        row = self._row(index.row())
+
+        if role == Qt.DisplayRole:
+            if field == TIER_COLUMN:
+                rating = self._rating(row)
+                return "" if rating != rating else RatingCalculator.get_rating_description(rating)[0]
+            value = self._columns[field][row]
+            if field == STATUS_COLUMN:
+                return '; '.join(describe(int(value)))
+            if field == RATING_COLUMN:
+                return "" if value != value else f"{value:.2f}"
+            if field in FLOAT_FIELDS:
+                return "" if value != value else f"{value:.1f}"
+            return str(value)
+        if role == Qt.ForegroundRole and field in (RATING_COLUMN, TIER_COLUMN):
+            rating = self._rating(row)
+            if rating == rating:
+                return QColor(RatingCalculator.get_rating_description(rating)[1])
+        if role == Qt.TextAlignmentRole and field not in self._text_fields \
+                and field not in (TIER_COLUMN, STATUS_COLUMN):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """按列排序（稳定排序，评价列按评分排序）"""
+        self._sort_column = column
+        self._sort_order = order
+        self._refresh()
+
+    # ---- 数据操作 ----
+
+    def reset_fields(self, text_fields: list):
+        """开始新的导入：清空数据并设置文本列"""
+        self.beginResetModel()
+        self._text_fields = list(text_fields)
+        self._fields = (self._text_fields + list(STAT_FIELDS) +
+                        [RATING_COLUMN, TIER_COLUMN, STATUS_COLUMN])
+        self._columns = {}
+        self._size = 0
+        self._capacity = 0
+        self._rows = None
+        self._sort_column = -1
+        self._search_keys = []
+        self.endResetModel()
+
+    def append_chunk(self, text_columns: dict, stat_columns: dict, ratings, status):
+        """追加一块已评分的数据（行数由 ratings 决定，status 为校验状态位）"""
+        count = len(ratings)
+        if not count:
+            return
+        start = self._size
+        self._reserve(start + count)
+        for field in self._text_fields:
+            self._columns[field][start:start + count] = text_columns[field]
+        for field in STAT_FIELDS:
+            self._columns[field][start:start + count] = stat_columns[field]
+        self._columns[RATING_COLUMN][start:start + count] = ratings
+        self._columns[STATUS_COLUMN][start:start + count] = status
+        # 过滤用的小写检索文本（追加时生成一次，过滤时不再转换）
+        text_values = [text_columns[field] for field in self._text_fields]
+        self._search_keys.extend('\x00'.join(map(str, values)).lower()
+                                 for values in zip(*text_values))
+
+        if self._rows is None and self._sort_column < 0:
+            # 未排序/过滤：直接插入新行，保持滚动位置
+            self.beginInsertRows(QModelIndex(), start, start + count - 1)
+            self._size += count
+            self.endInsertRows()
+        else:
+            self._size += count
+            self._refresh()
+
+    def set_filter(self, text: str = '', min_rating: float = None):
+        """按文本列包含的关键字与最低评分过滤"""
+        self._filter_text = text.strip().lower()
+        self._min_rating = min_rating
+        self._refresh()
+
+    def column_values(self, field: str) -> np.ndarray:
+        """某列的全部数据（原始顺序，只读视图）"""
+        return self._columns[field][:self._size]
+
+    def visible_count(self) -> int:
+        return self.rowCount()
+
+    def total_count(self) -> int:
+        return self._size
+
+    # ---- 内部实现 ----
+
+    def _row(self, visible_row: int) -> int:
+        return visible_row if self._rows is None else int(self._rows[visible_row])
+
+    def _rating(self, row: int) -> float:
+        return float(self._columns[RATING_COLUMN][row])
+
+    def _reserve(self, needed: int):
+        """按需倍增列数组容量"""
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2, 1024)
+        columns = {}
+        for field in self._text_fields:
+            columns[field] = np.empty(capacity, dtype=object)
+        for field in STAT_FIELDS:
+            columns[field] = np.empty(capacity, dtype=np.float64 if field in FLOAT_FIELDS
+                                      else np.int32)
+        columns[RATING_COLUMN] = np.empty(capacity, dtype=np.float64)
+        columns[STATUS_COLUMN] = np.empty(capacity, dtype=np.int32)
+        for field, column in columns.items():
+            if field in self._columns:
+                column[:self._size] = self._columns[field][:self._size]
+        self._columns = columns
+        self._capacity = capacity
+
+    def _refresh(self):
+        """重新计算可见行号（过滤后排序；可见行数可能变化，按重置通知视图）"""
+        self.beginResetModel()
+        rows = None
+        if self._filter_text or self._min_rating is not None:
+            mask = np.ones(self._size, dtype=bool)
+            if self._min_rating is not None:
+                mask &= self.column_values(RATING_COLUMN) >= self._min_rating
+            if self._filter_text and self._text_fields:
+                text = self._filter_text
+                mask &= np.fromiter((text in key for key in self._search_keys),
+                                    dtype=bool, count=self._size)
+            rows = np.flatnonzero(mask)
+
+        if 0 <= self._sort_column < len(self._fields):
+            field = self._fields[self._sort_column]
+            key_field = RATING_COLUMN if field == TIER_COLUMN else field
+            keys = self.column_values(key_field)
+            if rows is not None:
+                keys = keys[rows]
+            if key_field in self._text_fields:
+                keys = keys.astype(str)
+            order = np.argsort(keys, kind='stable')
+            if self._sort_order == Qt.DescendingOrder:
+                order = order[::-1]
+            rows = order if rows is None else rows[order]
+        self._rows = rows
+        self.endResetModel()
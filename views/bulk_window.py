@@ -0,0 +1,117 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QComboBox, QDoubleSpinBox, QTableView,
+                             QHeaderView, QProgressBar, QFileDialog, QAbstractItemView)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from models.formula_registry import default_registry
+from views.bulk_table_model import BulkTableModel
+
+
+class BulkRatingWindow(QWidget):
+    """批量评分窗口视图：导入选手比赛数据文件并以表格显示评分"""
+
+    # 过滤条件变化时发出（输入停顿后才发出，避免每个按键都重新过滤）
+    filter_changed = pyqtSignal()
+
+    FILTER_DELAY_MS = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("CS2 Rating 批量评分")
+        self.resize(1100, 700)
+        self.model = BulkTableModel(self)
+        self._init_ui()
+
+    def _init_ui(self):
+        """初始化用户界面"""
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # 工具栏：导入、计算方法、过滤
+        toolbar = QHBoxLayout()
+        self.import_btn = QPushButton("导入 CSV/JSONL")
+        self.import_btn.setStyleSheet(
+            "background-color: #4CAF50; color: white; font-weight: bold;"
+        )
+        self.method_combo = QComboBox()
+        for formula in default_registry():
+            self.method_combo.addItem(formula.name, formula.id)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("按选手/文本列过滤")
+        self.min_rating_input = QDoubleSpinBox()
+        self.min_rating_input.setRange(0, 3)
+        self.min_rating_input.setDecimals(2)
+        self.min_rating_input.setSingleStep(0.05)
+        self.min_rating_input.setSpecialValueText("不限")
+        self.min_rating_input.setPrefix("Rating ≥ ")
+
+        toolbar.addWidget(self.import_btn)
+        toolbar.addWidget(QLabel("计算方法:"))
+        toolbar.addWidget(self.method_combo)
+        toolbar.addStretch()
+        toolbar.addWidget(self.filter_input)
+        toolbar.addWidget(self.min_rating_input)
+        layout.addLayout(toolbar)
+
+        # 表格：固定行高，只绘制可见行
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.setWordWrap(False)
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(22)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        layout.addWidget(self.table)
+
+        # 状态栏：进度、取消
+        status = QHBoxLayout()
+        self.status_label = QLabel("尚未导入数据")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setEnabled(False)
+        status.addWidget(self.status_label, 1)
+        status.addWidget(self.progress_bar, 1)
+        status.addWidget(self.cancel_btn)
+        layout.addLayout(status)
+
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(self.FILTER_DELAY_MS)
+        self._filter_timer.timeout.connect(self.filter_changed)
+        self.filter_input.textChanged.connect(self._filter_timer.start)
+        self.min_rating_input.valueChanged.connect(self._filter_timer.start)
+
+    def ask_input_path(self) -> str:
+        """选择要导入的文件，取消时返回空字符串"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "导入选手比赛数据", "", "数据文件 (*.csv *.jsonl *.ndjson *.json);;所有文件 (*)")
+        return path
+
+    def get_selected_method_id(self):
+        """获取选择的计算方法ID"""
+        return self.method_combo.currentData()
+
+    def get_filter(self) -> tuple:
+        """当前过滤条件 (文本, 最低评分或None)"""
+        min_rating = self.min_rating_input.value()
+        return self.filter_input.text(), (min_rating if min_rating > 0 else None)
+
+    def set_running(self, running: bool):
+        """导入进行中：禁用导入与方法选择，启用取消"""
+        self.import_btn.setEnabled(not running)
+        self.method_combo.setEnabled(not running)
+        self.cancel_btn.setEnabled(running)
+
+    def set_progress(self, fraction: float):
+        """更新进度条（0-1）"""
+        self.progress_bar.setValue(int(max(0.0, min(1.0, fraction)) * 1000))
+
+    def show_status(self, message: str):
+        """显示状态信息"""
+        self.status_label.setText(message)
@@ -1,14 +1,19 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QLineEdit, QPushButton, QGroupBox,
-                             QFormLayout, QDoubleSpinBox, QComboBox)
-from PyQt5.QtCore import Qt
+                             QFormLayout, QDoubleSpinBox, QComboBox, QCheckBox)
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIntValidator
+from models import instrumentation
+from models.formula_registry import default_registry
 from models.rating_calculator import RatingCalculator
 
 
 class MainWindow(QMainWindow):
     """主窗口视图"""
 
+    # 任一输入或计算方法变化时发出（用于实时计算）
+    inputs_changed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("CS2 Rating 计算器 (专业版)")
@@ -27,6 +32,7 @@ class MainWindow(QMainWindow):
         self._create_calculate_button()
         self._create_result_group()
         self._create_about_button()
+        self._connect_change_signals()
 
     def _create_method_selector(self):
         """创建计算方法选择区域"""
@@ -34,17 +40,21 @@ class MainWindow(QMainWindow):
         method_layout = QHBoxLayout()
 
         self.method_combo = QComboBox()
-        self.method_combo.addItems([
-            "综合评分 (三种算法平均)",
-            "Rating 1.0 (基础算法)",
-            "Rating 2.0 (HLTV算法)",
-            "自定义算法"
-        ])
+        # 计算方法由公式注册表提供（名称显示在界面，方法ID作为条目数据）
+        for formula in default_registry():
+            self.method_combo.addItem(formula.name, formula.id)
         self.method_combo.setCurrentIndex(0)  # 默认选择综合评分
 
+        self.live_checkbox = QCheckBox("实时计算")
+        self.live_checkbox.setToolTip("输入变化后自动重新计算")
+        self.interval_checkbox = QCheckBox("置信区间")
+        self.interval_checkbox.setToolTip("按回合重采样，显示评分的 5%–95% 区间")
+
         method_layout.addWidget(QLabel("计算方法:"))
         method_layout.addWidget(self.method_combo)
         method_layout.addStretch()
+        method_layout.addWidget(self.live_checkbox)
+        method_layout.addWidget(self.interval_checkbox)
 
         method_group.setLayout(method_layout)
         self.layout.addWidget(method_group)
@@ -145,25 +155,77 @@ class MainWindow(QMainWindow):
         self.rating_desc.setStyleSheet("font-size: 16px; color: #666;")
         self.rating_desc.setAlignment(Qt.AlignCenter)
 
+        self.validation_label = QLabel("")
+        self.validation_label.setStyleSheet("font-size: 13px; color: #F44336;")
+        self.validation_label.setAlignment(Qt.AlignCenter)
+        self.validation_label.setWordWrap(True)
+        self.validation_label.hide()
+
         self.detail_label = QLabel("等待计算...")
         self.detail_label.setWordWrap(True)
         self.detail_label.setStyleSheet("font-size: 14px;")
 
         result_layout.addWidget(self.rating_label)
         result_layout.addWidget(self.rating_desc)
+        result_layout.addWidget(self.validation_label)
         result_layout.addWidget(self.detail_label)
         self.result_group.setLayout(result_layout)
 
         self.layout.addWidget(self.result_group)
 
     def _create_about_button(self):
-        """创建关于按钮"""
+        """创建批量评分与关于按钮"""
+        self.bulk_btn = QPushButton("批量评分 (导入文件)")
+        self.layout.addWidget(self.bulk_btn)
+
         self.about_btn = QPushButton("关于")
         self.about_btn.setStyleSheet(
             "background-color: #2196F3; color: white;"
         )
         self.layout.addWidget(self.about_btn)
 
+    def _connect_change_signals(self):
+        """把所有输入控件的变化汇总到 inputs_changed 信号"""
+        for line_edit in self._line_edits():
+            line_edit.textChanged.connect(self.inputs_changed)
+        for spin_box in (self.adr_input, self.hs_input, self.rws_input):
+            spin_box.valueChanged.connect(self.inputs_changed)
+        self.method_combo.currentIndexChanged.connect(self.inputs_changed)
+
+    def _line_edits(self):
+        """所有整数输入框"""
+        return (self.kills_input, self.deaths_input, self.assists_input,
+                self.rounds_input, self.mvps_input, self.kills_3k_input,
+                self.kills_4k_input, self.kills_5k_input)
+
+    def is_live_mode(self) -> bool:
+        """是否开启实时计算"""
+        return self.live_checkbox.isChecked()
+
+    def is_interval_mode(self) -> bool:
+        """是否同时计算评分的置信区间"""
+        return self.interval_checkbox.isChecked()
+
+    def invalid_fields(self) -> list:
+        """返回内容无法通过校验的输入框名称，并标红这些输入框"""
+        invalid = []
+        for line_edit in self._line_edits():
+            valid = not line_edit.text() or line_edit.hasAcceptableInput()
+            line_edit.setStyleSheet("" if valid else "border: 1px solid #F44336;")
+            if not valid:
+                invalid.append(line_edit.placeholderText())
+        return invalid
+
+    def show_validation_error(self, message: str):
+        """在结果区域内联显示输入错误（不弹出对话框）"""
+        self.validation_label.setText(message)
+        self.validation_label.show()
+
+    def clear_validation_error(self):
+        """清除内联错误提示"""
+        self.validation_label.clear()
+        self.validation_label.hide()
+
     def get_input_values(self):
         """获取所有输入值，确保安全转换"""
         def safe_int(text, default=0):
@@ -198,13 +260,25 @@ class MainWindow(QMainWindow):
         """获取选择的计算方法"""
         return self.method_combo.currentText()
 
-    def update_results(self, rating: float, details: str, method_name: str):
-        """更新结果展示，显示使用的计算方法"""
+    def get_selected_method_id(self):
+        """获取选择的计算方法ID"""
+        return self.method_combo.currentData()
+
+    def update_results(self, rating: float, details: str, method_name: str,
+                       interval: tuple = None):
+        """更新结果展示，显示使用的计算方法（interval 为 (5%, 50%, 95%) 分位数）"""
         desc, color = RatingCalculator.get_rating_description(rating)
 
-        self.rating_label.setText(f"{method_name}: {rating:.2f}")
+        text = f"{method_name}: {rating:.2f}"
+        if interval is not None:
+            text += f"  [{interval[0]:.2f} – {interval[-1]:.2f}]"
+        self.rating_label.setText(text)
         self.rating_desc.setText(desc)
         self.rating_desc.setStyleSheet(
             f"font-size: 16px; color: {color}; font-weight: bold;"
         )
-        self.detail_label.setText(details)
\ No newline at end of file
+        self.detail_label.setText(details)
+        self.clear_validation_error()
+
+
+instrumentation.instrument(MainWindow, 'update_results')